@@ -1,4 +1,6 @@
 from .fpeg import fpeg_compress, fpeg_decompress
 from .jpeg import jpeg2000_compress, jpeg2000_decompress
+from .region import decode_region
+from .pyramid import SubbandPyramid
 from .config import Config
 from .base import Pipe
@@ -2,6 +2,7 @@ from inspect import signature, Parameter
 from pprint import PrettyPrinter
 
 from .config import read_config
+from .executor import shared_executor
 from .format import Formatter
 from .monitor import Monitor
 
@@ -18,11 +19,15 @@ class Pipe:
 
   In FPEG, processors, transformers and encoders are pipes which can be filled into a pipeline to create brand new compress and decompress algorithms.
 
+  Accelerated pipes run their tasks on an executor (see fpeg.executor), executor_kind is the kind of shared executor used when none is set.
+
   References
   ----------
   [1] Lars Buitinck, Gilles Louppe, Mathieu Blondel et al. "API design for machine learning software: experiences from the scikit-learn project" in European Conference on Machine Learning and Principles and Practices of Knowledge Discovery in Databases (2013).
   """
 
+  executor_kind = "process"
+
   def __init__(self):
     """
     Init basic implicit attributes.
@@ -35,11 +40,14 @@ class Pipe:
       Formatter for generating log messages.
     pprinter: fpeg.printer.Pprinter
       Pretty printer for printing pipes.
+    executor: fpeg.executor.Executor
+      Executor running the tasks of an accelerated pipe. The shared executor of kind executor_kind is used if not specified.
     """
     self.logs = []
     self.formatter = Formatter(fmt=time_format)
     self.pprinter = PrettyPrinter(**pprint_option)
     self.monitor = Monitor()
+    self.executor = None
 
   def recv_send(self, X, **params):
     """
@@ -85,11 +93,11 @@ class Pipe:
 
   def accelerate(self, **params):
     """
-    Set self.accelerated as True when number of tasks exceeds the setted minimun task number.
+    Set self.accelerated as True when number of tasks reaches the setted minimun task number, i.e. task_number >= min_task_number. An "accelerated" param overrides the threshold.
 
-    If self.accelerated is true, pipe will open a subprocess pool for parallel computation when receiving and processing data.
+    If self.accelerated is true, pipe will run its tasks on its executor for parallel computation when receiving and processing data.
 
-    The function mapped to the pool must not be method of pipe.
+    The function mapped to the executor must not be method of pipe.
     """
     self.logs[-1] += self.formatter.message("Trying to accelerate process.")
     try:
@@ -107,7 +115,32 @@ class Pipe:
       except KeyError:
         pass
 
-      self.accelerated = self.accelerated or bool(self.task_number < self.min_task_number)
+      self.accelerated = self.accelerated or bool(self.task_number >= self.min_task_number)
+
+  def get_executor(self):
+    """
+    Executor running the tasks of the pipe, None if the pipe is not accelerated.
+    """
+    if not self.accelerated:
+      return None
+
+    if self.executor is None:
+      return shared_executor(self.executor_kind, getattr(self, "max_pool_size", None))
+
+    return self.executor
+
+  def starmap(self, func, inputs):
+    """
+    Return [func(*args) for args in inputs], computed by the executor of the pipe if it is accelerated.
+
+    func must not be method of pipe.
+    """
+    executor = self.get_executor()
+    if executor is None:
+      return [func(*args) for args in inputs]
+
+    self.logs[-1] += self.formatter.message("Using {} to accelerate process.".format(executor))
+    return executor.starmap(func, inputs)
 
   def set_params(self, **params):
     if not params:
@@ -158,10 +191,10 @@ class Pipe:
     parameters = [p for p in init_signature.parameters.values()
                   if p.name != 'self' and p.kind != p.VAR_KEYWORD]
 
-    # Make monitor, formatter, pprinter visible to pipeline.
+    # Make monitor, formatter, pprinter, executor visible to pipeline.
     # These attributes are initialized by the Pipe base class,
     # and is invisible to pipeline in subclasses if not do so.
-    included_names = ["monitor", "formatter", "pprinter"]
+    included_names = ["monitor", "formatter", "pprinter", "executor"]
     names = [p.name for p in parameters]
     names.extend(included_names)
     names = sorted(list(set(names)))
@@ -172,7 +205,7 @@ class Pipe:
     """
     Pretty print the pipe.
     """
-    excluded_names = ["name", "monitor", "formatter", "pprinter"]
+    excluded_names = ["name", "monitor", "formatter", "pprinter", "executor"]
     params = self.get_params()
     new_params = {}
     for key in params:
@@ -216,6 +249,9 @@ class Transformer(Pipe):
   In FPEG, transforms and inverse transforms like fft, ifft, dwt and idwt are implemented as transformers.
   """
 
+  # transforms are NumPy-bound and release the GIL
+  executor_kind = "thread"
+
   def recv(self, X, **params):
     self.logs.append("")
     self.logs[-1] += self.formatter.message("Receiving data.")
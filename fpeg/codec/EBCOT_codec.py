@@ -2,20 +2,47 @@ __all__ = [
 	"EBCOTCodec"
 ]
 
-from copy import deepcopy
-from multiprocessing import Pool
+from functools import partial
+from heapq import heappop, heappush
 import numpy as np
 
 from fpeg.base import Codec
 from fpeg.config import read_config
-from fpeg.funcs import parse_marker, cat_arrays_2d
+from fpeg.funcs import parse_marker
+from fpeg.pyramid import SubbandPyramid, as_pyramid
+from fpeg.transformer.lifting import synthesis_norms
+from fpeg.transport import SharedArena, read_array, write_array
+from fpeg.utils.quantify import step_sizes
+from .bitplane import bitplane_decompose, bitplane_compose
+from .block_state import CodeBlockState
+from . import ebcot_jit
+from . import ht_coder
+from .coding_modes import BYPASS, TERMALL, CAUSAL, HT, segmented, stripe_causal, segment_count, pass_segment, CodewordEncoder, CodewordDecoder
+from .contexts import SIG_MASK, ZC_LUT, SC_LUT, MR_LUT, orientation
+from .block_scheduler import block_cost, run_scheduled
+from .codestream import Band, Block, band_marks, pack_codestream, unpack_codestream, index_codestream, table_size, segment_table_size, _join_layers
+from .rate_control import error_reduction, pcrd_layers, layer_budgets, band_weights
+from .pass_engine import scan_index, scan_order, stripe_columns, propagation_candidates, refinement_members, cleanup_members, run_length_columns
 
 config = read_config()
 
 D = config.get("jpeg2000", "D")
 G = config.get("jpeg2000", "G")
 QCD = config.get("jpeg2000", "QCD")
-mq_table = config.get("jpeg2000", "mq_table")
+
+# context tables as lists, indexing them from python is much cheaper than indexing ndarrays
+_zc_tables = ZC_LUT.tolist()
+_sc_table = SC_LUT.tolist()
+_mr_table = MR_LUT.tolist()
+
+# "python" runs the reference implementation, "jit" the compiled kernels of fpeg.codec.ebcot_jit
+backends = ["python", "jit"]
+
+# code-block width and height are powers of two in [min_code_block_size, max_code_block_size],
+# and a code-block holds at most max_code_block_area samples, as in JPEG2000 part 1
+min_code_block_size = 4
+max_code_block_size = 1024
+max_code_block_area = 4096
 
 min_task_number = config.get("accelerate", "codec_min_task_number")
 max_pool_size = config.get("accelerate", "codec_max_pool_size")
@@ -32,6 +59,20 @@ class EBCOTCodec(Codec):
 							 D=D,
 							 G=G,
 							 QCD=QCD,
+							 irreversible=False,
+							 cb_height=64,
+							 cb_width=64,
+							 target_bytes=None,
+							 target_bpp=None,
+							 layers=1,
+							 max_layers=None,
+							 max_bitplanes=None,
+							 reduce=0,
+							 bypass=False,
+							 termall=False,
+							 causal=False,
+							 ht=False,
+							 backend="python",
 							 accelerated=False
 							 ):
 		"""
@@ -49,9 +90,39 @@ class EBCOTCodec(Codec):
 			Depth of graphic.
 		epsilon_b:integer, must
 			a parameter for calculate Kmax
+		irreversible: bool, optional
+			Whether the coefficients are quantized from the irreversible 9/7 transform, with the steps QCD sets (see Quantizer), or are the integers of the reversible 5/3. Rate control weights the distortion of every subband by the energy its coefficients bring to the image, which follows the wavelet and the steps.
+		cb_height, cb_width: int, optional
+			Height and width of code-blocks, powers of two between 4 and 1024 with at most 4096 samples per code-block. Code-blocks are clipped at the edges of subbands. Decoding takes the size recorded in the codestream.
+		target_bytes: int, optional
+			Size in bytes the codestream must fit. Code-blocks are truncated after the coding passes that keep the distortion lowest (PCRD-opt). Nothing is truncated if neither target_bytes nor target_bpp is specified.
+		target_bpp: float, optional
+			Size of the codestream in bits per pixel, used when target_bytes is not specified.
+		layers: int, optional
+			Number of quality layers. Layers are selected with PCRD-opt and each one doubles the bytes of the layer below it, the last one holding every pass kept.
+		max_layers: int, optional
+			Number of quality layers to decode, every layer if not specified. Bytes of the layers above are not read.
+		max_bitplanes: int, optional
+			Number of bit-planes to decode in every code-block, every bit-plane if not specified.
+		reduce: int, optional
+			Number of finest decomposition levels to skip when decoding, between 0 and the depth of the codestream. Decoded tiles hold the subbands of the coarser levels only, and bytes of the skipped levels are not read.
+		bypass: bool, optional
+			Whether to encode in the selective arithmetic coding bypass (lazy) mode: below the 4 most significant bit-planes of a code-block, the significance propagation and magnitude refinement passes are written as raw bits, only the cleanup passes are MQ coded. Faster to encode and decode for a slightly larger codestream. The mode is recorded in the codestream, decoding follows it.
+		termall: bool, optional
+			Whether to terminate the MQ coder after every coding pass. The length of every pass is recorded in the codestream so a decoder can locate and schedule the passes of a code-block on its own, and code-blocks can be truncated after any pass at no cost, for a few bytes per pass.
+		causal: bool, optional
+			Whether to form contexts from the current and previous stripes only (stripe-causal), so a stripe of four rows can be decoded as soon as the stripe above it is.
+		ht: bool, optional
+			Whether to code code-blocks with the high-throughput block coder (see fpeg.codec.ht_coder) instead of the EBCOT passes and the MQ coder, several times faster for a slightly larger codestream. Its codewords are a single coding pass, so rate control and quality layers keep or drop whole code-blocks and max_bitplanes does not apply. It can not be combined with bypass, termall or causal, and it runs on NumPy whatever the backend.
+		backend: str, optional
+			Implementation of the block coder, must in ["python", "jit"]. "jit" needs numba and falls back to "python" without it.
 		accelerated: bool, optional
-			Whether the process would be accelerated by subprocess pool.
+			Whether the process would be accelerated by the executor of the codec.
 
+		Implicit Attributes
+		-------------------
+		fast_paths: dict
+			Number of flat tiles and of all-zero code-blocks met by the last encoding or decoding. A tile is flat when the LL subband of every component is constant and every other subband is zero, it is stored as the values of its LL subbands. All-zero code-blocks are stored without bit-plane nor codeword. Neither is coded nor decoded.
 		"""
 		super().__init__()
 
@@ -61,12 +132,27 @@ class EBCOTCodec(Codec):
 		self.D = D
 		self.G = G
 		self.QCD = QCD
+		self.irreversible = irreversible
+		self.cb_height = cb_height
+		self.cb_width = cb_width
+		self.target_bytes = target_bytes
+		self.target_bpp = target_bpp
+		self.layers = layers
+		self.max_layers = max_layers
+		self.max_bitplanes = max_bitplanes
+		self.reduce = reduce
+		self.bypass = bypass
+		self.termall = termall
+		self.causal = causal
+		self.ht = ht
+		self.backend = backend
 		self.accelerated = accelerated
 
 		self.epsilon_b, _ = parse_marker(self.QCD)
 		self.Kmax = max(0, self.G + self.epsilon_b - 1)
 		self.min_task_number = min_task_number
 		self.max_pool_size = max_pool_size
+		self.fast_paths = {}
 
 	def encode(self, X, **params):
 		self.logs[-1] += self.formatter.message("Trying to encode received data.")
@@ -74,556 +160,595 @@ class EBCOTCodec(Codec):
 			self.epsilon_b = params["epsilon_b"]
 		except KeyError:
 			pass
+		backend = self._select_backend(**params)
+		h, w = self._check_code_block(**params)
+		mode = self._coding_mode(**params)
+
+		X = [as_pyramid(x) for x in X]
+
+		# code-blocks of every tile, component and subband are independent tasks
+		weights = self._band_weights(**params)
+		tasks, costs, layouts = _gather_tasks(_tile_encode_tasks, X, self.D, h, w, backend=backend, mode=mode, weights=weights)
+		self.accelerate(**dict(params, task_number=len(tasks)))
+		executor = self.get_executor()
+		if executor is not None:
+			self.logs[-1] += self.formatter.message("Using {} to accelerate EBCOT encoding.".format(executor))
+
+		if getattr(executor, "kind", None) == "process":
+			# worker processes read their code-blocks from shared memory instead of receiving them pickled
+			with SharedArena() as arena:
+				tasks = _share_encode_tasks(arena, X, self.D, tasks, layouts, h, w)
+				results = run_scheduled(_shared_block_encode, tasks, costs, executor)
+		else:
+			results = run_scheduled(_block_encode, tasks, costs, executor)
+
+		layers = self._check_layers(**params)
+		budget = self._budget(layouts, segmented(mode), **params)
+		# passes are charged with the segment table entries they need, so that the tables fit the target too,
+		# and their distortions are weighted by the energy of their subband in the image
+		records = [(_charged_lengths(lengths, mode), distortions) for _, _, lengths, distortions, _ in results]
+		if budget is None:
+			# the last layer keeps every pass
+			total = sum(len(stream) for stream, *_ in results)
+			passes = pcrd_layers(records, layer_budgets(total, layers)[:-1]) + [[len(lengths) for lengths, _ in records]]
+		else:
+			passes = pcrd_layers(records, layer_budgets(budget, layers))
+			self.logs[-1] += self.formatter.message("Truncated code-blocks to fit {} bytes of codewords.".format(budget))
+		blocks = [_truncate(result, [layer[k] for layer in passes], mode) for k, result in enumerate(results)]
+
+		tiles = _split_tiles(_tile_coded_bands, layouts, blocks)
+		flat = [not any(rows for _, _, rows, _ in layout) for layout in layouts]
+		tiles = [_flat_bands(bands, x) if f else bands for bands, x, f in zip(tiles, X, flat)]
+		self._count_fast_paths(sum(flat), sum(1 for _, planes, *_ in results if not planes))
 
+		return pack_codestream(tiles, self.D, h, w, layers, mode)
 
-		if self.accelerated:
-			self.logs[-1] += self.formatter.message("Using multiprocess pool to accelerate EBCOT encoding.")
-			inputs = [[x, self.D] for x in X]
-			with Pool(min(self.task_number, self.max_pool_size)) as p:
-				bitcodes = p.starmap(_EBCOT_encode, inputs)
+	def decode(self, codestream, **params):
+		self.logs[-1] += self.formatter.message("Trying to decode received data.")
+		backend = self._select_backend(**params)
+		try:
+			# table of contents from a sidecar, spares reading the tables of the codestream
+			index = params["index"]
+		except KeyError:
+			index = None
+		try:
+			self.max_layers = params["max_layers"]
+		except KeyError:
+			pass
+		try:
+			self.max_bitplanes = params["max_bitplanes"]
+		except KeyError:
+			pass
+		max_passes = None if self.max_bitplanes is None else 3 * self.max_bitplanes
+
+		if index is None:
+			index = index_codestream(codestream)
+		if index.flags & HT and max_passes is not None:
+			self.logs[-1] += self.formatter.warning("Code-blocks of the high-throughput block coder are a single pass, max_bitplanes is ignored.")
+		reduce = self._check_reduce(index.D, **params)
+		if reduce:
+			self.logs[-1] += self.formatter.message("Skipping the {} finest decomposition level(s).".format(reduce))
+
+		codestream = unpack_codestream(codestream, index, self.max_layers, reduce)
+		h, w = codestream.cb_height, codestream.cb_width
+		# flat tiles are filled with the values of their subbands
+		flat = [all(band.value is not None for band in bands) for bands in codestream.tiles]
+		coded = [bands for bands, f in zip(codestream.tiles, flat) if not f]
+		tasks, costs, layouts = _gather_tasks(_tile_decode_tasks, coded, h, w, backend=backend,
+																					max_passes=max_passes, mode=codestream.flags)
+		# code-blocks truncated to no pass by rate control or max_layers are not all-zero ones
+		self._count_fast_paths(sum(flat), sum(1 for task in tasks if not task[1]))
+
+		self.accelerate(**dict(params, task_number=len(tasks)))
+		executor = self.get_executor()
+		if executor is not None:
+			self.logs[-1] += self.formatter.message("Using {} to accelerate EBCOT decoding.".format(executor))
+
+		if getattr(executor, "kind", None) == "process":
+			# worker processes write decoded code-blocks straight into shared subband buffers
+			with SharedArena() as arena:
+				tasks, outputs = _share_decode_tasks(arena, tasks, layouts, h, w)
+				run_scheduled(_shared_block_decode, tasks, costs, executor)
+				tiles = [_bands_to_pyramid([arena.view(out) for out in outs]) for outs in outputs]
 		else:
-			bitcodes = [_EBCOT_encode(x, self.D) for x in X]
+			results = run_scheduled(_block_decode, tasks, costs, executor)
+			tiles = _split_tiles(partial(_tile_assemble_bands, h=h, w=w), layouts, results)
 
-		return bitcodes
+		tiles = iter(tiles)
+		return [_flat_tile(bands) if f else next(tiles) for bands, f in zip(codestream.tiles, flat)]
 
-	def decode(self, bitcodes, **params):
-		self.logs[-1] += self.formatter.message("Trying to decode received data.")
+	def accelerate(self, **params):
+		"""
+		Code-blocks of all tiles, components and subbands are the tasks of the codec, so the executor is chosen by encode and decode once the tiles are split, task_number being the number of code-blocks. Calls without task_number, e.g. from Codec.recv with the number of tiles, are ignored.
+		"""
+		if "task_number" in params:
+			super().accelerate(**params)
 
-		if self.accelerated:
-			inputs = [[bitcode, self.D] for bitcode in bitcodes]
-			with Pool(min(self.task_number, self.max_pool_size)) as p:
-				X = p.starmap(_tile_decode, inputs)
-		else:
-			X = [_tile_decode(bitcode, self.D) for bitcode in bitcodes]
-		
-		# print(X[0])
-		return X
+	def decode_window(self, codestream, index, band, rows, cols):
+		"""
+		Decode rows [rows[0], rows[1]) and columns [cols[0], cols[1]) of a subband, from the code-blocks overlapping them only.
+
+		Parameters
+		----------
+		codestream: bytes-like
+			Container produced by EBCOTCodec.
+		index: CodestreamIndex
+			Table of contents of codestream.
+		band: int
+			Position of the subband in index.bands.
+		rows, cols: tuple of int
+			Window in coefficients of the subband, clipped to it.
+
+		Returns
+		-------
+		window: ndarray
+			int64 coefficients of the window, decoded from the first max_layers layers with the backend of the codec.
+		"""
+		view = memoryview(codestream).cast("B")
+		h, w = index.cb_height, index.cb_width
+		_, _, code, height, width, first, count, value = index.bands[band].tolist()
+		(top, bottom), (left, right) = ((start, min(stop, n)) for (start, stop), n in zip((rows, cols), (height, width)))
+		if not count:
+			# subband of a flat tile
+			return np.full((bottom - top, right - left), value, dtype=np.int64)
+
+		layers = index.blocks.shape[1] if self.max_layers is None else max(1, min(index.blocks.shape[1], self.max_layers))
+		segments = index.segments.tolist() if segmented(index.flags) else None
+		backend = "python" if self.backend == "jit" and not ebcot_jit.available else self.backend
+		window = np.zeros((bottom - top, right - left), dtype=np.int64)
+		cols = -(-width // w)
+		for i in range(top // h, -(-bottom // h)):
+			for j in range(left // w, -(-right // w)):
+				block = _join_layers(view, index.blocks[first + i * cols + j, :layers].tolist(), segments)
+				# code-blocks on the right and bottom edges are clipped to the subband
+				shape = (min(h, height - i * h), min(w, width - j * w))
+				decoded = _block_decode(bytes(block.stream), block.planes, block.passes, band_marks[code], *shape, backend,
+																index.flags, block.segments)
+				r0, r1 = max(top, i * h), min(bottom, (i + 1) * h)
+				c0, c1 = max(left, j * w), min(right, (j + 1) * w)
+				window[r0 - top:r1 - top, c0 - left:c1 - left] = decoded[r0 - i * h:r1 - i * h, c0 - j * w:c1 - j * w]
+
+		return window
+
+	def _coding_mode(self, **params):
+		# coding mode flags of the encoder, see fpeg.codec.coding_modes
+		try:
+			self.bypass = params["bypass"]
+		except KeyError:
+			pass
+		try:
+			self.termall = params["termall"]
+		except KeyError:
+			pass
+		try:
+			self.causal = params["causal"]
+		except KeyError:
+			pass
+		try:
+			self.ht = params["ht"]
+		except KeyError:
+			pass
 
+		if self.ht:
+			if self.bypass or self.termall or self.causal:
+				msg = "Invalid coding mode, the high-throughput block coder can not be combined with bypass, termall or causal."
+				self.logs[-1] += self.formatter.error(msg)
+				raise ValueError(msg)
+			self.logs[-1] += self.formatter.message("Coding code-blocks with the high-throughput block coder.")
+			return HT
+
+		mode = 0
+		if self.bypass:
+			mode |= BYPASS
+			self.logs[-1] += self.formatter.message("Bypassing the MQ coder in the lower bit-planes.")
+		if self.termall:
+			mode |= TERMALL
+			self.logs[-1] += self.formatter.message("Terminating the MQ coder after every coding pass.")
+		if self.causal:
+			mode |= CAUSAL
+			self.logs[-1] += self.formatter.message("Forming stripe-causal contexts.")
+
+		return mode
+
+	def _check_layers(self, **params):
+		try:
+			self.layers = params["layers"]
+		except KeyError:
+			pass
 
-def _EBCOT_encode(tile, D):
-	"""
-	EBCOT encode and decode part
-	encode part:
-	| _EBCOT_encode
-		| _tile_encode
-			| _band_encode
-				| _embeddedBlockEncoder _MQencode
-					 | 三个通道过程
-
-	｜ _EBCOT_decode
-		| _tile_decode
-			| _band_decode
-				| _block_decode
-					| three decode passes and MQdecode
-						|signdecode and runlengthdecode
-	"""
+		if not 1 <= self.layers < 1 << 16:
+			msg = "Invalid number of layers {}. Should be in [1, {}].".format(self.layers, (1 << 16) - 1)
+			self.logs[-1] += self.formatter.error(msg)
+			raise ValueError(msg)
 
-	bitcode = list(_tile_encode(tile, D))
+		return self.layers
 
-	# with open('test.bin', 'wb') as f:
-	#   f.write(struct.pack(str(l)+'i', *bitcode))
-	# streamonly = [int(i) for i in streamonly]
-	# l = len(streamonly)
-	# with open('streamonly.bin', 'wb') as f:
-	#   f.write(struct.pack(str(l)+'i', *streamonly))
+	def _count_fast_paths(self, flat_tiles, zero_blocks):
+		self.fast_paths = {"flat tiles": flat_tiles, "zero blocks": zero_blocks}
+		self.logs[-1] += self.formatter.message("{} flat tile(s) and {} all-zero code-block(s) took the fast paths.".format(flat_tiles, zero_blocks))
 
-	return bitcode
+	def _check_reduce(self, depth, **params):
+		try:
+			self.reduce = params["reduce"]
+		except KeyError:
+			pass
 
+		if not 0 <= self.reduce <= depth:
+			msg = "Invalid reduce {}. Should be in [0, {}], the depth of the codestream.".format(self.reduce, depth)
+			self.logs[-1] += self.formatter.error(msg)
+			raise ValueError(msg)
 
-def _MQencode(CX, D):
-	"""
-	MQ encode and decode part
-	|MQencode
-		|transferbyte
-			|putbyte
-	|MQdecode
-		|fill_lsp
+		return self.reduce
 
-	"""
-	PETTable, CXTable = deepcopy(mq_table)
-	encoder = EBCOTparam()
-	for i in range(len(D)):
-		symbol = D[i][0]
-		cxLabel = CX[i][0]
-		expectedSymbol = CXTable[cxLabel][1]
-		p = PETTable[CXTable[cxLabel][0]][3]  # PETTable [CXTable[cxLabel][0]]---[3]
-		encoder.A = encoder.A - p
-		if encoder.A < p:
-			# Conditional exchange of MPS and LPS
-			expectedSymbol = 1 - expectedSymbol
-		if symbol == expectedSymbol:
-			# assign MPS the upper sub-interval
-			encoder.C = encoder.C + np.uint32(p)
-		else:
-			# assign LPS the lower sub-interval
-			encoder.A = np.uint32(p)
-		if encoder.A < 32768:
-			if symbol == CXTable[cxLabel][1]:
-				CXTable[cxLabel][0] = PETTable[CXTable[cxLabel][0]][0]
-			else:
-				CXTable[cxLabel][1] = CXTable[cxLabel][1] ^ PETTable[CXTable[cxLabel][0]][2]
-				CXTable[cxLabel][0] = PETTable[CXTable[cxLabel][0]][1]
-			while encoder.A < 32768:
-				encoder.A = 2 * encoder.A
-				encoder.C = 2 * encoder.C
-				encoder.t = encoder.t - 1
-				if encoder.t == 0:
-					encoder = _transferbyte(encoder)
-	encoder = _encode_end(encoder)
-	return encoder
-
-
-def _transferbyte(encoder):
-	CPartialMask = np.uint32(133693440)  # 00000111111110000000000000000000
-	CPartialCmp = np.uint32(4161273855)  # 11111000000001111111111111111111
-	CMsbsMask = np.uint32(267386880)  # 27-20msbs标志位  00001111111100000000000000000000
-	CMsbsCmp = np.uint32(4027580415)  # CMsbs的补码      11110000000011111111111111111111
-	CCarryMask = np.uint32(2 ** 27)  # 取进位              00001000000000000000000000000000
-	if encoder.T == 255:
-		# 不能将任何进位传给T，需要位填充
-		encoder = _putbyte(encoder)
-		encoder.T = np.uint8((encoder.C & CMsbsMask) >> 20)  # 27-20位
-		encoder.C = encoder.C & CMsbsCmp  #
-		encoder.t = 7
-	else:
-		# 从C将任何进位传到T
-		encoder.T = encoder.T + np.uint8((encoder.C & CCarryMask) >> 27)
-		encoder.C = encoder.C ^ CCarryMask
-		encoder = _putbyte(encoder)
-		if encoder.T == 255:
-			encoder.T = np.uint8((encoder.C & CMsbsMask) >> 20)
-			encoder.C = encoder.C & CMsbsCmp
-			encoder.t = 7
+	def _budget(self, layouts, segments=False, **params):
+		# bytes left to the codewords once the tables are written, None without a target size
+		# segments: whether code-blocks have segment tables, their lengths are charged to the coding passes
+		try:
+			self.target_bytes = params["target_bytes"]
+		except KeyError:
+			pass
+		try:
+			self.target_bpp = params["target_bpp"]
+		except KeyError:
+			pass
+
+		if self.target_bytes is not None:
+			target = int(self.target_bytes)
+		elif self.target_bpp is not None:
+			# the subbands of one component hold as many coefficients as the tile has pixels
+			pixels = sum(h_cA * w_cA for layout in layouts for h_cA, w_cA, _, _ in layout[:len(layout) // 3])
+			target = int(self.target_bpp * pixels / 8)
 		else:
-			encoder.T = np.uint8((encoder.C & CPartialMask) >> 19)
-			encoder.C = encoder.C & CPartialCmp
-			encoder.t = 8
-	return encoder
-
-
-def _putbyte(encoder):
-	# 将T中的内容写入字节缓存
-	if encoder.L >= 0:
-		encoder.stream = np.append(encoder.stream, encoder.T)
-	encoder.L = encoder.L + 1
-	return encoder
-
-
-def _MQ_decode(stream, CX):
-	PETTable, CXTable = deepcopy(mq_table)
-	# MQ decode initializtion
-	encoder = EBCOTparam()
-	encoder.A = np.uint16(0)
-	encoder.C = np.uint32(0)
-	encoder.t = np.uint8(0)
-	encoder.T = np.uint8(0)
-	encoder.L = np.int32(0)
-	encoder.stream = stream
-	encoder = _fill_lsb(encoder)
-	encoder.C = encoder.C << encoder.t
-	encoder = _fill_lsb(encoder)
-	encoder.C = encoder.C << 7
-	encoder.t = encoder.t - 7
-	encoder.A = np.uint16(2 ** 15)
-
-	# MQ decode procedure
-	CActiveMask = np.uint32(16776960)  # 00000000111111111111111100000000
-	CActiveCmp = np.uint32(4278190335)  # 11111111000000000000000011111111
-	decodeD = []
-	for i in range(len(CX)):
-		cxLabel = CX[i][0]
-		expectedSymbol = CXTable[cxLabel][1]
-		p = PETTable[CXTable[cxLabel][0]][3]
-		encoder.A = encoder.A - np.uint16(p)
-		if encoder.A < np.uint16(p):
-			expectedSymbol = 1 - expectedSymbol
-		if ((encoder.C & CActiveMask) >> 8) < p:
-			symbol = 1 - expectedSymbol
-			encoder.A = np.uint16(p)
+			return None
+
+		# flat tiles only hold the values of the LL subbands of the three components
+		flat = sum(1 for layout in layouts if not any(rows for _, _, rows, _ in layout))
+		tables = table_size(len(layouts), sum(len(layout) for layout in layouts),
+												sum(rows * cols for layout in layouts for _, _, rows, cols in layout), self.layers, 3 * flat, 0 if segments else None)
+		if target < tables:
+			self.logs[-1] += self.formatter.warning("Target size of {} bytes is below the {} bytes of the codestream tables, every code-block is dropped.".format(target, tables))
+
+		return max(0, target - tables)
+
+	def _band_weights(self, **params):
+		# weight of the distortion of every subband of a tile in codestream order, see rate_control.band_weights
+		try:
+			self.irreversible = params["irreversible"]
+		except KeyError:
+			pass
+		try:
+			self.QCD = params["QCD"]
+		except KeyError:
+			pass
+
+		# wavelets and steps of DWTransformer and Quantizer, integer coefficients of the reversible 5/3 have a unit step
+		if self.irreversible:
+			weights = band_weights(synthesis_norms("9/7", self.D), step_sizes(self.QCD, self.D))
 		else:
-			symbol = expectedSymbol
-			temp = ((encoder.C & CActiveMask) >> 8) - np.uint32(p)
-			encoder.C = encoder.C & CActiveCmp
-			encoder.C = encoder.C + np.uint32((np.uint32(temp << 8)) & CActiveMask)
-		if encoder.A < 2 ** 15:
-			if symbol == CXTable[cxLabel][1]:
-				CXTable[cxLabel][0] = PETTable[CXTable[cxLabel][0]][0]
-			else:
-				CXTable[cxLabel][1] = CXTable[cxLabel][1] ^ PETTable[CXTable[cxLabel][0]][2]
-				CXTable[cxLabel][0] = PETTable[CXTable[cxLabel][0]][1]
-			while encoder.A < 2 ** 15:
-				if encoder.t == 0:
-					encoder = _fill_lsb(encoder)
-				encoder.A = 2 * encoder.A
-				encoder.C = 2 * encoder.C
-				encoder.t = encoder.t - 1
-		# print(i, symbol)
-		decodeD.append([symbol])
-	return decodeD
-
-
-def _fill_lsb(encoder):
-	encoder.t = 8
-	if encoder.L == len(encoder.stream) or \
-			(encoder.T == 255 and encoder.stream[encoder.L] > 143):
-		encoder.C = encoder.C + 255
+			weights = band_weights(synthesis_norms("5/3 reversible", self.D), [1] * (3 * self.D + 1))
+
+		return weights * 3
+
+	def _check_code_block(self, **params):
+		try:
+			self.cb_height = params["cb_height"]
+		except KeyError:
+			pass
+		try:
+			self.cb_width = params["cb_width"]
+		except KeyError:
+			pass
+
+		for size in [self.cb_height, self.cb_width]:
+			if size < min_code_block_size or size > max_code_block_size or size & (size - 1):
+				msg = "Invalid code-block size {}. Should be a power of two in [{}, {}].".format(size, min_code_block_size, max_code_block_size)
+				self.logs[-1] += self.formatter.error(msg)
+				raise ValueError(msg)
+		if self.cb_height * self.cb_width > max_code_block_area:
+			msg = "Invalid code-block size {}x{}. Should hold at most {} samples.".format(self.cb_height, self.cb_width, max_code_block_area)
+			self.logs[-1] += self.formatter.error(msg)
+			raise ValueError(msg)
+
+		return self.cb_height, self.cb_width
+
+	def _select_backend(self, **params):
+		try:
+			self.backend = params["backend"]
+		except KeyError:
+			pass
+
+		if self.backend not in backends:
+			msg = "Invalid backend {}. Should be in {}.".format(self.backend, backends)
+			self.logs[-1] += self.formatter.error(msg)
+			raise ValueError(msg)
+
+		if self.backend == "jit" and not ebcot_jit.available:
+			self.logs[-1] += self.formatter.warning("numba is not installed, falling back to the python backend.")
+			return "python"
+
+		return self.backend
+
+
+# EBCOT encode and decode part
+# encode part:
+# | EBCOTCodec.encode
+# 	| _tile_encode_tasks: one task per code-block, in codestream order
+# 		| _block_encode
+# 			| _embeddedBlockEncoder CodewordEncoder
+# 				 | 三个通道过程
+# 	| _tile_coded_bands
+# 	| pack_codestream: binary container, see fpeg.codec.codestream
+#
+# ｜ EBCOTCodec.decode
+# 	| _tile_decode_tasks: code-block tasks of a tile read by unpack_codestream
+# 		| _block_decode
+# 			| _decode_block
+# 				| three decode passes and MQdecode
+# 					|signdecode and runlengthdecode
+# 	| _tile_assemble_bands
+#
+# Tasks of all tiles are gathered and scheduled longest first.
+
+
+def _tile_bands(tile, D):
+	# subbands of a pyramid in codestream order with their band marks, contiguous views of its buffer:
+	# every component holds LL followed by LH, HL and HH of each level
+	marks = _band_marks(D)[:3 * D + 1]
+	return [(tile.band(k)[c], bandMark) for c in range(tile.components) for k, bandMark in enumerate(marks)]
+
+
+def _band_marks(D):
+	# band marks of the subbands of a tile in codestream order
+	return (["LL"] + ["LH", "HL", "HH"] * D) * 3
+
+
+def _gather_tasks(split, items, *args, **params):
+	# split every tile with split and gather the tasks of all tiles in one list
+	tasks, costs, layouts = [], [], []
+	for item in items:
+		tileTasks, tileCosts, layout = split(item, *args, **params)
+		tasks.extend(tileTasks)
+		costs.extend(tileCosts)
+		layouts.append(layout)
+	return tasks, costs, layouts
+
+
+def _tile_encode_tasks(tile, D, h=64, w=64, backend="python", mode=0, weights=None):
+	# weights: weight of the distortion of every subband in codestream order, 1 if not specified
+	# output tasks: arguments of _block_encode for every code-block, in codestream order
+	# output costs: estimated cost of every task
+	# output layout: (height, width, block rows, block columns) of every subband
+	tasks, costs, layout = [], [], []
+	tile = as_pyramid(tile).coarsest(D)
+	bands = _tile_bands(tile, D)
+	if tile.is_flat():
+		# flat tiles are packed with the values of their LL subbands, none of their code-blocks is coded
+		return tasks, costs, [np.shape(band) + (0, 0) for band, _ in bands]
+	weights = [1] * len(bands) if weights is None else weights
+	for (band, bandMark), weight in zip(bands, weights):
+		h_cA, w_cA = np.shape(band)
+		# code-blocks on the right and bottom edges are clipped to the subband
+		for i in range(0, h_cA, h):
+			for j in range(0, w_cA, w):
+				codeBlock = band[i:i + h, j:j + w]
+				tasks.append((codeBlock, bandMark, backend, mode, weight))
+				costs.append(block_cost(codeBlock))
+		layout.append((h_cA, w_cA, -(-h_cA // h), -(-w_cA // w)))
+	return tasks, costs, layout
+
+
+def _share_encode_tasks(arena, tiles, D, tasks, layouts, h=64, w=64):
+	# place the subbands of every coded tile in the arena and replace the code-block of every task with the buffer and position it is read from
+	# output: tasks of _shared_block_encode
+	sharedTasks = []
+	pointer = 0
+	for tile, layout in zip(tiles, layouts):
+		if not any(rows for _, _, rows, _ in layout):
+			# flat tiles have no task
+			continue
+		descriptors = arena.put(*[band for band, _ in _tile_bands(tile.coarsest(D), D)])
+		for descriptor, (_, _, rows, cols) in zip(descriptors, layout):
+			for i in range(rows):
+				for j in range(cols):
+					_, bandMark, backend, mode, weight = tasks[pointer]
+					sharedTasks.append((descriptor, i * h, j * w, bandMark, h, w, backend, mode, weight))
+					pointer += 1
+	return sharedTasks
+
+
+def _shared_block_encode(band, i, j, bandMark, h=64, w=64, backend="python", mode=0, weight=1):
+	# band: descriptor of a subband in shared memory, the code-block at (i, j) is read here
+	return _block_encode(read_array(band, np.s_[i:i + h, j:j + w]), bandMark, backend, mode, weight)
+
+
+def _block_encode(codeBlock, bandMark, backend="python", mode=0, weight=1):
+	# mode: coding mode flags, see fpeg.codec.coding_modes
+	# weight: weight of the distortion of the subband, see rate_control.band_weights
+	# output: codeword, number of bit-planes, length and weighted distortion reduction of every coding pass, and end offset of every segment
+	if not np.any(codeBlock):
+		# all-zero code-blocks have no bit-plane to code
+		return b"", 0, [], [], []
+	if mode & HT:
+		stream, bitplanelength, lengths, distortions, ends = ht_coder.encode_block(codeBlock)
+	elif backend == "jit":
+		stream, bitplanelength, lengths, distortions, ends = ebcot_jit.encode_block(codeBlock, bandMark, mode)
 	else:
-		if encoder.T == 255:
-			encoder.t = 7
-		encoder.T = encoder.stream[encoder.L]
-		encoder.L = encoder.L + 1
-		encoder.C = encoder.C + np.uint32((encoder.T) << (8 - encoder.t))
-	return encoder
-
-
-def _tile_encode(tile, D, h=64, w=64):
-	_depthOfDwt = D
-
-	tile_cA = tile[0][:, :, 0]
-	newBit, newStream = _band_encode(tile_cA, 'LL', h, w)
-	bitcode = newBit
-	streamOnly = newStream
-	for i in range(1, _depthOfDwt+1):
-		newBit, newStream = _band_encode(tile[i][0][:, :, 0], 'LH', h, w)
-		bitcode = np.hstack((bitcode, newBit))
-		streamOnly = np.hstack((streamOnly, newStream))
-		newBit, newStream = _band_encode(tile[i][1][:, :, 0], 'HL', h, w)
-		bitcode = np.hstack((bitcode, newBit))
-		streamOnly = np.hstack((streamOnly, newStream))
-		newBit, newStream = _band_encode(tile[i][2][:, :, 0], 'HH', h, w)
-		bitcode = np.hstack((bitcode, newBit))
-		streamOnly = np.hstack((streamOnly, newStream))
-
-	tile_cA = tile[0][:, :, 1]
-	newBit, newStream = _band_encode(tile_cA, 'LL', h, w)
-	bitcode = np.hstack((bitcode, newBit))
-	streamOnly = np.hstack((streamOnly, newStream))
-	for i in range(1, _depthOfDwt+1):
-		newBit, newStream = _band_encode(tile[i][0][:, :, 1], 'LH', h, w)
-		bitcode = np.hstack((bitcode, newBit))
-		streamOnly = np.hstack((streamOnly, newStream))
-		newBit, newStream = _band_encode(tile[i][1][:, :, 1], 'HL', h, w)
-		bitcode = np.hstack((bitcode, newBit))
-		streamOnly = np.hstack((streamOnly, newStream))
-		newBit, newStream = _band_encode(tile[i][2][:, :, 1], 'HH', h, w)
-		bitcode = np.hstack((bitcode, newBit))
-		streamOnly = np.hstack((streamOnly, newStream))
-
-	tile_cA = tile[0][:, :, 2]
-	newBit, newStream = _band_encode(tile_cA, 'LL', h, w)
-	bitcode = np.hstack((bitcode, newBit))
-	streamOnly = np.hstack((streamOnly, newStream))
-	for i in range(1, _depthOfDwt+1):
-		newBit, newStream = _band_encode(tile[i][0][:, :, 2], 'LH', h, w)
-		bitcode = np.hstack((bitcode, newBit))
-		streamOnly = np.hstack((streamOnly, newStream))
-		newBit, newStream = _band_encode(tile[i][1][:, :, 2], 'HL', h, w)
-		bitcode = np.hstack((bitcode, newBit))
-		streamOnly = np.hstack((streamOnly, newStream))
-		newBit, newStream = _band_encode(tile[i][2][:, :, 2], 'HH', h, w)
-		bitcode = np.hstack((bitcode, newBit))
-		streamOnly = np.hstack((streamOnly, newStream))
-	bitcode = np.hstack((bitcode, [2051]))
-	return bitcode
-
-
-def _band_encode(tile, bandMark, h=64, w=64, num=8):
-	# 码流：[h, w, CX1, 2048, stream1, 2048, ..., CXn, streamn, 2048, 2049,CXn+1, streamn+1, 2048, ...,2050]
-	h_cA, w_cA = np.shape(tile)
-	h_left_over = h_cA % h
-	w_left_over = w_cA % w
-	cA_extend = np.pad(tile, ((0, h - h_left_over), (0, w - w_left_over)), 'constant')
-	bitcode = [h_cA, w_cA]
-	streamOnly = []
-	for i in range(0, h_cA, h):
-		for j in range(0, w_cA, w):
-			codeBlock = cA_extend[i:i + h, j:j + w]
-			CX, D, bitplanelength= _embeddedBlockEncoder(codeBlock, bandMark, h, w, num)
-			encoder = _MQencode(CX, D)
-			bitcode = np.hstack((bitcode, CX.flatten(), [2048], encoder.stream, [2048], bitplanelength,[2048]))
-			streamOnly = np.hstack((streamOnly, encoder.stream))
-		bitcode = np.hstack((bitcode, [2049]))
-	bitcode = np.hstack((bitcode, [2050]))
-	return (bitcode, streamOnly)
-
-
-def _embeddedBlockEncoder(codeBlock, bandMark, h=64, w=64, num=8):
-	S1 = np.zeros((h, w))
-	S2 = np.zeros((h, w))
-	S3 = np.zeros((h, w))
-	MaxInCodeBlock = len(bin(int(np.max(abs(codeBlock)))))-2
-	signs = (- np.sign(codeBlock) + 1) // 2  # positive: 0, negative: 1
-	bitPlane = np.zeros((h,w,MaxInCodeBlock),dtype=np.uint8)
-	for i in range(h):
-		for j in range(w):
-			# number = bin(np.abs(codeBlock[i][j], dtype=np.int64))[2:]
-			number = bin(np.abs(codeBlock[i][j]))[2:]
-			temp = [0] * (MaxInCodeBlock-len(number)) + [int(num) for num in number]
-			bitPlane[i][j] = np.array(temp)
-	bitPlane = np.transpose(bitPlane, (2, 0, 1))
-	# For Test
-	"""
-	signs = np.zeros((8,8))
-	bitPlane = np.zeros((2,8,8))
-	bitPlane[0][1][1] = 1
-	bitPlane[0][4][4] = 1
-	bitPlane[1][0][2] = 1
-	bitPlane[1][1] = np.array([0,1,0,0,1,1,0,0])
-	bitPlane[1][2][2] = 1
-	bitPlane[1][3][3] = 1
-	bitPlane[1][4][5] = 1
-	bitPlane[1][5] = np.array([0,0,0,0,1,1,0,1])
-	bitPlane[1][6][6] = 1
-	"""
-	sizeofCXandD = h*w*MaxInCodeBlock *5
-	CX = np.zeros((sizeofCXandD, 1), dtype=np.uint32)
-	D = np.zeros((sizeofCXandD, 1), dtype=np.uint32)
+		coder = CodewordEncoder(mode)
+		bitplanelength, lengths, distortions = _embeddedBlockEncoder(codeBlock, bandMark, coder, *np.shape(codeBlock))
+		stream, ends = coder.flush()
+		# a terminated segment is all a decoder needs to decode its passes
+		lengths = [min(length, ends[pass_segment(p, mode)]) for p, length in enumerate(lengths)]
+
+	return stream, bitplanelength, lengths, [d * weight for d in distortions], ends
+
+
+def _charged_lengths(lengths, mode=0):
+	# lengths of the coding passes with the bytes of the segment lengths a codeword truncated after them records
+	if not segmented(mode):
+		return lengths
+	return [length + segment_table_size(pass_segment(p, mode) + 1) - segment_table_size(0) for p, length in enumerate(lengths)]
+
+
+def _truncate(result, passes, mode=0):
+	# passes: cumulative number of coding passes of a coded code-block in every quality layer
+	# output: Block holding the passes of the last layer
+	stream, planes, lengths, _, ends = result
+	layers = [(min(lengths[n - 1], len(stream)) if n else 0, n) for n in passes]
+	kept = layers[-1][0]
+	segments = None
+	if segmented(mode):
+		# segments holding the kept passes, the last one cut where the codeword is
+		segments = [min(end, kept) - min(start, kept) for start, end in zip([0] + ends, ends)][:segment_count(passes[-1], mode)]
+	return Block(stream[:kept], passes[-1], planes, layers, segments)
+
+
+def _flat_bands(bands, tile):
+	# subbands of a flat tile holding the values of their coefficients
+	return [band._replace(value=int(tile.band(0)[band.component, 0, 0]) if band.mark == "LL" else 0) for band in bands]
+
+
+def _flat_tile(bands):
+	# decoded tile of the subbands of a flat tile
+	pyramid = SubbandPyramid([(band.height, band.width) for band in bands[:len(bands) // 3]], np.int64)
+	for k, band in enumerate(pyramid.bands()):
+		band[...] = np.array([b.value for b in bands[k::len(pyramid.shapes)]])[:, np.newaxis, np.newaxis]
+	return pyramid
+
+
+def _tile_coded_bands(layout, results):
+	# group the coded code-blocks of a tile by subband, in the form pack_codestream takes
+	D = (len(layout) // 3 - 1) // 3
+	bands = []
+	pointer = 0
+	for k, ((h_cA, w_cA, rows, cols), bandMark) in enumerate(zip(layout, _band_marks(D))):
+		blocks = results[pointer:pointer + rows * cols]
+		pointer += rows * cols
+		bands.append(Band(bandMark, k // (3 * D + 1), h_cA, w_cA, blocks))
+	return bands
+
+
+def _split_tiles(assemble, layouts, results):
+	# hand the results of every tile to assemble, tiles keep their order
+	tiles = []
 	pointer = 0
-	for i in range(MaxInCodeBlock ):
-		######
-		# three function need rename
-		D, CX, S1, S3, pointer = _SignifiancePropagationPass(D, CX, S1, S3, pointer, bitPlane[i], bandMark, signs, w, h)
-		D, CX, S2, pointer = _MagnitudeRefinementPass(D, CX, S1, S2, S3, pointer, bitPlane[i], w, h)
-		D, CX, pointer, S1 = _CLeanUpPass(D, CX, S1, S3, pointer, bitPlane[i], bandMark, signs, w, h)
-		S3 = np.zeros((h, w))
-	CX_final = CX[0:pointer]
-	D_final = D[0:pointer]
-	return CX_final, D_final, MaxInCodeBlock
+	for layout in layouts:
+		n = sum(rows * cols for _, _, rows, cols in layout)
+		tiles.append(assemble(layout, results[pointer:pointer + n]))
+		pointer += n
+	return tiles
+
+
+def _embeddedBlockEncoder(codeBlock, bandMark, coder, h=64, w=64):
+	# coder: CodewordEncoder handing out the encoder receiving the (CX, D) pairs of every pass as soon as the pass produces them
+	# output: number of bit-planes, and length and distortion reduction of every coding pass
+	state = CodeBlockState(h, w, stripe_causal(coder.mode))
+	signs, bitPlane, MaxInCodeBlock = bitplane_decompose(codeBlock)
+	signs = signs.tolist()
+	magnitude = np.abs(np.asarray(codeBlock)).astype(np.int64)
+	lengths, distortions = [], []
+	for i in range(MaxInCodeBlock):
+		plane = bitPlane[i]
+		# distortion reduction of every sample in this plane, split by the pass coding it
+		reduction = error_reduction(magnitude, MaxInCodeBlock - 1 - i) * plane
+		refined = refinement_members(state)
+		_SignifiancePropagationPass(coder.begin_pass(3 * i), state, plane, bandMark, signs, w, h)
+		lengths.append(coder.pass_length())
+		propagated = int(reduction[state.coded[1:-1, 1:-1] != 0].sum())
+		_MagnitudeRefinementPass(coder.begin_pass(3 * i + 1), state, plane, w, h)
+		lengths.append(coder.pass_length())
+		_CLeanUpPass(coder.begin_pass(3 * i + 2), state, plane, bandMark, signs, w, h)
+		lengths.append(coder.pass_length())
+		refinement = int(reduction[refined].sum())
+		distortions.extend([propagated, refinement, int(reduction.sum()) - propagated - refinement])
+		state.next_plane()
+	return MaxInCodeBlock, lengths, distortions
 
 
 # three encode pass start here
 # in the sequence of significancePass,magnitudepass,_cleanuppass.
 
-def _SignifiancePropagationPass(D, CX, S1, S3, pointer, plane, bandMark, signs, w=64, h=64):
-	# input S1:  list of significance, size 64*64
-	# input CX: the list of context
+def _SignifiancePropagationPass(coder, state, plane, bandMark, signs, w=64, h=64):
+	# input coder: receives the (CX, D) pairs
+	# input state: CodeBlockState of the code-block, updated in place
 	# plane: the value of bits at this plane
 	# bandMark: LL, HL, HH, or LH
-	# pointer: the pointer of the CX
-	# S3: denote that the element has been coded
-	# output: D, CX, S1, S3, pointer
-	S1extend = np.pad(S1, ((1, 1), (1, 1)), 'constant')
-	rounds = h // 4
-	for i in range(rounds):
-		for col in range(w):
-			for ii in range(4):
-				row = 4 * i + ii
-				if S1[row][col] != 0:
-					continue  # is significant
-				temp = S1extend[row][col] + S1extend[row + 1][col] + S1extend[row + 2][col] + S1extend[row][col + 1] + \
-							 S1extend[row + 2][col + 1] + S1extend[row][col + 2] + S1extend[row + 1][col + 2] + S1extend[row + 2][
-								 col + 2]
-				if temp == 0:
-					continue  # is insignificant
-				tempCx = _ZeroCoding(S1extend[row:row + 3, col:col + 3], bandMark)
-				D[pointer][0] = plane[row][col]
-				CX[pointer][0] = tempCx
-				pointer = pointer + 1
-				S3[row][col] = 1  # mark that plane[row][col] has been coded
-				if plane[row][col] == 1:  # _signcoding
-					signComp, tempCx = _SignCoding(S1extend[row:row + 3, col:col + 3], signs[row][col])
-					D[pointer][0] = signComp
-					CX[pointer][0] = tempCx
-					pointer = pointer + 1
-					S1[row][col] = 1  # mark as significant
-					S1extend = np.pad(S1, ((1, 1), (1, 1)), 'constant')
-	return D, CX, S1, S3, pointer
-
-
-def _MagnitudeRefinementPass(D, CX, S1, S2, S3, pointer, plane, w=64, h=64):
-	S1extend = np.pad(S1, ((1, 1), (1, 1)), 'constant')
-	rounds = h // 4
-	for i in range(rounds):
-		for col in range(w):
-			for ii in range(4):
-				row = 4 * i + ii
-				if S1[row][col] != 1 or S3[row][col] != 0:
-					continue
-				tempCx = _MagnitudeRefinementCoding(S1extend[row:row + 3, col:col + 3], S2[row][col])
-				S2[row][col] = 1  # Mark that the element has been refined
-				D[pointer][0] = plane[row][col]
-				CX[pointer][0] = tempCx
-				pointer = pointer + 1
-	return D, CX, S2, pointer
-
-
-def _CLeanUpPass(D, CX, S1, S3, pointer, plane, bandMark, signs, w=64, h=64):
-	S1extend = np.pad(S1, ((1, 1), (1, 1)), 'constant')
-	rounds = h // 4
-	for i in range(rounds):
-		for col in range(w):
-			ii = 0
-			row = 4 * i
-			tempSum = np.sum(S1extend[row:row + 6, col:col + 3]) + np.sum(S3[row:row + 4, col])
-			# 整一列未被编码，都为非重要，且领域非重要
-			if tempSum == 0:
-				ii, tempD, tempCx = _RunLengthCoding(plane[row:row + 4, col])
-				if len(tempD) == 1:
-					D[pointer] = tempD
-					CX[pointer] = tempCx
-					pointer = pointer + 1
-				else:
-					D[pointer], D[pointer + 1], D[pointer + 2] = tempD[0], tempD[1], tempD[2]
-					CX[pointer], CX[pointer + 1], CX[pointer + 2] = tempCx[0], tempCx[1], tempCx[2]
-					pointer = pointer + 3
-					# sign coding
-					row = i * 4 + ii - 1
-					signComp, tempCx = _SignCoding(S1extend[row:row + 3, col:col + 3], signs[row][col])
-					D[pointer] = signComp
-					CX[pointer] = tempCx
-					pointer = pointer + 1
-					S1[row][col] = 1
-					S1extend = np.pad(S1, ((1, 1), (1, 1)), 'constant')
-			while ii < 4:
-				row = i * 4 + ii
-				ii = ii + 1
-				if S1[row][col] != 0 or S3[row][col] != 0:
-					continue
-				tempCx = _ZeroCoding(S1extend[row:row + 3, col:col + 3], bandMark)
-				D[pointer] = plane[row][col]
-				CX[pointer] = tempCx
-				pointer = pointer + 1
-				if plane[row][col] == 1:  # _signcoding
-					signComp, tempCx = _SignCoding(S1extend[row:row + 3, col:col + 3], signs[row][col])
-					D[pointer][0] = signComp
-					CX[pointer][0] = tempCx
-					pointer = pointer + 1
-					S1[row][col] = 1  # mark as significant
-					S1extend = np.pad(S1, ((1, 1), (1, 1)), 'constant')
-	return D, CX, pointer, S1
+	zc = _zc_tables[orientation(bandMark)]
+	rows, cols = scan_order(propagation_candidates(state, plane))
+	plane = plane.tolist()
+	for row, col in zip(rows, cols):
+		word = state.neighbourhood(row, col)
+		if not word & SIG_MASK:
+			continue  # is insignificant
+		coder.encode(zc[word], plane[row][col])
+		state.coded[row + 1][col + 1] = 1  # mark that plane[row][col] has been coded
+		if plane[row][col] == 1:  # _signcoding
+			signComp, tempCx = _SignCoding(word, signs[row][col])
+			coder.encode(tempCx, signComp)
+			state.set_significant(row, col, signs[row][col])  # mark as significant
+
+
+def _MagnitudeRefinementPass(coder, state, plane, w=64, h=64):
+	S2 = state.refinement
+	rows, cols = scan_order(refinement_members(state))
+	plane = plane.tolist()
+	for row, col in zip(rows, cols):
+		coder.encode(_MagnitudeRefinementCoding(state.neighbourhood(row, col), S2[row + 1][col + 1]), plane[row][col])
+		S2[row + 1][col + 1] = 1  # Mark that the element has been refined
+
+
+def _CLeanUpPass(coder, state, plane, bandMark, signs, w=64, h=64):
+	S1, S3 = state.significance, state.coded
+	zc = _zc_tables[orientation(bandMark)]
+	members = cleanup_members(state)
+	runs = run_length_columns(state, members)
+	rows, cols = stripe_columns(members)
+	plane = plane.tolist()
+	for top, col in zip(rows, cols):
+		ii = 0
+		# 整一列未被编码，都为非重要，且领域非重要
+		if runs[top // 4][col] and _column_is_clean(state, top, col):
+			ii, tempD, tempCx = _RunLengthCoding([plane[top + k][col] for k in range(4)])
+			for cx, d in zip(tempCx, tempD):
+				coder.encode(cx, d)
+			if len(tempD) > 1:
+				# sign coding
+				row = top + ii - 1
+				signComp, tempCx = _SignCoding(state.neighbourhood(row, col), signs[row][col])
+				coder.encode(tempCx, signComp)
+				state.set_significant(row, col, signs[row][col])
+		while ii < 4 and top + ii < h:
+			row = top + ii
+			ii = ii + 1
+			if S1[row + 1][col + 1] != 0 or S3[row + 1][col + 1] != 0:
+				continue
+			word = state.neighbourhood(row, col)
+			coder.encode(zc[word], plane[row][col])
+			if plane[row][col] == 1:  # _signcoding
+				signComp, tempCx = _SignCoding(word, signs[row][col])
+				coder.encode(tempCx, signComp)
+				state.set_significant(row, col, signs[row][col])  # mark as significant
+
+
+def _column_is_clean(state, row, col):
+	# whether the four samples of the stripe column starting at (row, col) are uncoded, insignificant and have insignificant neighbours
+	for r in range(row + 1, row + 5):
+		if state.significance[r][col + 1] or state.coded[r][col + 1] or state.context[r][col + 1] & SIG_MASK:
+			return False
+	return True
 
 
 # here is some function used by three passes
 
-def _SignCoding(neighbourS1, sign):
-	# input neighbourS1: size 3*3, matrix of significance
+def _SignCoding(word, sign):
+	# input word: packed neighbourhood of the sample
 	# input sign
 	# output: signComp,(equal: 0, not equal: 1) context
-	if len(neighbourS1) == 3 and len(neighbourS1[0]) == 3:
-		hstr = str(int(neighbourS1[1][0])) + str(int(neighbourS1[1][2]))
-		vstr = str(int(neighbourS1[0][1])) + str(int(neighbourS1[2][1]))
-		dict = {
-			'00': 0, '1-1': 0, '-11': 0, '01': 1, '10': 1, '11': 1,
-			'0-1': -1, '-10': -1, '-1-1': -1
-		}
-		h = dict[hstr]
-		v = dict[vstr]
-		hAndv = str(h) + str(v)
-		hv2Sign = {
-			'11': 0, '10': 0, '1-1': 0, '01': 0, '00': 0,
-			'0-1': 1, '-11': 1, '-10': 1, '-1-1': 1
-		}
-		hv2Context = {
-			'11': 13, '10': 12, '1-1': 11, '01': 10, '00': 9,
-			'0-1': 10, '-11': 11, '-10': 12, '-1-1': 13
-		}
-		signPredict = hv2Sign[hAndv]
-		context = hv2Context[hAndv]
-		signComp = int(sign) ^ signPredict
-	else:
-		# self.logs[-1] += self.formatter.warning("_SignCoding: Size of neighbourS1 not valid")
-		signComp = -1
-		context = -1
-		"""
-		try:
-			raise ValidationError('_SignCoding: Size of neighbourS1 not valid')
-		except ValidationError as e:
-			print(e.args)
-			signComp = -1
-			context = -1
-		"""
+	entry = _sc_table[word]
+	signComp = int(sign) ^ (entry & 1)
+	context = entry >> 1
 	return signComp, context
 
 
-def _ZeroCoding(neighbourS1, bandMark):
-	# input neighbourS1: size 3*3, matrix of significance
-	# input s2: whether it is the first time for Magnitude Refinement Coding
-	# output: context
-	if len(neighbourS1) == 3 and len(neighbourS1[0]) == 3:
-		h = neighbourS1[1][0] + neighbourS1[1][2]
-		v = neighbourS1[0][1] + neighbourS1[2][1]
-		d = neighbourS1[0][0] + neighbourS1[0][2] + neighbourS1[2][0] + neighbourS1[2][2]
-		if bandMark == 'LL' or bandMark == 'LH':
-			if h == 2:
-				cx = 8
-			elif h == 1 and v >= 1:
-				cx = 7
-			elif h == 1 and v == 0 and d >= 1:
-				cx = 6
-			elif h == 1 and v == 0 and d == 0:
-				cx = 5
-			elif h == 0 and v == 2:
-				cx = 4
-			elif h == 0 and v == 1:
-				cx = 3
-			elif h == 0 and v == 0 and d >= 2:
-				cx = 2
-			elif h == 0 and v == 0 and d == 1:
-				cx = 1
-			else:
-				cx = 0
-		elif bandMark == 'HL':
-			if v == 2:
-				cx = 8
-			elif v == 1 and h >= 1:
-				cx = 7
-			elif v == 1 and h == 0 and d >= 1:
-				cx = 6
-			elif v == 1 and h == 0 and d == 0:
-				cx = 5
-			elif v == 0 and h == 2:
-				cx = 4
-			elif v == 0 and h == 1:
-				cx = 3
-			elif v == 0 and h == 0 and d >= 2:
-				cx = 2
-			elif v == 0 and h == 0 and d == 1:
-				cx = 1
-			else:
-				cx = 0
-		elif bandMark == 'HH':
-			hPlusv = h + v
-			if d >= 3:
-				cx = 8
-			elif d == 2 and hPlusv >= 1:
-				cx = 7
-			elif d == 2 and hPlusv == 0:
-				cx = 6
-			elif d == 1 and hPlusv >= 2:
-				cx = 5
-			elif d == 1 and hPlusv == 1:
-				cx = 4
-			elif d == 1 and hPlusv == 0:
-				cx = 3
-			elif d == 0 and hPlusv >= 2:
-				cx = 2
-			elif d == 0 and hPlusv == 1:
-				cx = 1
-			else:
-				cx = 0
-		else:
-			# self.logs[-1] += self.formatter.warning('_ZeroCoding: bandMark not valid')
-			cx = -1
-			"""
-			try:
-				raise ValidationError('_ZeroCoding: bandMark not valid')
-			except ValidationError as e:
-				print(e.args)
-				cx = -1
-			"""
-	else:
-		# self.logs[-1] += self.formatter.warning('_ZeroCoding: Size of neighbourS1 not valid')
-		cx = -1
-		"""
-		try:
-			raise ValidationError('_ZeroCoding: Size of neighbourS1 not valid')
-		except ValidationError as e:
-			print(e.args)
-			cx = -1
-		"""
-	return cx
-
-
 def _RunLengthCoding(listS1):
 	# input listS1: size 1*4, list of significance
 	# output n: number of elements encoded
@@ -674,374 +799,186 @@ def _RunLengthCoding(listS1):
 	return n, d, cx
 
 
-def _MagnitudeRefinementCoding(neighbourS1, s2):
-	# input neighbourS1: size 3*3, matrix of significance
+def _MagnitudeRefinementCoding(word, s2):
+	# input word: packed neighbourhood of the sample
 	# input s2: whether it is the first time for Magnitude Refinement Coding
 	# output: context
-	if len(neighbourS1) == 3 and len(neighbourS1[0]) == 3:
-		temp = np.sum(neighbourS1) - neighbourS1[1][1]
-		if s2 == 1:
-			cx = 16
-		elif s2 == 0 and temp >= 1:
-			cx = 15
-		else:
-			cx = 14
-	else:
-		# self.logs[-1] += self.formatter.warning('_MagnitudeRefinementCoding: Size of neighbourS1 not valid')
-		cx = -1
-		"""
-		try:
-			raise ValidationError('_MagnitudeRefinementCoding: Size of neighbourS1 not valid')
-		except ValidationError as e:
-			print(e.args)
-			cx = -1
-		"""
-	return cx
-
-
-def _encode_end(encoder):
-	nbits = 27 - 15 - encoder.t
-	encoder.C = encoder.C * np.uint32(2 ** encoder.t)
-	while nbits > 0:
-		encoder = _transferbyte(encoder)
-		nbits = nbits - encoder.t
-		encoder.C = encoder.C * np.uint32(2 ** encoder.t)
-	encoder = _transferbyte(encoder)
-
-	return encoder
-
-def _tile_decode(codestream, D):
-	_depthOfDWT = D
-	temp = []
-	for i in range(0, 9 * _depthOfDWT + 3):
-		_index = codestream.index(2050)
-		deStream = codestream[0:_index + 1]
-		temp.append(_band_decode(deStream))
-		codestream = codestream[_index + 1:]
-					
-	start1 = _depthOfDWT*3+1
-	start2 = _depthOfDWT*6+2
-	tile = [cat_arrays_2d([temp[0],
-												temp[start1],
-												temp[start2]])]
-	
-	for i in range(_depthOfDWT):
-		
-		tile.append((cat_arrays_2d([temp[3 * i + 1],
-															 temp[3 * i + start1+1],
-															 temp[3 * i + start2+1]]),
-								 cat_arrays_2d([temp[3 * i + 2],
-															 temp[3 * i + start1+2],
-															 temp[3 * i + start2+2]]),
-								 cat_arrays_2d([temp[3 * i + 3],
-															 temp[3 * i + start1+3],
-															 temp[3 * i + start2+3]])))
-	
-	return tile
-
-
-def _band_decode(codestream, h=64, w=64, num=32):
-	h_cA = codestream[0]
-	w_cA = codestream[1]
-	codestream = codestream[2:]
-	h_num = h_cA // h + 1
-	w_num = w_cA // w + 1
-	band_extend = np.zeros((h_num * h, w_num * w))
-	for i in range(0, h_num):
-		for j in range(0, w_num):
-			_index = codestream.index(2048)
-			deCX = codestream[0:_index]
-			deCX = np.resize(deCX, (_index + 1, 1))
-			codestream = codestream[_index + 1:]
-			_index = codestream.index(2048)
-			deStream = codestream[0:_index]
-			codestream = codestream[_index + 1:]
-			num = codestream[0]
-			codestream = codestream[2:]
-			decodeD = _MQ_decode(deStream, deCX)
-			band_extend[i * h:(i + 1) * h, j * w:(j + 1) * w] = _decode_block(decodeD, deCX, h, w, num)
-		if codestream[0] != 2049:
-			print("Error!")
-		codestream = codestream[1:]
-	if codestream[0] != 2050:
-		print("Error!")
-	print("finish one band")
-	return band_extend[0:h_cA, 0:w_cA]
-
-
-def _decode_block(D, CX, h=64, w=64, num=32):
-	deS1 = np.uint32(np.zeros((h, w)))
-	deS2 = np.uint32(np.zeros((h, w)))
-	deS3 = np.uint32(np.zeros((h, w)))
-	signs = np.uint32(np.zeros((h, w)))
-	V = np.uint32(np.zeros((num, h, w)))
-	deCode = np.zeros((h, w))
+	return _mr_table[2 * int(s2) + bool(word & SIG_MASK)]
+
+
+def _tile_decode_tasks(bands, h=64, w=64, backend="python", max_passes=None, mode=0):
+	# max_passes: number of coding passes to decode at most in every code-block
+	# mode: coding mode flags of the codestream
+	# output tasks: arguments of _block_decode for every code-block, in codestream order
+	# output costs: codeword length of every task
+	# output layout: (height, width, block rows, block columns) of every subband
+	tasks, costs, layout = [], [], []
+	for band in bands:
+		cols = -(-band.width // w)
+		for k, block in enumerate(band.blocks):
+			# code-blocks on the right and bottom edges are clipped to the subband
+			i, j = k // cols * h, k % cols * w
+			size = (min(h, band.height - i), min(w, band.width - j))
+			passes = block.passes if max_passes is None else min(block.passes, max_passes)
+			tasks.append((bytes(block.stream), block.planes, passes, band.mark) + size + (backend, mode, block.segments))
+			costs.append(len(block.stream))
+		layout.append((band.height, band.width, -(-band.height // h), -(-band.width // w)))
+	return tasks, costs, layout
+
+
+def _share_decode_tasks(arena, tasks, layouts, h=64, w=64):
+	# allocate an output buffer for every subband in the arena and prefix every task with the buffer and position of its code-block
+	# output: tasks of _shared_block_decode, and the buffer descriptors of every tile
+	sharedTasks, outputs = [], []
 	pointer = 0
-	for i in range(num):
-		V[i, :, :], signs, deS1, deS3, pointer = _SignificancePassDecoding(V[i, :, :], D, CX, deS1, deS3, pointer, signs, w,
-																																			 h)
-		V[i, :, :], deS2, pointer = _MagnitudePassDecoding(V[i, :, :], D, deS1, deS2, deS3, pointer, w, h)
-		V[i, :, :], deS1, deS3, signs, pointer = _CleanPassDecoding(V[i, :, :], D, CX, deS1, deS3, pointer, signs, w, h)
-		deS3 = np.zeros((h, w))
-	V = np.transpose(V, (1, 2, 0))
-	tempV = np.zeros((h,w))
-	for i in range(h):
-		for j in range(w):
-			tempV[i][j] = sum([V[i][j][k]*2**(num-1-k) for k in range(num)])
-
-	for i in range(h):
-		for j in range(w):
-			deCode[i][j] = (1 - 2 * signs[i][j]) * tempV[i][j]
-	return deCode
-
-
-def _SignificancePassDecoding(V, D, CX, deS1, deS3, pointer, signs, w=64, h=64):
-	S1extend = np.pad(deS1, ((1, 1), (1, 1)), 'constant')
-	rounds = h // 4
-	for i in range(rounds):
-		for col in range(w):
-			for ii in range(4):
-				row = 4 * i + ii
-				temp = np.sum(S1extend[row:row + 3, col:col + 3]) - S1extend[row + 1][col + 1]
-				if deS1[row][col] != 0 or temp == 0:
-					continue
-				###
-				if pointer>=len(D):
-					continue
-				V[row][col] = D[pointer][0]
-				pointer = pointer + 1
-				deS3[row][col] = 1
-				if V[row][col] == 1:
-					signs[row][col] = _SignDecoding(D[pointer], CX[pointer], S1extend[row:row + 3, col:col + 3])
-					pointer = pointer + 1
-					deS1[row][col] = 1
-					S1extend = np.pad(deS1, ((1, 1), (1, 1)), 'constant')
-	return V, signs, deS1, deS3, pointer
-
-
-def _MagnitudePassDecoding(V, D, deS1, deS2, deS3, pointer, w=64, h=64):
-	rounds = h // 4
-	for i in range(rounds):
-		for col in range(w):
-			for ii in range(4):
-				row = 4 * i + ii
-				if deS1[row][col] != 1 or deS3[row][col] != 0:
-					continue
-				###
-				if pointer>=len(D):
-					continue
-				V[row][col] = D[pointer][0]
-				pointer = pointer + 1
-				deS2[row][col] = 1
-	return V, deS2, pointer
-
-
-def _CleanPassDecoding(V, D, CX, deS1, deS3, pointer, signs, w=64, h=64):
-	a = pointer
-	S1extend = np.pad(deS1, ((1, 1), (1, 1)), 'constant')
-	rounds = h // 4
-	for i in range(rounds):
-		for col in range(w):
-			ii = 0
-			row = 4 * i
-			tempSum = np.sum(S1extend[row:row + 6, col:col + 3]) + np.sum(deS3[row:row + 4, col])
-			# 整一列未被编码，都为非重要，且领域非重要
-			if tempSum == 0:
-				if CX.__len__() < pointer + 3:
-					CXextend = np.pad(CX, (0, 2), 'constant')
-					Dextend = np.pad(D, (0, 2), 'constant')
-					tempCx = CXextend[pointer:pointer + 3]
-					tempD = Dextend[pointer:pointer + 3]
-				else:
-					tempCx = CX[pointer:pointer + 3]
-					tempD = D[pointer:pointer + 3]
-				ii, tempV = _RunLengthDecoding(tempCx, tempD)
-				if tempV == [0, 0, 0, 0]:
-					V[row][col] = 0
-					V[row + 1][col] = 0
-					V[row + 2][col] = 0
-					V[row + 3][col] = 0
-					pointer = pointer + 1
-				else:
-					if tempV == [1]:
-						V[row][col] = 1
-						pointer = pointer + 3
-					elif tempV == [0, 1]:
-						V[row][col] = 0
-						V[row + 1][col] = 1
-						pointer = pointer + 3
-					elif tempV == [0, 0, 1]:
-						V[row][col] = 0
-						V[row + 1][col] = 0
-						V[row + 2][col] = 1
-						pointer = pointer + 3
-					elif tempV == [0, 0, 0, 1]:
-						V[row][col] = 0
-						V[row + 1][col] = 0
-						V[row + 2][col] = 0
-						V[row + 3][col] = 1
-						pointer = pointer + 3
-					# sign coding
-					row = row + ii - 1
-					###
-					if pointer>=len(D):
-						continue
-					signs[row][col] = _SignDecoding(D[pointer], CX[pointer], S1extend[row:row + 3, col:col + 3])
-					pointer = pointer + 1
-					deS1[row][col] = 1
-					S1extend = np.pad(deS1, ((1, 1), (1, 1)), 'constant')
-			while ii < 4:
-				row = i * 4 + ii
-				ii = ii + 1
-				if deS1[row][col] != 0 or deS3[row][col] != 0:
-					continue
-				###
-				if pointer>=len(D):
-					continue
-				V[row][col] = D[pointer][0]
-				pointer = pointer + 1
-				deS3[row][col] = 1
-				if V[row][col] == 1:
-					signs[row][col] = _SignDecoding(D[pointer], CX[pointer], S1extend[row:row + 3, col:col + 3])
-					pointer = pointer + 1
-					deS1[row][col] = 1
-					S1extend = np.pad(deS1, ((1, 1), (1, 1)), 'constant')
-	return V, deS1, deS3, signs, pointer
-
-
-def _RunLengthDecoding(CX, D):
-	n = CX.__len__()
-	wrong = 1
-	if CX[0][0] == 17 and D[0][0] == 0 or CX[0][0] == 17 and CX[1][0] == 18 and CX[2][0] == 18 and D[0][0] == 1:
-		wrong = 0
-	if wrong == 0:
-		if D[0][0] == 0:
-			deLen = 4
-			V = [0, 0, 0, 0]
-		elif D[0][0] == 1 and D[1][0] == 0 and D[2][0] == 0:
-			deLen = 1
-			V = [1]
-		elif D[0][0] == 1 and D[1][0] == 0 and D[2][0] == 1:
-			deLen = 2
-			V = [0, 1]
-		elif D[0][0] == 1 and D[1][0] == 1 and D[2][0] == 0:
-			deLen = 3
-			V = [0, 0, 1]
-		elif D[0][0] == 1 and D[1][0] == 1 and D[2][0] == 1:
-			deLen = 4
-			V = [0, 0, 0, 1]
-		else:
-			# self.logs[-1] += self.formatter.warning('_RunLengthDecoding: D not valid')
-			deLen = -1
-			V = [-1]
-			"""
-			try:
-				raise ValidationError('_RunLengthDecoding: D not valid')
-			except ValidationError as e:
-				print(e.args)
-				deLen = -1
-				V = [-1]
-			"""
-	else:
-		# self.logs[-1] += self.formatter.warning('_RunLengthDecoding: CX not valid')
-		deLen = -1
-		V = [-1]
-		"""
-		try:
-			raise ValidationError('_RunLengthDecoding: CX not valid')
-		except ValidationError as e:
-			print(e.args)
-			deLen = -1
-			V = [-1]
-		"""
-	return deLen, V
-
-
-def _SignDecoding(D, CX, neighbourS1):
-	if neighbourS1.__len__() == 3 and neighbourS1[0].__len__() == 3:
-		hstr = str(int(neighbourS1[1][0])) + str(int(neighbourS1[1][2]))
-		vstr = str(int(neighbourS1[0][1])) + str(int(neighbourS1[2][1]))
-		dict = {
-			'00': 0, '1-1': 0, '-11': 0, '01': 1, '10': 1, '11': 1,
-			'0-1': -1, '-10': -1, '-1-1': -1
-		}
-		h = dict[hstr]
-		v = dict[vstr]
-		hAndv = str(h) + str(v)
-		hv2Sign = {
-			'11': 0, '10': 0, '1-1': 0, '01': 0, '00': 0,
-			'0-1': 1, '-11': 1, '-10': 1, '-1-1': 1
-		}
-		hv2Context = {
-			'11': 13, '10': 12, '1-1': 11, '01': 10, '00': 9,
-			'0-1': 10, '-11': 11, '-10': 12, '-1-1': 13
-		}
-		temp = hv2Sign[hAndv]
-		deCX = hv2Context[hAndv]
-		if deCX == CX:
-			deSign = D[0] ^ temp
-		else:
-			# self.logs[-1] += self.formatter.warning('_SignDecoding: Context does not match. Error occurs.')
-			deSign = -1
-			"""
-			try:
-				raise ValidationError('_SignDecoding: Context does not match. Error occurs.')
-			except ValidationError as e:
-				print(e.args)
-				deSign = -1
-			"""
-	else:
-		# self.logs[-1] += self.formatter.warning('_SignDecoding: Size of neighbourS1 not valid')
-		deSign = -1
-		"""
-		try:
-			raise ValidationError('_SignDecoding: Size of neighbourS1 not valid')
-		except ValidationError as e:
-			print(e.args)
-			deSign = -1
-		"""
-	return deSign
+	for layout in layouts:
+		outs = arena.empty(*[(h_cA, w_cA) for h_cA, w_cA, _, _ in layout], dtype=np.int64)
+		for out, (_, _, rows, cols) in zip(outs, layout):
+			for i in range(rows):
+				for j in range(cols):
+					sharedTasks.append((out, i * h, j * w) + tuple(tasks[pointer]))
+					pointer += 1
+		outputs.append(outs)
+	return sharedTasks, outputs
+
+
+def _shared_block_decode(out, top, left, deStream, num, passes, bandMark, h=64, w=64, backend="python", mode=0, segments=None):
+	# out: descriptor of the shared output buffer of the subband, the h x w code-block goes to (top, left)
+	if not num or not passes:
+		# the buffer is allocated zeroed
+		return
+	codeBlock = _block_decode(deStream, num, passes, bandMark, h, w, backend, mode, segments)
+	write_array(out, codeBlock, np.s_[top:top + h, left:left + w])
+
+
+def _block_decode(deStream, num, passes, bandMark, h=64, w=64, backend="python", mode=0, segments=None):
+	# num: number of bit-planes, passes: number of coding passes kept in the codeword
+	# mode, segments: coding mode flags and segment lengths of the codeword
+	# contexts are formed again while decoding so only the codeword is needed
+	if not num or not passes:
+		return np.zeros((h, w), dtype=np.int64)
+	if mode & HT:
+		return ht_coder.decode_block(deStream, h, w)
+	if backend == "jit":
+		return ebcot_jit.decode_block(deStream, bandMark, num, h, w, passes, mode, segments)
+
+	return _decode_block(deStream, bandMark, h, w, num, passes, mode, segments)
+
+
+def _tile_assemble_bands(layout, results, h=64, w=64):
+	# write the decoded code-blocks of a tile straight into the subbands of a pyramid
+	n = len(layout) // 3
+	tile = SubbandPyramid([(h_cA, w_cA) for h_cA, w_cA, _, _ in layout[:n]], np.int64)
+	pointer = 0
+	for k, (h_cA, w_cA, rows, cols) in enumerate(layout):
+		band = tile.band(k % n)[k // n]
+		for i in range(rows):
+			for j in range(cols):
+				band[i * h:(i + 1) * h, j * w:(j + 1) * w] = results[pointer]
+				pointer += 1
 
+	return tile
 
-class EBCOTparam(object):
-	"""
-	EBCOT parameter is parameter used by MQ encode and decode processes
-	
-	initialized in MQ encoding
-	interval length         A = 8000H    
-	Lower bound register        C = 0         
-	Current code byte number    L = -1
-	Temporary byte buffer     T = 0
-	Down-counter          t = 12
 
-	"""
+def _bands_to_pyramid(temp):
+	# pyramid of the subbands of the three components, in codestream order
+	n = len(temp) // 3
+	tile = SubbandPyramid([np.shape(band) for band in temp[:n]], np.int64)
+	for k, band in enumerate(temp):
+		tile.band(k % n)[k // n] = band
+	return tile
 
-	def __init__(self):
-		self.C = np.uint32(0)
-		self.A = np.uint16(32768)
-		self.t = np.uint8(12)
-		self.T = np.uint8(0)
-		self.L = np.int32(-1)
-		self.stream = np.uint8([])
 
+def _decode_block(stream, bandMark, h=64, w=64, num=32, passes=None, mode=0, segments=None):
+	# the passes mirror the encoder: every context label is formed from the state decoded so far
+	# passes: number of coding passes in stream, the bits of the passes after them stay 0
+	if passes is None:
+		passes = 3 * num
+	codeword = CodewordDecoder(stream, mode, segments)
+	state = CodeBlockState(h, w, stripe_causal(mode))
+	signs = np.zeros((h, w), dtype=np.uint8)
+	V = np.zeros((num, h, w), dtype=np.uint8)
+	for k in range(passes):
+		i, kind = divmod(k, 3)
+		decoder = codeword.begin_pass(k)
+		if kind == 0:
+			_SignificancePassDecoding(V[i], decoder, state, signs, bandMark, w, h)
+		elif kind == 1:
+			_MagnitudePassDecoding(V[i], decoder, state, w, h)
+		else:
+			_CleanPassDecoding(V[i], decoder, state, signs, bandMark, w, h)
+			state.next_plane()
+	return bitplane_compose(signs, V)
+
+
+def _SignificancePassDecoding(V, decoder, state, signs, bandMark, w=64, h=64):
+	S1, S3 = state.significance, state.coded
+	zc = _zc_tables[orientation(bandMark)]
+	# members known before the pass, sorted in scan order so the list is already a heap;
+	# samples becoming significant push their neighbours that come later in scan order
+	rows, cols = scan_order(propagation_candidates(state))
+	queue = [(scan_index(row, col, w), row, col) for row, col in zip(rows, cols)]
+	while queue:
+		index, row, col = heappop(queue)
+		if S1[row + 1][col + 1] != 0 or S3[row + 1][col + 1] != 0:
+			continue
+		word = state.neighbourhood(row, col)
+		if not word & SIG_MASK:
+			continue
+		V[row][col] = decoder.decode(zc[word])
+		S3[row + 1][col + 1] = 1
+		if V[row][col] == 1:
+			signs[row][col] = _SignDecoding(decoder, word)
+			state.set_significant(row, col, signs[row][col])
+			for r in range(max(row - 1, 0), min(row + 2, h)):
+				for c in range(max(col - 1, 0), min(col + 2, w)):
+					if S1[r + 1][c + 1] == 0 and S3[r + 1][c + 1] == 0 and scan_index(r, c, w) > index:
+						heappush(queue, (scan_index(r, c, w), r, c))
+
+
+def _MagnitudePassDecoding(V, decoder, state, w=64, h=64):
+	S2 = state.refinement
+	rows, cols = scan_order(refinement_members(state))
+	for row, col in zip(rows, cols):
+		V[row][col] = decoder.decode(_MagnitudeRefinementCoding(state.neighbourhood(row, col), S2[row + 1][col + 1]))
+		S2[row + 1][col + 1] = 1
+
+
+def _CleanPassDecoding(V, decoder, state, signs, bandMark, w=64, h=64):
+	S1, S3 = state.significance, state.coded
+	zc = _zc_tables[orientation(bandMark)]
+	members = cleanup_members(state)
+	runs = run_length_columns(state, members)
+	rows, cols = stripe_columns(members)
+	for top, col in zip(rows, cols):
+		ii = 0
+		# 整一列未被编码，都为非重要，且领域非重要
+		if runs[top // 4][col] and _column_is_clean(state, top, col):
+			if not decoder.decode(17):
+				continue  # the four samples stay 0
+			# position of the first 1 in the column, most significant bit first
+			ii = (decoder.decode(18) << 1 | decoder.decode(18)) + 1
+			row = top + ii - 1
+			V[row][col] = 1
+			signs[row][col] = _SignDecoding(decoder, state.neighbourhood(row, col))
+			state.set_significant(row, col, signs[row][col])
+		while ii < 4 and top + ii < h:
+			row = top + ii
+			ii = ii + 1
+			if S1[row + 1][col + 1] != 0 or S3[row + 1][col + 1] != 0:
+				continue
+			word = state.neighbourhood(row, col)
+			V[row][col] = decoder.decode(zc[word])
+			if V[row][col] == 1:
+				signs[row][col] = _SignDecoding(decoder, word)
+				state.set_significant(row, col, signs[row][col])
+
+
+def _SignDecoding(decoder, word):
+	entry = _sc_table[word]
+	return decoder.decode(entry >> 1) ^ (entry & 1)
 
 
 '''
 改了decodeblock，_embeddedBlockEncoder，banddecode和bandencode改了num的预设值
 '''
-
-# if __name__ == "__main__":
-# 	h, w = 64, 64
-# 	testblock = np.zeros((h, w), dtype=np.uint8)
-# 	for i in range(h):
-# 		for j in range(w):
-# 			testblock[i][j] = i*4
-# 	#(bitcode, _) = _band_encode(testblock, "LL", h=64, w=64, num=8)
-# 	#decodeblock = _band_decode(list(bitcode), h=64, w=64, num=32)
-# 	CX, D, bitplanelength = _embeddedBlockEncoder(testblock, "LL", h, w, num=8)
-# 	encoder = _MQencode(CX, D)
-# 	decodeD = _MQ_decode(encoder.stream, CX)
-# 	decodeblock = _decode_block(D, CX, h, w, num=8)
-
-
-# 	a = 1
@@ -4,4 +4,4 @@ __all__ = [
 ]
 
 from .huffman_codec import HuffmanCodec
-from .ebcot_codec import EBCOTCodec
+from .EBCOT_codec import EBCOTCodec
@@ -0,0 +1,64 @@
+__all__ = [
+	"bitplane_count",
+	"bitplane_decompose",
+	"bitplane_compose"
+]
+
+import numpy as np
+
+
+def bitplane_count(X):
+	"""
+	Number of magnitude bit-planes needed to represent X.
+
+	An all-zero input still counts as one plane, so that every code-block carries at least one coding round.
+	"""
+	X = np.asarray(X)
+	if not X.size:
+		return 1
+
+	return max(1, int(np.max(np.abs(X))).bit_length())
+
+
+def bitplane_decompose(X, num=None):
+	"""
+	Decompose an integer code-block (or a whole subband) into a sign plane and a magnitude bit-plane cube.
+
+	Parameters
+	----------
+	X: array_like of int
+		Quantized coefficients, any shape.
+	num: int, optional
+		Number of bit-planes to extract. Taken from the maximum magnitude of X if not specified.
+
+	Returns
+	-------
+	signs: ndarray of uint8
+		Same shape as X, 1 for negative coefficients and 0 otherwise.
+	planes: ndarray of uint8
+		Shape (num,) + X.shape, most significant plane first.
+	num: int
+		Number of bit-planes.
+	"""
+	X = np.asarray(X)
+	magnitude = np.abs(X).astype(np.int64)
+	if num is None:
+		num = bitplane_count(magnitude)
+
+	signs = (X < 0).astype(np.uint8)
+	shifts = np.arange(num - 1, -1, -1, dtype=np.int64).reshape((-1,) + (1,) * magnitude.ndim)
+	planes = ((magnitude[np.newaxis] >> shifts) & 1).astype(np.uint8)
+
+	return signs, planes, num
+
+
+def bitplane_compose(signs, planes):
+	"""
+	Inverse of bitplane_decompose, rebuild signed integers from a sign plane and a magnitude bit-plane cube.
+	"""
+	planes = np.asarray(planes)
+	num = planes.shape[0]
+	weights = np.left_shift(1, np.arange(num - 1, -1, -1, dtype=np.int64))
+	magnitude = np.tensordot(weights, planes.astype(np.int64), axes=1)
+
+	return np.where(np.asarray(signs) != 0, -magnitude, magnitude)
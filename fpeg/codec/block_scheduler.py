@@ -0,0 +1,53 @@
+__all__ = [
+	"block_cost",
+	"longest_first",
+	"run_scheduled"
+]
+
+import numpy as np
+
+from .bitplane import bitplane_count
+
+
+def block_cost(block):
+	"""
+	Cheap estimate of the work needed to code a code-block, number of nonzero samples times number of bit-planes.
+	"""
+	return int(np.count_nonzero(block)) * bitplane_count(block)
+
+
+def longest_first(costs):
+	"""
+	Indices of tasks sorted by decreasing cost. Tasks of equal cost keep their original order.
+	"""
+	return sorted(range(len(costs)), key=lambda i: -costs[i])
+
+
+def run_scheduled(func, tasks, costs, executor=None):
+	"""
+	Run func(*task) for every task, longest first, and return the results in the original task order.
+
+	Parameters
+	----------
+	func: callable
+		Function run on every task, must be picklable when run by a process executor.
+	tasks: list of tuple
+		Arguments of every call.
+	costs: list of number
+		Estimated cost of every task.
+	executor: fpeg.executor.Executor, optional
+		Executor spreading the tasks over workers. Tasks run in the calling thread if not specified.
+	"""
+	order = longest_first(costs)
+	ordered = [tasks[i] for i in order]
+	if executor is None:
+		results = [func(*task) for task in ordered]
+	else:
+		# one task per chunk, so workers pick up the expensive tasks first and the cheap ones fill the gaps
+		results = executor.starmap(func, ordered, chunksize=1)
+
+	out = [None] * len(tasks)
+	for i, result in zip(order, results):
+		out[i] = result
+
+	return out
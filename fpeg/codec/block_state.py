@@ -0,0 +1,98 @@
+__all__ = [
+	"CodeBlockState"
+]
+
+import numpy as np
+
+from .contexts import SIG_W, SIG_E, SIG_N, SIG_S, NEG_W, NEG_E, NEG_N, NEG_S, SIG_NW, SIG_NE, SIG_SW, SIG_SE
+
+
+class CodeBlockState:
+	"""
+	Coding state of one code-block, shared by the three coding passes.
+
+	Every array is padded by one sample on each side and never re-padded, so the 3x3 neighbourhood of sample (row, col) is the slice [row:row + 3, col:col + 3] and the sample itself sits at [row + 1, col + 1]. The packed neighbourhood words (see fpeg.codec.contexts) are kept up to date in place whenever a sample becomes significant.
+	"""
+
+	__slots__ = [
+		"h",
+		"w",
+		"causal",
+		"significance",
+		"refinement",
+		"coded",
+		"context"
+	]
+
+	def __init__(self, h, w, causal=False):
+		"""
+		Init the state of an h x w code-block.
+
+		Explicit Attributes
+		-------------------
+		h: int
+			Height of the code-block.
+		w: int
+			Width of the code-block.
+		causal: bool, optional
+			Whether contexts are stripe-causal: samples of the first row of a stripe do not show in the neighbourhood of the stripe above.
+
+		Implicit Attributes
+		-------------------
+		significance: ndarray
+			1 where a sample is significant.
+		refinement: ndarray
+			1 where a sample has been through magnitude refinement at least once.
+		coded: ndarray
+			1 where a sample has been coded in the current bit-plane.
+		context: ndarray
+			Packed significance and sign state of the neighbours of each sample, used to index the context tables.
+		"""
+		self.h = h
+		self.w = w
+		self.causal = causal
+
+		shape = (h + 2, w + 2)
+		self.significance = np.zeros(shape, dtype=np.uint8)
+		self.refinement = np.zeros(shape, dtype=np.uint8)
+		self.coded = np.zeros(shape, dtype=np.uint8)
+		self.context = np.zeros(shape, dtype=np.uint16)
+
+	def set_significant(self, row, col, negative=0):
+		"""
+		Mark sample (row, col) significant with the given sign and update the neighbourhood words around it.
+		"""
+		r, c = row + 1, col + 1
+		self.significance[r, c] = 1
+		context = self.context
+		# with stripe-causal contexts, the stripe above is coded as if the first row of this one was insignificant
+		above = not (self.causal and row % 4 == 0)
+		if negative:
+			context[r, c + 1] |= SIG_W | NEG_W
+			context[r, c - 1] |= SIG_E | NEG_E
+			context[r + 1, c] |= SIG_N | NEG_N
+			if above:
+				context[r - 1, c] |= SIG_S | NEG_S
+		else:
+			context[r, c + 1] |= SIG_W
+			context[r, c - 1] |= SIG_E
+			context[r + 1, c] |= SIG_N
+			if above:
+				context[r - 1, c] |= SIG_S
+		context[r + 1, c + 1] |= SIG_NW
+		context[r + 1, c - 1] |= SIG_NE
+		if above:
+			context[r - 1, c + 1] |= SIG_SW
+			context[r - 1, c - 1] |= SIG_SE
+
+	def neighbourhood(self, row, col):
+		"""
+		Packed neighbourhood word of sample (row, col).
+		"""
+		return int(self.context[row + 1, col + 1])
+
+	def next_plane(self):
+		"""
+		Reset the coded-this-plane flags before coding the next bit-plane.
+		"""
+		self.coded.fill(0)
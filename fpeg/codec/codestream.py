@@ -0,0 +1,430 @@
+__all__ = [
+	"MAGIC",
+	"VERSION",
+	"Codestream",
+	"Band",
+	"Block",
+	"CodestreamIndex",
+	"SegmentWriter",
+	"pack_codestream",
+	"table_size",
+	"segment_table_size",
+	"unpack_codestream",
+	"index_codestream",
+	"pack_index",
+	"unpack_index"
+]
+
+from collections import namedtuple
+from struct import Struct
+
+import numpy as np
+
+from .coding_modes import MODES, segmented
+
+# Binary container of EBCOT codestreams, all integers little endian.
+#
+# header        magic "FPEG", version, coding mode flags (see fpeg.codec.coding_modes), D, code-block
+#               height, code-block width, number of tiles, number of quality layers
+# tile table    offset and length in bytes of every tile segment, from the start of the container
+# tile segment  kind of the tile, coded or flat
+#               number of subbands
+#               subband table: band mark, component, height and width of every subband
+#               code-block table: number of bit-planes of every code-block, then for every layer the
+#                 offset (from the start of the tile segment) and length of the part of the codeword
+#                 in the layer and the number of coding passes up to the layer, subband after subband
+#                 in raster order. When the coding mode splits codewords into segments, the number
+#                 and lengths of the segments of the codeword follow.
+#               payload: layer after layer, the part of the MQ codeword of every code-block in the layer
+#               A flat tile, whose LL subbands are constant and other subbands zero, has no code-block
+#               table nor payload, the subband table is followed by the value of every LL subband.
+#
+# Offsets let a decoder seek straight to any tile or code-block. The version byte is bumped whenever
+# the layout changes, containers of other versions are rejected.
+#
+# The tables form an in-stream index: index_codestream reads them in a single pass with a cursor and
+# returns a table of contents of every subband and code-block. The table of contents can be saved
+# next to the codestream (see pack_index) and handed back to unpack_codestream, which then skips the
+# tables altogether.
+#
+# Codewords may be truncated after any coding pass (see fpeg.codec.rate_control), so the number of
+# bit-planes is recorded next to the number of passes kept. Code-blocks on the right and bottom edges
+# of a subband are clipped to it.
+#
+# Quality layers split every codeword after increasing numbers of passes. Since the payload is laid
+# out layer after layer, decoding the first layers of a tile only reads the start of its payload.
+#
+# Code-blocks whose samples are all zero have no bit-plane and an empty codeword, they are neither
+# coded nor decoded.
+
+MAGIC = b"FPEG"
+VERSION = 1
+
+_header = Struct("<4sBBBHHI")
+_layer_count = Struct("<H")
+_tile_entry = Struct("<II")
+_tile_kind = Struct("<B")
+_band_count = Struct("<H")
+_band_entry = Struct("<BBII")
+_block_planes = Struct("<B")
+_layer_entry = Struct("<IIH")
+_band_value = Struct("<q")
+_segment_count = Struct("<H")
+_segment_length = Struct("<H")
+# segment lengths of a code-block are read at once
+_segment_lengths = np.dtype("<u2")
+
+band_codes = {"LL": 0, "LH": 1, "HL": 2, "HH": 3}
+band_marks = {code: mark for mark, code in band_codes.items()}
+
+_coded_tile = 0
+_flat_tile = 1
+
+Codestream = namedtuple("Codestream", ["version", "D", "cb_height", "cb_width", "layers", "tiles", "flags"], defaults=[0])
+# value: value of every coefficient of a subband of a flat tile, which has no code-blocks, None when the subband is coded
+Band = namedtuple("Band", ["mark", "component", "height", "width", "blocks", "value"], defaults=[None])
+# layers: (codeword length, number of passes) up to every quality layer, None when the whole codeword is in the first layer
+# segments: length of every segment of the codeword, None when the coding mode does not split codewords
+Block = namedtuple("Block", ["stream", "passes", "planes", "layers", "segments"], defaults=[None, None])
+
+# Table of contents of a codestream.
+# bands: one record per subband in codestream order, with the tile it belongs to and the range
+#   [first, first + count) of its code-blocks in blocks. Subbands of flat tiles have no code-block and
+#   the value of all their coefficients
+# blocks: one row per code-block in codestream order and one record per layer, with the offset from
+#   the start of the container and the length of the part of the codeword in the layer, and the
+#   number of passes up to the layer, and the position of its segment table in segments
+# flags: coding mode flags of the codestream
+# segments: segment tables of the code-blocks when the coding mode splits codewords, each one the number
+#   of segments followed by their lengths
+CodestreamIndex = namedtuple("CodestreamIndex", ["version", "D", "cb_height", "cb_width", "bands", "blocks", "flags", "segments"],
+														 defaults=[0, np.zeros(0, dtype="<u2")])
+
+band_dtype = np.dtype([("tile", "<u4"), ("component", "u1"), ("code", "u1"), ("height", "<u4"), ("width", "<u4"), ("first", "<u8"), ("count", "<u4"), ("value", "<i8")])
+block_dtype = np.dtype([("offset", "<u8"), ("length", "<u4"), ("passes", "<u2"), ("planes", "u1"), ("segments", "<u8")])
+
+INDEX_MAGIC = b"FPGI"
+_index_header = Struct("<4sBBHHQQHBQ")
+
+
+def pack_codestream(tiles, D, cb_height=64, cb_width=64, layers=1, flags=0):
+	"""
+	Pack coded tiles into a container.
+
+	Parameters
+	----------
+	tiles: list of list of Band
+		Subbands of every tile in codestream order, each holding its code-blocks in raster order as Block(stream, passes, planes) with a bytes-like stream. A tile whose subbands all have a value is packed as a flat tile.
+	D: int
+		Number of decomposition levels.
+	cb_height, cb_width: int, optional
+		Code-block size.
+	layers: int, optional
+		Number of quality layers, every Block.layers must hold as many entries unless it is None.
+	flags: int, optional
+		Coding mode flags, Block.segments must be set when the mode splits codewords into segments.
+
+	Returns
+	-------
+	codestream: bytes
+	"""
+	segments = SegmentWriter(_header.size + _layer_count.size + _tile_entry.size * len(tiles))
+	for bands in tiles:
+		segments.append(*_pack_tile(bands, layers, segmented(flags)))
+
+	chunks = [_header.pack(MAGIC, VERSION, flags, D, cb_height, cb_width, len(tiles)), _layer_count.pack(layers)]
+	chunks.extend(_tile_entry.pack(offset, length) for offset, length in zip(segments.offsets, segments.lengths))
+
+	return b"".join(chunks + segments.chunks)
+
+
+def table_size(n_tiles, n_bands, n_blocks, layers=1, n_values=0, n_segments=None):
+	"""
+	Size in bytes of the header and tables of a container, everything but the codewords.
+
+	n_values is the number of LL subbands of flat tiles, and n_segments the number of segments of all codewords when the coding mode splits them, None otherwise.
+	"""
+	size = (_header.size + _layer_count.size + (_tile_entry.size + _tile_kind.size + _band_count.size) * n_tiles
+					+ _band_entry.size * n_bands + (_block_planes.size + _layer_entry.size * layers) * n_blocks + _band_value.size * n_values)
+	if n_segments is not None:
+		size += _segment_count.size * n_blocks + _segment_length.size * n_segments
+	return size
+
+
+def segment_table_size(n_segments):
+	"""
+	Size in bytes of the segment table of a code-block whose codeword is made of n_segments segments.
+	"""
+	return _segment_count.size + _segment_length.size * n_segments
+
+
+def unpack_codestream(codestream, index=None, max_layers=None, reduce=0):
+	"""
+	Read a container produced by pack_codestream.
+
+	Codewords of the returned blocks are memoryviews of codestream, nothing is copied, unless they are made of several layers.
+
+	Parameters
+	----------
+	codestream: bytes-like
+	index: CodestreamIndex, optional
+		Table of contents of codestream, e.g. loaded from a sidecar with unpack_index. The tables of the container are read with index_codestream if not specified.
+	max_layers: int, optional
+		Number of quality layers to read, every layer if not specified. Bytes of the layers above are not touched.
+	reduce: int, optional
+		Number of finest decomposition levels to skip. Bands of these levels are left out of the returned tiles and their bytes are not touched.
+	"""
+	view = memoryview(codestream).cast("B")
+	if index is None:
+		index = index_codestream(view)
+	elif index.blocks.size and int((index.blocks["offset"] + index.blocks["length"]).max()) > view.nbytes:
+		raise ValueError("Invalid index, code-blocks run past the end of the codestream.")
+
+	layers = index.blocks.shape[1]
+	if max_layers is not None:
+		layers = max(1, min(layers, max_layers))
+	entries = index.blocks[:, :layers].tolist()
+	segments = index.segments.tolist() if segmented(index.flags) else None
+	# bands of a component come as LL then the H, V and D bands of every level, coarsest first
+	per_component = 3 * index.D + 1
+	kept_bands = 3 * (index.D - reduce) + 1
+	tiles = []
+	position = 0
+	for tile, component, code, height, width, first, count, value in index.bands.tolist():
+		while len(tiles) <= tile:
+			tiles.append([])
+			position = 0
+		position += 1
+		if (position - 1) % per_component >= kept_bands:
+			continue
+		if not count:
+			tiles[tile].append(Band(band_marks[code], component, height, width, [], value))
+			continue
+		blocks = [_join_layers(view, entry, segments) for entry in entries[first:first + count]]
+		tiles[tile].append(Band(band_marks[code], component, height, width, blocks))
+
+	return Codestream(index.version, index.D, index.cb_height, index.cb_width, index.blocks.shape[1], tiles, index.flags)
+
+
+def index_codestream(codestream):
+	"""
+	Table of contents of a container, read in a single pass over its tables.
+	"""
+	cursor = _Cursor(codestream)
+	if cursor.view.nbytes < _header.size:
+		raise ValueError("Invalid codestream, shorter than its header.")
+
+	magic, version, flags, D, cb_height, cb_width, n_tiles = cursor.read(_header)
+	if magic != MAGIC:
+		raise ValueError("Invalid codestream, magic {} should be {}.".format(bytes(magic), MAGIC))
+	if version != VERSION:
+		raise ValueError("Unsupported codestream version {}. Should be {}.".format(version, VERSION))
+	if flags & ~MODES:
+		raise ValueError("Unsupported coding mode flags {:#x}. Known flags are {:#x}.".format(flags, MODES))
+	layers, = cursor.read(_layer_count)
+
+	segments = [cursor.read(_tile_entry) for _ in range(n_tiles)]
+
+	bands, blocks = [], []
+	tables = [] if segmented(flags) else None
+	for k, (offset, _) in enumerate(segments):
+		cursor.seek(offset)
+		_index_tile(cursor, k, cb_height, cb_width, layers, bands, blocks, tables)
+
+	return CodestreamIndex(version, D, cb_height, cb_width,
+												 np.array(bands, dtype=band_dtype), np.array(blocks, dtype=block_dtype).reshape(-1, layers),
+												 flags, np.array(tables or [], dtype=_segment_lengths))
+
+
+def pack_index(index):
+	"""
+	Serialize a table of contents, to be stored as a sidecar of its codestream.
+	"""
+	return b"".join([_index_header.pack(INDEX_MAGIC, index.version, index.D, index.cb_height, index.cb_width, len(index.bands),
+																			len(index.blocks), index.blocks.shape[1], index.flags, len(index.segments)),
+									 np.ascontiguousarray(index.bands, dtype=band_dtype).tobytes(),
+									 np.ascontiguousarray(index.blocks, dtype=block_dtype).tobytes(),
+									 np.ascontiguousarray(index.segments, dtype="<u2").tobytes()])
+
+
+def unpack_index(data):
+	"""
+	Read a table of contents serialized by pack_index.
+	"""
+	cursor = _Cursor(data)
+	if cursor.view.nbytes < _index_header.size:
+		raise ValueError("Invalid index, shorter than its header.")
+
+	magic, version, D, cb_height, cb_width, n_bands, n_blocks, layers, flags, n_segments = cursor.read(_index_header)
+	if magic != INDEX_MAGIC:
+		raise ValueError("Invalid index, magic {} should be {}.".format(bytes(magic), INDEX_MAGIC))
+	if version != VERSION:
+		raise ValueError("Unsupported index version {}. Should be {}.".format(version, VERSION))
+	if cursor.view.nbytes != cursor.offset + n_bands * band_dtype.itemsize + n_blocks * layers * block_dtype.itemsize + 2 * n_segments:
+		raise ValueError("Invalid index, size does not match its header.")
+
+	bands = np.frombuffer(cursor.take(n_bands * band_dtype.itemsize), dtype=band_dtype)
+	blocks = np.frombuffer(cursor.take(n_blocks * layers * block_dtype.itemsize), dtype=block_dtype).reshape(n_blocks, layers)
+	segments = np.frombuffer(cursor.take(2 * n_segments), dtype="<u2")
+
+	return CodestreamIndex(version, D, cb_height, cb_width, bands, blocks, flags, segments)
+
+
+class SegmentWriter:
+	"""
+	Collector of the segments of a container.
+
+	Segments are kept as a list of chunks, joined once with the tables by pack_codestream, so writing n bytes costs O(n) whatever the number of segments. The offset and length of every segment are recorded as it is appended, tables of the container are written from them without another pass over the payload.
+	"""
+
+	__slots__ = ["chunks", "offsets", "lengths", "nbytes"]
+
+	def __init__(self, start=0):
+		"""
+		Explicit Attributes
+		-------------------
+		start: int, optional
+			Offset of the first segment, e.g. the size of the tables written before the segments.
+		"""
+		self.chunks = []
+		self.offsets = []
+		self.lengths = []
+		self.nbytes = start
+
+	def append(self, *chunks):
+		"""
+		Append one segment made of chunks of bytes-like objects, and return its offset.
+		"""
+		offset = self.nbytes
+		for chunk in chunks:
+			self.chunks.append(chunk)
+			self.nbytes += memoryview(chunk).nbytes
+		self.offsets.append(offset)
+		self.lengths.append(self.nbytes - offset)
+		return offset
+
+	def __len__(self):
+		return len(self.offsets)
+
+
+class _Cursor:
+	"""
+	Read position over a memoryview, structures are unpacked in place and nothing is copied.
+	"""
+
+	__slots__ = ["view", "offset"]
+
+	def __init__(self, buffer, offset=0):
+		self.view = memoryview(buffer).cast("B")
+		self.offset = offset
+
+	def read(self, struct):
+		values = struct.unpack_from(self.view, self.offset)
+		self.offset += struct.size
+		return values
+
+	def take(self, n):
+		chunk = self.view[self.offset:self.offset + n]
+		self.offset += n
+		return chunk
+
+	def seek(self, offset):
+		self.offset = offset
+
+
+def _pack_tile(bands, layers=1, segments=False):
+	# output: chunks of the tile segment, tables first
+	# segments: whether the segment table of every code-block is written
+	flat = all(band.value is not None for band in bands)
+	chunks = [_tile_kind.pack(_flat_tile if flat else _coded_tile), _band_count.pack(len(bands))]
+	for band in bands:
+		chunks.append(_band_entry.pack(band_codes[band.mark], band.component, band.height, band.width))
+	if flat:
+		return chunks + [_band_value.pack(int(band.value)) for band in bands if band.mark == "LL"]
+
+	blocks = [block for band in bands for block in band.blocks]
+	cumulative = [_block_layers(block, layers) for block in blocks]
+	tables = [_segment_table(block) for block in blocks] if segments else [b""] * len(blocks)
+	payload = SegmentWriter(_tile_kind.size + _band_count.size + _band_entry.size * len(bands)
+													+ (_block_planes.size + _layer_entry.size * layers) * len(blocks) + sum(len(table) for table in tables))
+	for l in range(layers):
+		for block, entries in zip(blocks, cumulative):
+			start = entries[l - 1][0] if l else 0
+			payload.append(block.stream[start:entries[l][0]])
+
+	n = len(blocks)
+	for k, (block, entries, table) in enumerate(zip(blocks, cumulative, tables)):
+		chunks.append(_block_planes.pack(block.planes))
+		for l, (_, passes) in enumerate(entries):
+			chunks.append(_layer_entry.pack(payload.offsets[l * n + k], payload.lengths[l * n + k], passes))
+		chunks.append(table)
+
+	return chunks + payload.chunks
+
+
+def _segment_table(block):
+	# number and lengths of the segments of a codeword
+	segments = block.segments or []
+	if any(length > 0xFFFF for length in segments):
+		raise ValueError("Invalid code-block, segments of {} bytes, at most 65535 can be recorded.".format(max(segments)))
+	return _segment_count.pack(len(segments)) + b"".join(_segment_length.pack(length) for length in segments)
+
+
+def _block_layers(block, layers):
+	# (codeword length, number of passes) up to every layer
+	if block.layers is None:
+		return [(len(block.stream), block.passes)] * layers
+	if len(block.layers) != layers:
+		raise ValueError("Invalid code-block, {} layers where the codestream has {}.".format(len(block.layers), layers))
+	return block.layers
+
+
+def _join_layers(view, entries, segments=None):
+	# Block of the (offset, length, passes, planes, segment table) records of the first layers of a code-block
+	# segments: segment tables of the index, None when the coding mode does not split codewords
+	_, _, passes, planes, table = entries[-1]
+	lengths = segments[table + 1:table + 1 + segments[table]] if segments is not None else None
+	if len(entries) == 1:
+		offset, length = entries[0][:2]
+		return Block(view[offset:offset + length], passes, planes, segments=lengths)
+
+	return Block(b"".join([view[offset:offset + length] for offset, length, _, _, _ in entries]), passes, planes, segments=lengths)
+
+
+def _read_block(cursor, base, layers=1):
+	planes, = cursor.read(_block_planes)
+	entries = []
+	for _ in range(layers):
+		start, n_stream, passes = cursor.read(_layer_entry)
+		entries.append((base + start, n_stream, passes, planes))
+	return entries
+
+
+def _index_tile(cursor, tile, cb_height, cb_width, layers, bands, blocks, tables=None):
+	# append the subbands and code-blocks of the tile segment starting at the cursor to bands and blocks
+	# tables: list the segment tables are appended to, None when code-blocks have none
+	base = cursor.offset
+	kind, = cursor.read(_tile_kind)
+	if kind not in (_coded_tile, _flat_tile):
+		raise ValueError("Invalid tile {}, unknown kind {}.".format(tile, kind))
+	n_bands, = cursor.read(_band_count)
+	entries = [cursor.read(_band_entry) for _ in range(n_bands)]
+
+	if kind == _flat_tile:
+		for code, component, height, width in entries:
+			value, = cursor.read(_band_value) if code == band_codes["LL"] else (0,)
+			bands.append((tile, component, code, height, width, len(blocks), 0, value))
+		return
+
+	for code, component, height, width in entries:
+		count = -(-height // cb_height) * -(-width // cb_width)
+		bands.append((tile, component, code, height, width, len(blocks), count, 0))
+		for _ in range(count):
+			records = _read_block(cursor, base, layers)
+			position = 0
+			if tables is not None:
+				position = len(tables)
+				n_segments, = cursor.read(_segment_count)
+				tables.append(n_segments)
+				tables.extend(np.frombuffer(cursor.take(_segment_length.size * n_segments), dtype=_segment_lengths).tolist())
+			blocks.append([record + (position,) for record in records])
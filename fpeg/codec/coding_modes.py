@@ -0,0 +1,200 @@
+__all__ = [
+	"BYPASS",
+	"TERMALL",
+	"CAUSAL",
+	"HT",
+	"MODES",
+	"bypass_planes",
+	"segmented",
+	"stripe_causal",
+	"pass_segment",
+	"segment_count",
+	"raw_pass",
+	"CodewordEncoder",
+	"CodewordDecoder"
+]
+
+from .mq_coder import MQEncoder, MQDecoder
+from .raw_coder import RawEncoder, RawDecoder
+from .rate_control import pass_length
+
+# Code-block coding modes (see Taubman and Marcellin, JPEG2000, section 12.4), recorded as flags in
+# the header of the codestream.
+#
+# BYPASS: once the bypass_planes most significant bit-planes are coded, the significance propagation
+#   and magnitude refinement passes write their decisions as raw bits, only the cleanup passes stay
+#   arithmetic coded. The decisions of these passes in the lower bit-planes are close to random, the
+#   MQ coder hardly compresses them but spends most of the coding time on them.
+# TERMALL: the coder is terminated after every coding pass, each pass is a segment of its own. The
+#   decoder finds where any pass starts from the code-block table, and every truncation point is exact.
+# CAUSAL: contexts are formed from the current and previous stripes only, samples of the stripe below
+#   are taken as insignificant. A stripe can be decoded as soon as the stripe above it is, without
+#   waiting for the end of the pass.
+# HT: code-blocks are coded by the high-throughput block coder of fpeg.codec.ht_coder instead of the
+#   EBCOT passes, in a single pass. The other flags do not apply to it.
+#
+# A codeword is split into segments where the coder changes, and after every pass with TERMALL. Every
+# segment is terminated, MQ coded segments start with fresh registers but keep the context states, and
+# the length of every segment is recorded in the code-block table so the decoder can find them.
+
+BYPASS = 1
+TERMALL = 2
+CAUSAL = 4
+HT = 8
+
+# every mode flag, a codestream holding other flags can not be decoded
+MODES = BYPASS | TERMALL | CAUSAL | HT
+
+bypass_planes = 4
+
+
+def segmented(mode):
+	"""
+	Whether codewords of the mode are made of several segments.
+	"""
+	return bool(mode & (BYPASS | TERMALL))
+
+
+def stripe_causal(mode):
+	"""
+	Whether contexts of the mode ignore the stripe below.
+	"""
+	return bool(mode & CAUSAL)
+
+
+def pass_segment(p, mode):
+	"""
+	Segment of the codeword holding coding pass p.
+	"""
+	if mode & TERMALL:
+		return p
+	if not mode & BYPASS or p < 3 * bypass_planes:
+		return 0
+	# a raw segment for the first two passes and an MQ segment for the cleanup pass of every bit-plane
+	plane, kind = divmod(p - 3 * bypass_planes, 3)
+	return 1 + 2 * plane + (kind == 2)
+
+
+def segment_count(passes, mode):
+	"""
+	Number of segments of a codeword holding passes coding passes.
+	"""
+	return pass_segment(passes - 1, mode) + 1 if passes else 0
+
+
+def raw_pass(p, mode):
+	"""
+	Whether coding pass p writes raw bits.
+	"""
+	return bool(mode & BYPASS) and p >= 3 * bypass_planes and p % 3 != 2
+
+
+class CodewordEncoder:
+	"""
+	Encoder of the codeword of a code-block, switching between the MQ encoder and raw bit packers as the coding mode requires.
+
+	begin_pass returns the encoder the next coding pass feeds. Segments are terminated when the pass starts a new one.
+	"""
+
+	__slots__ = ["mode", "mq", "coder", "chunks", "ends", "segment", "nbytes"]
+
+	def __init__(self, mode=0):
+		"""
+		Explicit Attributes
+		-------------------
+		mode: int, optional
+			Coding mode flags.
+		"""
+		self.mode = mode
+		self.mq = MQEncoder()
+		self.coder = self.mq
+		self.chunks = []
+		self.ends = []
+		self.segment = 0
+		self.nbytes = 0
+
+	def begin_pass(self, p):
+		"""
+		Encoder of coding pass p.
+		"""
+		segment = pass_segment(p, self.mode)
+		if segment != self.segment:
+			self._terminate()
+			self.segment = segment
+			if raw_pass(p, self.mode):
+				self.coder = RawEncoder()
+			else:
+				self.mq.restart()
+				self.coder = self.mq
+
+		return self.coder
+
+	def pass_length(self):
+		"""
+		Bytes of the codeword a decoder needs to decode every symbol coded so far, before the current segment is terminated.
+		"""
+		if self.coder is self.mq:
+			return self.nbytes + pass_length(self.mq.L)
+		return self.nbytes + self.coder.length
+
+	def flush(self):
+		"""
+		Terminate the codeword and return it with the end offset of every segment.
+		"""
+		self._terminate()
+		return b"".join(self.chunks), self.ends
+
+	def _terminate(self):
+		chunk = self.coder.flush()
+		self.chunks.append(chunk)
+		self.nbytes += len(chunk)
+		self.ends.append(self.nbytes)
+
+
+class CodewordDecoder:
+	"""
+	Decoder of the codeword of a code-block, the counterpart of CodewordEncoder.
+	"""
+
+	__slots__ = ["mode", "stream", "starts", "mq", "decoder", "segment"]
+
+	def __init__(self, stream, mode=0, segments=None):
+		"""
+		Explicit Attributes
+		-------------------
+		stream: bytes-like
+			Codeword of the code-block, possibly truncated.
+		mode: int, optional
+			Coding mode flags.
+		segments: list of int, optional
+			Length of every segment of the codeword, the whole stream is one segment if not specified.
+		"""
+		self.mode = mode
+		self.stream = stream
+		self.starts = [0]
+		for length in segments or []:
+			self.starts.append(self.starts[-1] + length)
+		self.mq = MQDecoder(self._segment(0))
+		self.decoder = self.mq
+		self.segment = 0
+
+	def begin_pass(self, p):
+		"""
+		Decoder of coding pass p.
+		"""
+		segment = pass_segment(p, self.mode)
+		if segment != self.segment:
+			self.segment = segment
+			if raw_pass(p, self.mode):
+				self.decoder = RawDecoder(self._segment(segment))
+			else:
+				self.mq.restart(self._segment(segment))
+				self.decoder = self.mq
+
+		return self.decoder
+
+	def _segment(self, k):
+		# bytes of segment k, clipped to the stream when the codeword was truncated
+		if k + 1 < len(self.starts):
+			return self.stream[self.starts[k]:self.starts[k + 1]]
+		return self.stream[self.starts[k]:] if k == 0 else b""
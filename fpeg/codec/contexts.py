@@ -0,0 +1,132 @@
+__all__ = [
+	"SIG_W",
+	"SIG_E",
+	"SIG_N",
+	"SIG_S",
+	"NEG_W",
+	"NEG_E",
+	"NEG_N",
+	"NEG_S",
+	"SIG_NW",
+	"SIG_NE",
+	"SIG_SW",
+	"SIG_SE",
+	"SIG_MASK",
+	"ZC_LUT",
+	"SC_LUT",
+	"MR_LUT",
+	"orientation"
+]
+
+import numpy as np
+
+# Layout of the packed neighbourhood word kept for every sample of a code-block:
+# bits 0-3 significance of the west, east, north and south neighbours,
+# bits 4-7 signs (1 for negative) of the same four neighbours,
+# bits 8-11 significance of the north-west, north-east, south-west and south-east neighbours.
+SIG_W = 1 << 0
+SIG_E = 1 << 1
+SIG_N = 1 << 2
+SIG_S = 1 << 3
+NEG_W = 1 << 4
+NEG_E = 1 << 5
+NEG_N = 1 << 6
+NEG_S = 1 << 7
+SIG_NW = 1 << 8
+SIG_NE = 1 << 9
+SIG_SW = 1 << 10
+SIG_SE = 1 << 11
+SIG_MASK = SIG_W | SIG_E | SIG_N | SIG_S | SIG_NW | SIG_NE | SIG_SW | SIG_SE
+
+# Band orientations sharing a zero coding table.
+_orientations = {"LL": 0, "LH": 0, "HL": 1, "HH": 2}
+
+
+def orientation(bandMark):
+	"""
+	Index of the zero coding table used by a subband, 0 for LL and LH, 1 for HL, 2 for HH.
+	"""
+	try:
+		return _orientations[bandMark]
+	except KeyError:
+		raise ValueError("Invalid band mark {}. Should be in {}.".format(bandMark, list(_orientations.keys())))
+
+
+def _zero_context(h, v, d, band):
+	# h, v, d: number of significant horizontal, vertical and diagonal neighbours
+	if band == 1:
+		h, v = v, h
+
+	if band < 2:
+		if h == 2:
+			return 8
+		if h == 1:
+			if v >= 1:
+				return 7
+			return 6 if d >= 1 else 5
+		if v == 2:
+			return 4
+		if v == 1:
+			return 3
+		if d >= 2:
+			return 2
+		return d
+	else:
+		hPlusv = h + v
+		if d >= 3:
+			return 8
+		if d == 2:
+			return 7 if hPlusv >= 1 else 6
+		if d == 1:
+			if hPlusv >= 2:
+				return 5
+			return 4 if hPlusv == 1 else 3
+		if hPlusv >= 2:
+			return 2
+		return hPlusv
+
+
+def _sign_context(word):
+	# contribution of a pair of neighbours: 1 if mostly positive, -1 if mostly negative, 0 otherwise
+	def contribution(sig0, neg0, sig1, neg1):
+		total = 0
+		if word & sig0:
+			total += -1 if word & neg0 else 1
+		if word & sig1:
+			total += -1 if word & neg1 else 1
+		return max(-1, min(1, total))
+
+	h = contribution(SIG_W, NEG_W, SIG_E, NEG_E)
+	v = contribution(SIG_N, NEG_N, SIG_S, NEG_S)
+	if h < 0 or (h == 0 and v < 0):
+		h, v, xorbit = -h, -v, 1
+	else:
+		xorbit = 0
+
+	if h == 0:
+		return 9 + v, xorbit
+	return 12 + v, xorbit
+
+
+def _build_tables():
+	words = np.arange(1 << 12)
+	zc = np.zeros((3, words.size), dtype=np.uint8)
+	sc = np.zeros(words.size, dtype=np.uint8)
+	for word in words.tolist():
+		h = bool(word & SIG_W) + bool(word & SIG_E)
+		v = bool(word & SIG_N) + bool(word & SIG_S)
+		d = bool(word & SIG_NW) + bool(word & SIG_NE) + bool(word & SIG_SW) + bool(word & SIG_SE)
+		for band in range(3):
+			zc[band, word] = _zero_context(h, v, d, band)
+		label, xorbit = _sign_context(word)
+		sc[word] = (label << 1) | xorbit
+
+	# magnitude refinement, indexed by 2 * refined + has significant neighbour
+	mr = np.array([14, 15, 16, 16], dtype=np.uint8)
+
+	return zc, sc, mr
+
+
+# ZC_LUT[orientation, word] is the zero coding label of a sample,
+# SC_LUT[word] is its sign coding label shifted left by one with the sign XOR bit in bit 0.
+ZC_LUT, SC_LUT, MR_LUT = _build_tables()
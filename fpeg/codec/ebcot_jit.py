@@ -0,0 +1,592 @@
+__all__ = [
+	"available",
+	"encode_block",
+	"decode_block"
+]
+
+import numpy as np
+
+from ..config import read_config
+from .bitplane import bitplane_count
+from .coding_modes import BYPASS, TERMALL, CAUSAL, bypass_planes, segment_count
+from .contexts import SIG_W, SIG_E, SIG_N, SIG_S, NEG_W, NEG_E, NEG_N, NEG_S, SIG_NW, SIG_NE, SIG_SW, SIG_SE, SIG_MASK, ZC_LUT, SC_LUT, MR_LUT, orientation
+
+# Compiled tier-1 kernels: the three coding passes, the MQ coder and the raw bit packer of one
+# code-block.
+#
+# The kernels follow the Python implementation in fpeg.codec.EBCOT_codec, fpeg.codec.mq_coder,
+# fpeg.codec.raw_coder and fpeg.codec.coding_modes symbol for symbol, so both backends produce identical codestreams. They are compiled by numba
+# when it is installed and cached on disk, so pool workers load them instead of compiling again.
+# Without numba the module still imports, but available is False and EBCOTCodec keeps using the
+# Python implementation.
+
+try:
+	from numba import njit
+except ImportError:
+	njit = None
+
+available = njit is not None
+
+if available:
+	_jit = njit(cache=True, nogil=True)
+else:
+	def _jit(func):
+		return func
+
+config = read_config()
+
+PETTable, CXTable = config.get("jpeg2000", "mq_table")
+
+# module-level arrays are frozen into the compiled kernels as constants
+_NMPS = np.ascontiguousarray(PETTable[:, 0], dtype=np.int64)
+_NLPS = np.ascontiguousarray(PETTable[:, 1], dtype=np.int64)
+_SWITCH = np.ascontiguousarray(PETTable[:, 2], dtype=np.int64)
+_QE = np.ascontiguousarray(PETTable[:, 3], dtype=np.int64)
+_INITIAL_INDEX = np.array([index for index, _ in CXTable], dtype=np.int64)
+_INITIAL_MPS = np.array([mps for _, mps in CXTable], dtype=np.int64)
+
+_ZC = np.ascontiguousarray(ZC_LUT, dtype=np.int64)
+_SC = np.ascontiguousarray(SC_LUT, dtype=np.int64)
+_MR = np.ascontiguousarray(MR_LUT, dtype=np.int64)
+
+# MQ registers are kept in a small int64 array so the helpers can update them in place. The raw
+# coder keeps its byte in _T_BYTE and its bit count in _T_COUNT. Segments of a codeword share one
+# buffer, _BASE is the offset of the segment being encoded and _END the end of the segment being decoded.
+_A, _C, _T_COUNT, _T_BYTE, _L, _BASE, _END = 0, 1, 2, 3, 4, 5, 6
+
+
+def encode_block(block, bandMark, mode=0):
+	"""
+	Encode a code-block with the compiled kernels in coding mode mode.
+
+	Returns the codeword, the number of bit-planes, the length and distortion reduction of every coding pass, and the end offset of every segment, like the Python encoder does.
+	"""
+	block = np.ascontiguousarray(block, dtype=np.int64)
+	num = bitplane_count(block)
+	lengths = np.zeros(3 * num, dtype=np.int64)
+	distortions = np.zeros(3 * num, dtype=np.int64)
+	ends = np.zeros(max(1, segment_count(3 * num, mode)), dtype=np.int64)
+
+	stream = _encode_block(block, orientation(bandMark), num, lengths, distortions, mode, ends)
+	return stream.tobytes(), num, lengths.tolist(), distortions.tolist(), ends.tolist()
+
+
+def decode_block(stream, bandMark, num, h=64, w=64, passes=None, mode=0, segments=None):
+	"""
+	Decode an h x w code-block of num bit-planes with the compiled kernels, stopping after passes coding passes.
+
+	segments holds the length of every segment of the codeword when mode splits it, the whole stream is one segment otherwise.
+	"""
+	stream = np.frombuffer(bytes(stream), dtype=np.uint8)
+	if passes is None:
+		passes = 3 * num
+
+	# start of every segment and end of the last one, clipped to the stream as the Python decoder does
+	lengths = segments if segments is not None else [stream.size]
+	bounds = np.zeros(segment_count(passes, mode) + 2, dtype=np.int64)
+	for k in range(1, bounds.size):
+		bounds[k] = min(bounds[k - 1] + (lengths[k - 1] if k <= len(lengths) else 0), stream.size)
+
+	return _decode_block(stream, orientation(bandMark), int(num), int(passes), h, w, mode, bounds)
+
+
+@_jit
+def _pass_segment(p, mode):
+	# mirror of fpeg.codec.coding_modes.pass_segment
+	if mode & TERMALL:
+		return p
+	if not mode & BYPASS or p < 3 * bypass_planes:
+		return 0
+	plane = (p - 3 * bypass_planes) // 3
+	return 1 + 2 * plane + (1 if p % 3 == 2 else 0)
+
+
+@_jit
+def _raw_pass(p, mode):
+	# mirror of fpeg.codec.coding_modes.raw_pass
+	return (mode & BYPASS) != 0 and p >= 3 * bypass_planes and p % 3 != 2
+
+
+@_jit
+def _set_significant(significance, context, r, c, negative, causal):
+	# r, c: padded coordinates of the sample
+	# causal: whether the first row of a stripe is kept out of the contexts of the stripe above
+	significance[r, c] = 1
+	above = not (causal and (r - 1) % 4 == 0)
+	if negative:
+		context[r, c + 1] |= SIG_W | NEG_W
+		context[r, c - 1] |= SIG_E | NEG_E
+		context[r + 1, c] |= SIG_N | NEG_N
+		if above:
+			context[r - 1, c] |= SIG_S | NEG_S
+	else:
+		context[r, c + 1] |= SIG_W
+		context[r, c - 1] |= SIG_E
+		context[r + 1, c] |= SIG_N
+		if above:
+			context[r - 1, c] |= SIG_S
+	context[r + 1, c + 1] |= SIG_NW
+	context[r + 1, c - 1] |= SIG_NE
+	if above:
+		context[r - 1, c + 1] |= SIG_SW
+		context[r - 1, c - 1] |= SIG_SE
+
+
+@_jit
+def _put_byte(reg, buffer):
+	if reg[_L] >= 0:
+		at = reg[_BASE] + reg[_L]
+		if at == buffer.size:
+			grown = np.zeros(2 * buffer.size, dtype=np.uint8)
+			grown[:buffer.size] = buffer
+			buffer = grown
+		buffer[at] = reg[_T_BYTE]
+	reg[_L] += 1
+	return buffer
+
+
+@_jit
+def _transfer_byte(reg, buffer):
+	if reg[_T_BYTE] == 0xFF:
+		buffer = _put_byte(reg, buffer)
+		reg[_T_BYTE] = (reg[_C] >> 20) & 0xFF
+		reg[_C] &= 0xFFFFF
+		reg[_T_COUNT] = 7
+	else:
+		if reg[_C] & 0x8000000:
+			reg[_T_BYTE] += 1
+			reg[_C] &= 0x7FFFFFF
+		buffer = _put_byte(reg, buffer)
+		if reg[_T_BYTE] == 0xFF:
+			reg[_T_BYTE] = (reg[_C] >> 20) & 0xFF
+			reg[_C] &= 0xFFFFF
+			reg[_T_COUNT] = 7
+		else:
+			reg[_T_BYTE] = (reg[_C] >> 19) & 0xFF
+			reg[_C] &= 0x7FFFF
+			reg[_T_COUNT] = 8
+	return buffer
+
+
+@_jit
+def _mq_encode(reg, index, mps, buffer, cx, d):
+	k = index[cx]
+	p = _QE[k]
+	A = reg[_A] - p
+	expected = mps[cx]
+	if A < p:
+		expected = 1 - expected
+	if d == expected:
+		reg[_C] += p
+	else:
+		A = p
+
+	if A < 0x8000:
+		if d == mps[cx]:
+			index[cx] = _NMPS[k]
+		else:
+			mps[cx] ^= _SWITCH[k]
+			index[cx] = _NLPS[k]
+		while A < 0x8000:
+			A <<= 1
+			reg[_C] <<= 1
+			reg[_T_COUNT] -= 1
+			if reg[_T_COUNT] == 0:
+				buffer = _transfer_byte(reg, buffer)
+
+	reg[_A] = A
+	return buffer
+
+
+@_jit
+def _mq_flush(reg, buffer):
+	nbits = 27 - 15 - reg[_T_COUNT]
+	reg[_C] <<= reg[_T_COUNT]
+	while nbits > 0:
+		buffer = _transfer_byte(reg, buffer)
+		nbits -= reg[_T_COUNT]
+		reg[_C] <<= reg[_T_COUNT]
+	buffer = _transfer_byte(reg, buffer)
+	return buffer
+
+
+@_jit
+def _raw_encode(reg, buffer, d):
+	reg[_T_COUNT] -= 1
+	reg[_T_BYTE] |= d << reg[_T_COUNT]
+	if reg[_T_COUNT] == 0:
+		buffer = _put_byte(reg, buffer)
+		reg[_T_COUNT] = 7 if reg[_T_BYTE] == 0xFF else 8
+		reg[_T_BYTE] = 0
+	return buffer
+
+
+@_jit
+def _raw_pending(reg, buffer):
+	# whether bits are waiting in the byte of the raw coder
+	full = 7 if reg[_L] > 0 and buffer[reg[_BASE] + reg[_L] - 1] == 0xFF else 8
+	return reg[_T_COUNT] < full
+
+
+@_jit
+def _encode_symbol(reg, index, mps, buffer, cx, d, raw):
+	if raw:
+		return _raw_encode(reg, buffer, d)
+	return _mq_encode(reg, index, mps, buffer, cx, d)
+
+
+@_jit
+def _pass_length(reg, buffer, raw):
+	# bytes of the codeword a decoder needs to decode every symbol coded so far
+	if raw:
+		return reg[_BASE] + reg[_L] + (1 if _raw_pending(reg, buffer) else 0)
+	return reg[_BASE] + max(reg[_L], 0) + 3
+
+
+@_jit
+def _begin_pass(reg, buffer, ends, p, mode, segment):
+	# terminate the current segment and start the next one when pass p starts a new segment
+	# output: buffer and segment of pass p
+	following = _pass_segment(p, mode)
+	if following == segment:
+		return buffer, segment
+	buffer = _end_segment(reg, buffer, ends, segment, _raw_pass(p - 1, mode))
+	if _raw_pass(p, mode):
+		reg[_T_BYTE] = 0
+		reg[_T_COUNT] = 8
+		reg[_L] = 0
+	else:
+		reg[_A] = 0x8000
+		reg[_C] = 0
+		reg[_T_COUNT] = 12
+		reg[_T_BYTE] = 0
+		reg[_L] = -1
+	return buffer, following
+
+
+@_jit
+def _end_segment(reg, buffer, ends, segment, raw):
+	if raw:
+		if _raw_pending(reg, buffer):
+			buffer = _put_byte(reg, buffer)
+	else:
+		buffer = _mq_flush(reg, buffer)
+	reg[_BASE] += reg[_L]
+	ends[segment] = reg[_BASE]
+	return buffer
+
+
+@_jit
+def _error_reduction(a, shift):
+	# squared error reduction of a sample of magnitude a once its 1 bit at bit-plane shift is known
+	e = a - ((a >> (shift + 1)) << (shift + 1))
+	f = e - (1 << shift)
+	return e * e - f * f
+
+
+@_jit
+def _encode_block(block, band, num, lengths, distortions, mode, ends):
+	# lengths, distortions: filled with the length and distortion reduction of every coding pass
+	# ends: filled with the end offset of every segment
+	h, w = block.shape
+	significance = np.zeros((h + 2, w + 2), dtype=np.uint8)
+	refinement = np.zeros((h + 2, w + 2), dtype=np.uint8)
+	coded = np.zeros((h + 2, w + 2), dtype=np.uint8)
+	context = np.zeros((h + 2, w + 2), dtype=np.int64)
+
+	reg = np.array([0x8000, 0, 12, 0, -1, 0, 0], dtype=np.int64)
+	index = _INITIAL_INDEX.copy()
+	mps = _INITIAL_MPS.copy()
+	buffer = np.zeros(1024, dtype=np.uint8)
+	segment = 0
+	causal = (mode & CAUSAL) != 0
+
+	for p in range(num):
+		shift = num - 1 - p
+
+		# significance propagation pass
+		buffer, segment = _begin_pass(reg, buffer, ends, 3 * p, mode, segment)
+		raw = _raw_pass(3 * p, mode)
+		for top in range(0, h, 4):
+			for c in range(w):
+				for r in range(top, min(top + 4, h)):
+					if significance[r + 1, c + 1]:
+						continue
+					word = context[r + 1, c + 1]
+					if not word & SIG_MASK:
+						continue
+					bit = (abs(block[r, c]) >> shift) & 1
+					buffer = _encode_symbol(reg, index, mps, buffer, _ZC[band, word], bit, raw)
+					coded[r + 1, c + 1] = 1
+					if bit:
+						negative = 1 if block[r, c] < 0 else 0
+						entry = _SC[word]
+						buffer = _encode_symbol(reg, index, mps, buffer, entry >> 1, negative ^ (entry & 1), raw)
+						_set_significant(significance, context, r + 1, c + 1, negative, causal)
+						distortions[3 * p] += _error_reduction(abs(block[r, c]), shift)
+		lengths[3 * p] = _pass_length(reg, buffer, raw)
+
+		# magnitude refinement pass
+		buffer, segment = _begin_pass(reg, buffer, ends, 3 * p + 1, mode, segment)
+		raw = _raw_pass(3 * p + 1, mode)
+		for top in range(0, h, 4):
+			for c in range(w):
+				for r in range(top, min(top + 4, h)):
+					if not significance[r + 1, c + 1] or coded[r + 1, c + 1]:
+						continue
+					has_neighbour = 1 if context[r + 1, c + 1] & SIG_MASK else 0
+					bit = (abs(block[r, c]) >> shift) & 1
+					buffer = _encode_symbol(reg, index, mps, buffer, _MR[2 * refinement[r + 1, c + 1] + has_neighbour], bit, raw)
+					refinement[r + 1, c + 1] = 1
+					if bit:
+						distortions[3 * p + 1] += _error_reduction(abs(block[r, c]), shift)
+		lengths[3 * p + 1] = _pass_length(reg, buffer, raw)
+
+		# cleanup pass, always MQ coded
+		buffer, segment = _begin_pass(reg, buffer, ends, 3 * p + 2, mode, segment)
+		for top in range(0, h, 4):
+			for c in range(w):
+				start = top
+				if top + 4 <= h:
+					clean = True
+					for r in range(top, top + 4):
+						if significance[r + 1, c + 1] or coded[r + 1, c + 1] or context[r + 1, c + 1] & SIG_MASK:
+							clean = False
+							break
+					if clean:
+						k = 0
+						while k < 4 and not (abs(block[top + k, c]) >> shift) & 1:
+							k += 1
+						if k == 4:
+							buffer = _mq_encode(reg, index, mps, buffer, 17, 0)
+							continue
+						buffer = _mq_encode(reg, index, mps, buffer, 17, 1)
+						buffer = _mq_encode(reg, index, mps, buffer, 18, k >> 1)
+						buffer = _mq_encode(reg, index, mps, buffer, 18, k & 1)
+						r = top + k
+						negative = 1 if block[r, c] < 0 else 0
+						entry = _SC[context[r + 1, c + 1]]
+						buffer = _mq_encode(reg, index, mps, buffer, entry >> 1, negative ^ (entry & 1))
+						_set_significant(significance, context, r + 1, c + 1, negative, causal)
+						distortions[3 * p + 2] += _error_reduction(abs(block[r, c]), shift)
+						start = r + 1
+				for r in range(start, min(top + 4, h)):
+					if significance[r + 1, c + 1] or coded[r + 1, c + 1]:
+						continue
+					word = context[r + 1, c + 1]
+					bit = (abs(block[r, c]) >> shift) & 1
+					buffer = _mq_encode(reg, index, mps, buffer, _ZC[band, word], bit)
+					if bit:
+						negative = 1 if block[r, c] < 0 else 0
+						entry = _SC[word]
+						buffer = _mq_encode(reg, index, mps, buffer, entry >> 1, negative ^ (entry & 1))
+						_set_significant(significance, context, r + 1, c + 1, negative, causal)
+						distortions[3 * p + 2] += _error_reduction(abs(block[r, c]), shift)
+		lengths[3 * p + 2] = _pass_length(reg, buffer, False)
+
+		coded[:, :] = 0
+
+	buffer = _end_segment(reg, buffer, ends, segment, False)
+	# a terminated segment is all a decoder needs to decode its passes
+	for k in range(lengths.size):
+		lengths[k] = min(lengths[k], ends[_pass_segment(k, mode)])
+	return buffer[:reg[_BASE]].copy()
+
+
+@_jit
+def _fill_lsb(reg, stream):
+	reg[_T_COUNT] = 8
+	if reg[_L] == reg[_END] or (reg[_T_BYTE] == 0xFF and stream[reg[_L]] > 0x8F):
+		reg[_C] += 0xFF
+	else:
+		if reg[_T_BYTE] == 0xFF:
+			reg[_T_COUNT] = 7
+		reg[_T_BYTE] = stream[reg[_L]]
+		reg[_L] += 1
+		reg[_C] += reg[_T_BYTE] << (8 - reg[_T_COUNT])
+
+
+@_jit
+def _mq_decode(reg, index, mps, stream, cx):
+	k = index[cx]
+	p = _QE[k]
+	A = reg[_A] - p
+	expected = mps[cx]
+	if A < p:
+		expected = 1 - expected
+	if ((reg[_C] >> 8) & 0xFFFF) < p:
+		symbol = 1 - expected
+		A = p
+	else:
+		symbol = expected
+		reg[_C] -= p << 8
+
+	if A < 0x8000:
+		if symbol == mps[cx]:
+			index[cx] = _NMPS[k]
+		else:
+			mps[cx] ^= _SWITCH[k]
+			index[cx] = _NLPS[k]
+		while A < 0x8000:
+			if reg[_T_COUNT] == 0:
+				_fill_lsb(reg, stream)
+			A <<= 1
+			reg[_C] = (reg[_C] << 1) & 0xFFFFFFFF
+			reg[_T_COUNT] -= 1
+
+	reg[_A] = A
+	return symbol
+
+
+@_jit
+def _mq_start(reg, stream, start, end):
+	# init the MQ registers from the first bytes of the segment [start, end) of stream
+	reg[_A] = 0
+	reg[_C] = 0
+	reg[_T_COUNT] = 0
+	reg[_T_BYTE] = 0
+	reg[_L] = start
+	reg[_END] = end
+	_fill_lsb(reg, stream)
+	reg[_C] <<= reg[_T_COUNT]
+	_fill_lsb(reg, stream)
+	reg[_C] <<= 7
+	reg[_T_COUNT] -= 7
+	reg[_A] = 0x8000
+
+
+@_jit
+def _raw_decode(reg, stream):
+	if reg[_T_COUNT] == 0:
+		reg[_T_COUNT] = 7 if reg[_T_BYTE] == 0xFF else 8
+		reg[_T_BYTE] = stream[reg[_L]] if reg[_L] < reg[_END] else 0
+		reg[_L] += 1
+	reg[_T_COUNT] -= 1
+	return (reg[_T_BYTE] >> reg[_T_COUNT]) & 1
+
+
+@_jit
+def _decode_symbol(reg, index, mps, stream, cx, raw):
+	if raw:
+		return _raw_decode(reg, stream)
+	return _mq_decode(reg, index, mps, stream, cx)
+
+
+@_jit
+def _begin_decoding(reg, stream, bounds, p, mode, segment):
+	# move to the segment of pass p when it starts a new one
+	# output: segment of pass p
+	following = _pass_segment(p, mode)
+	if following == segment:
+		return segment
+	if _raw_pass(p, mode):
+		reg[_T_BYTE] = 0
+		reg[_T_COUNT] = 0
+		reg[_L] = bounds[following]
+		reg[_END] = bounds[following + 1]
+	else:
+		_mq_start(reg, stream, bounds[following], bounds[following + 1])
+	return following
+
+
+@_jit
+def _decode_block(stream, band, num, passes, h, w, mode, bounds):
+	# passes: number of coding passes in stream, the passes after them are skipped
+	# bounds: start of every segment of stream and end of the last one
+	significance = np.zeros((h + 2, w + 2), dtype=np.uint8)
+	refinement = np.zeros((h + 2, w + 2), dtype=np.uint8)
+	coded = np.zeros((h + 2, w + 2), dtype=np.uint8)
+	context = np.zeros((h + 2, w + 2), dtype=np.int64)
+	magnitude = np.zeros((h, w), dtype=np.int64)
+	negatives = np.zeros((h, w), dtype=np.uint8)
+
+	reg = np.zeros(7, dtype=np.int64)
+	index = _INITIAL_INDEX.copy()
+	mps = _INITIAL_MPS.copy()
+	_mq_start(reg, stream, bounds[0], bounds[1])
+	segment = 0
+	causal = (mode & CAUSAL) != 0
+
+	for p in range(num):
+		bit_value = 1 << (num - 1 - p)
+		if 3 * p >= passes:
+			break
+
+		# significance propagation pass
+		segment = _begin_decoding(reg, stream, bounds, 3 * p, mode, segment)
+		raw = _raw_pass(3 * p, mode)
+		for top in range(0, h, 4):
+			for c in range(w):
+				for r in range(top, min(top + 4, h)):
+					if significance[r + 1, c + 1]:
+						continue
+					word = context[r + 1, c + 1]
+					if not word & SIG_MASK:
+						continue
+					coded[r + 1, c + 1] = 1
+					if _decode_symbol(reg, index, mps, stream, _ZC[band, word], raw):
+						entry = _SC[word]
+						negative = _decode_symbol(reg, index, mps, stream, entry >> 1, raw) ^ (entry & 1)
+						magnitude[r, c] |= bit_value
+						negatives[r, c] = negative
+						_set_significant(significance, context, r + 1, c + 1, negative, causal)
+		if 3 * p + 1 >= passes:
+			break
+
+		# magnitude refinement pass
+		segment = _begin_decoding(reg, stream, bounds, 3 * p + 1, mode, segment)
+		raw = _raw_pass(3 * p + 1, mode)
+		for top in range(0, h, 4):
+			for c in range(w):
+				for r in range(top, min(top + 4, h)):
+					if not significance[r + 1, c + 1] or coded[r + 1, c + 1]:
+						continue
+					has_neighbour = 1 if context[r + 1, c + 1] & SIG_MASK else 0
+					if _decode_symbol(reg, index, mps, stream, _MR[2 * refinement[r + 1, c + 1] + has_neighbour], raw):
+						magnitude[r, c] |= bit_value
+					refinement[r + 1, c + 1] = 1
+		if 3 * p + 2 >= passes:
+			break
+
+		# cleanup pass
+		segment = _begin_decoding(reg, stream, bounds, 3 * p + 2, mode, segment)
+		for top in range(0, h, 4):
+			for c in range(w):
+				start = top
+				if top + 4 <= h:
+					clean = True
+					for r in range(top, top + 4):
+						if significance[r + 1, c + 1] or coded[r + 1, c + 1] or context[r + 1, c + 1] & SIG_MASK:
+							clean = False
+							break
+					if clean:
+						if not _mq_decode(reg, index, mps, stream, 17):
+							continue
+						k = _mq_decode(reg, index, mps, stream, 18) << 1
+						k |= _mq_decode(reg, index, mps, stream, 18)
+						r = top + k
+						entry = _SC[context[r + 1, c + 1]]
+						negative = _mq_decode(reg, index, mps, stream, entry >> 1) ^ (entry & 1)
+						magnitude[r, c] |= bit_value
+						negatives[r, c] = negative
+						_set_significant(significance, context, r + 1, c + 1, negative, causal)
+						start = r + 1
+				for r in range(start, min(top + 4, h)):
+					if significance[r + 1, c + 1] or coded[r + 1, c + 1]:
+						continue
+					word = context[r + 1, c + 1]
+					if _mq_decode(reg, index, mps, stream, _ZC[band, word]):
+						entry = _SC[word]
+						negative = _mq_decode(reg, index, mps, stream, entry >> 1) ^ (entry & 1)
+						magnitude[r, c] |= bit_value
+						negatives[r, c] = negative
+						_set_significant(significance, context, r + 1, c + 1, negative, causal)
+
+		coded[:, :] = 0
+
+	out = magnitude.copy()
+	for r in range(h):
+		for c in range(w):
+			if negatives[r, c]:
+				out[r, c] = -magnitude[r, c]
+	return out
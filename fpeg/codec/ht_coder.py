@@ -0,0 +1,149 @@
+__all__ = [
+	"encode_block",
+	"decode_block"
+]
+
+import numpy as np
+
+from .bitplane import bitplane_count
+
+# High-throughput block coder, in the style of the HT block coder of JPEG2000 part 15 (HTJ2K).
+#
+# Instead of three passes per bit-plane driving an adaptive arithmetic coder, a code-block is coded
+# in a single cleanup pass over quads of 2x2 samples, with variable-length codes only:
+#
+# exponents     the magnitude exponent U of every quad, the bit length of its largest magnitude, is
+#               predicted by the largest exponent of the three quads above it, or by the quad on its
+#               left in the first row of quads. The zigzag mapped residual is written with an
+#               Exp-Golomb code, the unary prefixes of all quads first and their suffixes next.
+# significance  which samples of every significant quad (U > 0) are nonzero: a bit per quad telling
+#               whether they all are, the most frequent pattern by far, then 4 bits per other quad.
+# magnitudes    U bits of magnitude and a sign bit per nonzero sample (MagSgn).
+#
+# Every field has a length known from the fields before it, so the decoder parses every field of a
+# stream at once with NumPy, only the exponent prediction runs row of quads after row of quads.
+# Samples of a quad are taken column after column, quads row after row. The codeword can not be
+# truncated, it is a single coding pass.
+
+
+def encode_block(block):
+	"""
+	Encode a code-block with the high-throughput coder.
+
+	Returns the codeword, the number of bit-planes, the length and distortion reduction of its single coding pass, and the end of its single segment, like the EBCOT encoders do.
+	"""
+	block = np.asarray(block, dtype=np.int64)
+	magnitude = np.abs(block)
+	quads = _quads(magnitude)
+	signs = _quads((block < 0).astype(np.int64))
+	exponents = _bit_lengths(quads)
+	U = exponents.max(axis=2)
+
+	# Exp-Golomb codes of the zigzag mapped residuals
+	residual = U - _prediction(U)
+	codes = np.where(residual >= 0, 2 * residual, -2 * residual - 1).ravel() + 1
+	lengths = _bit_lengths(codes)
+
+	significant = U.ravel() > 0
+	flags = (exponents > 0).reshape(-1, 4)[significant]
+	rho = flags @ np.array([8, 4, 2, 1], dtype=np.int64)
+	full = (rho == 15).astype(np.int64)
+	rho = rho[full == 0]
+	nonzero = flags.astype(bool)
+	widths = np.repeat(U.ravel()[significant], 4).reshape(-1, 4)[nonzero]
+	magsgn = (quads.reshape(-1, 4)[significant][nonzero] << 1) | signs.reshape(-1, 4)[significant][nonzero]
+
+	stream = _pack_fields(np.concatenate([np.ones_like(codes), codes, full, rho, magsgn]),
+												np.concatenate([lengths, lengths - 1, np.ones_like(full), np.full(rho.size, 4), widths + 1]))
+	return stream, bitplane_count(block), [len(stream)], [int(np.sum(magnitude * magnitude))], [len(stream)]
+
+
+def decode_block(stream, h=64, w=64):
+	"""
+	Decode an h x w code-block coded by encode_block.
+	"""
+	bits = np.unpackbits(np.frombuffer(bytes(stream), dtype=np.uint8)).astype(np.int64)
+	rows, cols = -(-h // 2), -(-w // 2)
+
+	# unary prefixes end at the first rows * cols 1 bits
+	ends = np.flatnonzero(bits)[:rows * cols]
+	lengths = np.diff(ends, prepend=-1)
+	suffixes, offset = _unpack_fields(bits, ends[-1] + 1, lengths - 1)
+	codes = (1 << (lengths - 1)) + suffixes - 1
+	residual = np.where(codes & 1, -((codes + 1) >> 1), codes >> 1).reshape(rows, cols)
+	U = _exponent_rows(residual)
+
+	significant = U.ravel() > 0
+	full, offset = _unpack_fields(bits, offset, np.ones(int(significant.sum()), dtype=np.int64))
+	rho = np.full(full.size, 15)
+	rho[full == 0], offset = _unpack_fields(bits, offset, np.full(int(full.size - full.sum()), 4))
+	nonzero = ((rho[:, np.newaxis] >> np.array([3, 2, 1, 0])) & 1).astype(bool)
+	widths = np.repeat(U.ravel()[significant], 4).reshape(-1, 4)[nonzero]
+	magsgn, _ = _unpack_fields(bits, offset, widths + 1)
+
+	samples = np.zeros((rows * cols, 4), dtype=np.int64)
+	values = samples[significant]
+	values[nonzero] = np.where(magsgn & 1, -(magsgn >> 1), magsgn >> 1)
+	samples[significant] = values
+	return _samples(samples.reshape(rows, cols, 4), h, w)
+
+
+def _quads(X):
+	# (rows, cols, 4) samples of the 2x2 quads of X, zero padded to even sizes, column after column
+	h, w = X.shape
+	padded = np.zeros((h + h % 2, w + w % 2), dtype=np.int64)
+	padded[:h, :w] = X
+	return padded.reshape(padded.shape[0] // 2, 2, padded.shape[1] // 2, 2).transpose(0, 2, 3, 1).reshape(padded.shape[0] // 2, padded.shape[1] // 2, 4)
+
+
+def _samples(quads, h, w):
+	# inverse of _quads, cropped to h x w
+	rows, cols, _ = quads.shape
+	return quads.reshape(rows, cols, 2, 2).transpose(0, 3, 1, 2).reshape(2 * rows, 2 * cols)[:h, :w]
+
+
+def _bit_lengths(X):
+	# bit length of every nonnegative integer of X, exact below 2 ** 53
+	return np.frexp(X.astype(np.float64))[1].astype(np.int64)
+
+
+def _prediction(U):
+	# predicted exponent of every quad: largest exponent of the three quads above, the quad on the left in the first row
+	prediction = np.zeros_like(U)
+	prediction[0, 1:] = U[0, :-1]
+	if U.shape[0] > 1:
+		above = np.pad(U[:-1], ((0, 0), (1, 1)))
+		prediction[1:] = np.maximum(np.maximum(above[:, :-2], above[:, 1:-1]), above[:, 2:])
+	return prediction
+
+
+def _exponent_rows(residual):
+	# exponents from their residuals, the inverse of residual = U - _prediction(U)
+	U = np.zeros_like(residual)
+	U[0] = np.cumsum(residual[0])
+	for i in range(1, U.shape[0]):
+		above = np.pad(U[i - 1], 1)
+		U[i] = np.maximum(np.maximum(above[:-2], above[1:-1]), above[2:]) + residual[i]
+	return U
+
+
+def _pack_fields(values, widths):
+	# bytes of the low widths[k] bits of every values[k], most significant bit first, zero padded
+	index = np.repeat(np.arange(values.size), widths)
+	starts = np.cumsum(widths) - widths
+	shifts = widths[index] - 1 - (np.arange(index.size) - starts[index])
+	return np.packbits((values[index] >> shifts) & 1).tobytes()
+
+
+def _unpack_fields(bits, offset, widths):
+	# integers of the widths[k] bits fields starting at bit offset, and the offset after them
+	total = int(widths.sum())
+	chunk = bits[offset:offset + total]
+	if chunk.size < total:
+		# bits past the end of a damaged codeword read as 0
+		chunk = np.concatenate([chunk, np.zeros(total - chunk.size, dtype=np.int64)])
+	index = np.repeat(np.arange(widths.size), widths)
+	ends = np.cumsum(widths)
+	shifts = ends[index] - 1 - np.arange(total)
+	sums = np.concatenate([[0], np.cumsum(chunk << shifts)])
+	return sums[ends] - sums[ends - widths], offset + total
@@ -1,5 +1,3 @@
-from multiprocessing import Pool
-
 from ..base import Codec
 from ..config import read_config
 from ..utils.lut import dht2lut
@@ -37,7 +35,7 @@ class HuffmanCodec(Codec):
     dhts: list of lists, optional
       DHTs that store huffman trees for encoding and decoding.
     accelerated: bool, optional
-      Whether the process would be accelerated by subprocess pool.
+      Whether the process would be accelerated by the executor of the codec.
 
     Implicit Attributes
     -------------------
@@ -77,19 +75,11 @@ class HuffmanCodec(Codec):
         self.logs[-1] += self.formatter.error(msg)
         raise KeyError(msg)
 
-    if self.accelerated:
-      self.logs[-1] += self.formatter.message("Using multiprocess pool to accelerate encoding.")
-      if use_lut:
-        inputs = [[x, lut] for x, lut in zip(X, self.luts)]
-      else:
-        inputs = [[x, []] for x in X]
-      with Pool(min(self.task_number, self.max_pool_size)) as p:
-        X = p.starmap(_encode, inputs)
+    if self.use_lut:
+      inputs = [[x, lut] for x, lut in zip(X, self.luts)]
     else:
-      if self.use_lut:
-        X = [_encode(x, lut) for x, lut in zip(X, self.luts)]
-      else:
-        X = [_encode(x, []) for x in X]
+      inputs = [[x, []] for x in X]
+    X = self.starmap(_encode, inputs)
 
     return X
 
@@ -103,13 +93,7 @@ class HuffmanCodec(Codec):
       self.logs[-1] += self.formatter.error(msg)
       raise KeyError(msg)
     
-    if self.accelerated:
-      self.logs[-1] += self.formatter.message("Using multiprocess pool to accelerate decoding.")
-      inputs = [[x, lut] for x, lut in zip(X, self.luts)]
-      with Pool(min(self.task_number, self.max_pool_size)) as p:
-        X = p.map(_decode, inputs)
-    else:
-      X = [_decode(x, lut) for x, lut in zip(X, self.luts)]
+    X = self.starmap(_decode, [[x, lut] for x, lut in zip(X, self.luts)])
 
     return X
 
@@ -0,0 +1,241 @@
+__all__ = [
+	"MQEncoder",
+	"MQDecoder"
+]
+
+from ..config import read_config
+
+config = read_config()
+
+PETTable, CXTable = config.get("jpeg2000", "mq_table")
+
+# Probability estimation table as tuples of plain ints, indexing tuples is much cheaper than indexing ndarrays.
+_nmps = tuple(int(x) for x in PETTable[:, 0])
+_nlps = tuple(int(x) for x in PETTable[:, 1])
+_switch = tuple(int(x) for x in PETTable[:, 2])
+_qe = tuple(int(x) for x in PETTable[:, 3])
+
+# Initial state index and MPS of every context label.
+_initial_index = tuple(int(index) for index, _ in CXTable)
+_initial_mps = tuple(int(mps) for _, mps in CXTable)
+
+
+class MQEncoder:
+	"""
+	MQ arithmetic encoder.
+
+	Symbols are fed one at a time through encode(cx, d), so the coding passes can drive the encoder directly. Bytes are written into a preallocated bytearray that only grows by doubling, which keeps the cost linear in the number of symbols.
+
+	Registers (see Taubman and Marcellin, JPEG2000, section 12.1)
+	-------------------------------------------------------------
+	A: interval length
+	C: lower bound register
+	t: down-counter of bits left before the next byte transfer
+	T: temporary byte buffer
+	L: number of bytes written, starts at -1 since the first transferred byte is a dummy
+	"""
+
+	__slots__ = ["A", "C", "t", "T", "L", "buffer", "index", "mps"]
+
+	def __init__(self, capacity=1024):
+		"""
+		Init the registers and the context states of a code-block.
+
+		Explicit Attributes
+		-------------------
+		capacity: int, optional
+			Initial size of the output buffer in bytes.
+		"""
+		self.A = 0x8000
+		self.C = 0
+		self.t = 12
+		self.T = 0
+		self.L = -1
+		self.buffer = bytearray(max(1, capacity))
+		self.index = list(_initial_index)
+		self.mps = list(_initial_mps)
+
+	def encode(self, cx, d):
+		"""
+		Encode binary decision d in context cx.
+		"""
+		index = self.index[cx]
+		p = _qe[index]
+		A = self.A - p
+		expected = self.mps[cx]
+		if A < p:
+			# conditional exchange of MPS and LPS
+			expected = 1 - expected
+		if d == expected:
+			# assign the upper sub-interval
+			self.C += p
+		else:
+			# assign the lower sub-interval
+			A = p
+
+		if A < 0x8000:
+			if d == self.mps[cx]:
+				self.index[cx] = _nmps[index]
+			else:
+				self.mps[cx] ^= _switch[index]
+				self.index[cx] = _nlps[index]
+
+			C, t = self.C, self.t
+			while A < 0x8000:
+				A <<= 1
+				C <<= 1
+				t -= 1
+				if t == 0:
+					self.C = C
+					self._transfer_byte()
+					C, t = self.C, self.t
+			self.C, self.t = C, t
+
+		self.A = A
+
+	def flush(self):
+		"""
+		Terminate the codeword and return the coded bytes.
+		"""
+		nbits = 27 - 15 - self.t
+		self.C <<= self.t
+		while nbits > 0:
+			self._transfer_byte()
+			nbits -= self.t
+			self.C <<= self.t
+		self._transfer_byte()
+
+		return bytes(memoryview(self.buffer)[:self.L])
+
+	def restart(self):
+		"""
+		Reset the registers to code a new segment after flush. Context states are kept.
+		"""
+		self.A = 0x8000
+		self.C = 0
+		self.t = 12
+		self.T = 0
+		self.L = -1
+
+	@property
+	def length(self):
+		"""
+		Number of bytes written so far.
+		"""
+		return max(0, self.L)
+
+	def _transfer_byte(self):
+		if self.T == 0xFF:
+			# no carry can propagate into T, stuff a bit instead
+			self._put_byte()
+			self.T = (self.C >> 20) & 0xFF
+			self.C &= 0xFFFFF
+			self.t = 7
+		else:
+			# propagate any carry from C into T
+			if self.C & 0x8000000:
+				self.T += 1
+				self.C &= 0x7FFFFFF
+			self._put_byte()
+			if self.T == 0xFF:
+				self.T = (self.C >> 20) & 0xFF
+				self.C &= 0xFFFFF
+				self.t = 7
+			else:
+				self.T = (self.C >> 19) & 0xFF
+				self.C &= 0x7FFFF
+				self.t = 8
+
+	def _put_byte(self):
+		if self.L >= 0:
+			if self.L == len(self.buffer):
+				self.buffer.extend(bytes(len(self.buffer)))
+			self.buffer[self.L] = self.T
+		self.L += 1
+
+
+class MQDecoder:
+	"""
+	MQ arithmetic decoder, the counterpart of MQEncoder.
+
+	Symbols are pulled one at a time through decode(cx). Reading past the end of the stream feeds 1 bits, as the standard requires.
+	"""
+
+	__slots__ = ["A", "C", "t", "T", "L", "stream", "index", "mps"]
+
+	def __init__(self, stream):
+		"""
+		Init the registers from the first bytes of stream.
+
+		Explicit Attributes
+		-------------------
+		stream: bytes-like
+			Coded bytes of a code-block.
+		"""
+		self.index = list(_initial_index)
+		self.mps = list(_initial_mps)
+		self.restart(stream)
+
+	def restart(self, stream):
+		"""
+		Init the registers from the first bytes of the next segment of a codeword. Context states are kept.
+		"""
+		if not isinstance(stream, (bytes, bytearray, memoryview)):
+			stream = bytes(stream)
+		self.stream = stream
+		self.A = 0
+		self.C = 0
+		self.t = 0
+		self.T = 0
+		self.L = 0
+		self._fill_lsb()
+		self.C <<= self.t
+		self._fill_lsb()
+		self.C <<= 7
+		self.t -= 7
+		self.A = 0x8000
+
+	def decode(self, cx):
+		"""
+		Decode the binary decision coded in context cx.
+		"""
+		index = self.index[cx]
+		p = _qe[index]
+		A = self.A - p
+		expected = self.mps[cx]
+		if A < p:
+			expected = 1 - expected
+		if ((self.C >> 8) & 0xFFFF) < p:
+			symbol = 1 - expected
+			A = p
+		else:
+			symbol = expected
+			self.C -= p << 8
+
+		if A < 0x8000:
+			if symbol == self.mps[cx]:
+				self.index[cx] = _nmps[index]
+			else:
+				self.mps[cx] ^= _switch[index]
+				self.index[cx] = _nlps[index]
+
+			while A < 0x8000:
+				if self.t == 0:
+					self._fill_lsb()
+				A <<= 1
+				self.C = (self.C << 1) & 0xFFFFFFFF
+				self.t -= 1
+
+		self.A = A
+		return symbol
+
+	def _fill_lsb(self):
+		self.t = 8
+		if self.L == len(self.stream) or (self.T == 0xFF and self.stream[self.L] > 0x8F):
+			self.C += 0xFF
+		else:
+			if self.T == 0xFF:
+				self.t = 7
+			self.T = self.stream[self.L]
+			self.L += 1
+			self.C += self.T << (8 - self.t)
@@ -0,0 +1,112 @@
+__all__ = [
+	"scan_index",
+	"scan_order",
+	"stripe_columns",
+	"propagation_candidates",
+	"refinement_members",
+	"cleanup_members",
+	"run_length_columns"
+]
+
+import numpy as np
+
+from .contexts import SIG_MASK
+
+# Membership masks of the three coding passes, computed for a whole bit-plane at once.
+#
+# The passes visit samples in stripe-column order: stripes of four rows from top to bottom,
+# columns from left to right inside a stripe, and rows from top to bottom inside a column.
+# Masks computed here are exact or supersets of the members of a pass, so the passes only
+# visit the positions returned by scan_order and re-check the few conditions that can change
+# while the pass runs.
+
+
+def scan_index(row, col, w):
+	"""
+	Position of sample (row, col) of a w-wide code-block in stripe-column order.
+	"""
+	return 4 * w * (row // 4) + 4 * col + row % 4
+
+
+def _stripes(mask):
+	# view an (h, w) mask as (stripes, w, 4), incomplete stripes are padded with False
+	h, w = mask.shape
+	pad = -h % 4
+	if pad:
+		mask = np.concatenate([mask, np.zeros((pad, w), dtype=bool)])
+
+	return mask.reshape(-1, 4, w).transpose(0, 2, 1)
+
+
+def scan_order(mask):
+	"""
+	Rows and columns of the true samples of mask, in stripe-column order.
+	"""
+	stripe, col, ii = np.nonzero(_stripes(mask))
+	return (4 * stripe + ii).tolist(), col.tolist()
+
+
+def stripe_columns(mask):
+	"""
+	First rows and columns of the stripe columns holding at least one true sample of mask, in scan order.
+	"""
+	stripe, col = np.nonzero(_stripes(mask).any(axis=2))
+	return (4 * stripe).tolist(), col.tolist()
+
+
+def _dilate(mask):
+	# true where any of the 8 neighbours is true, a 3x3 boolean convolution without the centre
+	h, w = mask.shape
+	padded = np.zeros((h + 2, w + 2), dtype=bool)
+	padded[1:-1, 1:-1] = mask
+	out = np.zeros((h, w), dtype=bool)
+	for dr in range(3):
+		for dc in range(3):
+			if dr != 1 or dc != 1:
+				out |= padded[dr:dr + h, dc:dc + w]
+
+	return out
+
+
+def _has_significant_neighbour(state):
+	return (state.context[1:-1, 1:-1] & SIG_MASK) != 0
+
+
+def propagation_candidates(state, plane=None):
+	"""
+	Superset of the members of the significance propagation pass of a bit-plane.
+
+	A sample is a member if it is insignificant and has a significant neighbour when it is visited. Neighbours only become significant during the pass if they are insignificant with a 1 in this plane, so with the plane known the superset is tight. Without it (decoder side) only the members known before the pass starts are returned.
+	"""
+	insignificant = state.significance[1:-1, 1:-1] == 0
+	candidates = _has_significant_neighbour(state)
+	if plane is not None:
+		candidates |= _dilate(insignificant & (plane != 0))
+
+	return insignificant & candidates
+
+
+def refinement_members(state):
+	"""
+	Members of the magnitude refinement pass, significant samples not coded in the current plane.
+	"""
+	inner = (slice(1, -1), slice(1, -1))
+	return (state.significance[inner] != 0) & (state.coded[inner] == 0)
+
+
+def cleanup_members(state):
+	"""
+	Members of the cleanup pass, insignificant samples not coded in the current plane.
+	"""
+	inner = (slice(1, -1), slice(1, -1))
+	return (state.significance[inner] == 0) & (state.coded[inner] == 0)
+
+
+def run_length_columns(state, members):
+	"""
+	Stripe columns of the cleanup pass that qualify for run-length mode when the pass starts, indexed by (stripe, col).
+
+	Qualification can only be lost while the pass runs, so the pass re-checks these columns when it reaches them.
+	"""
+	clean = members & ~_has_significant_neighbour(state)
+	return _stripes(clean).all(axis=2)
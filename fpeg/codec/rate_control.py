@@ -0,0 +1,145 @@
+__all__ = [
+	"pass_length",
+	"error_reduction",
+	"truncation_points",
+	"pcrd_layers",
+	"layer_budgets",
+	"band_weights"
+]
+
+# Post-compression rate-distortion optimization (PCRD-opt, see Taubman and Marcellin, JPEG2000,
+# section 8.2).
+#
+# While a code-block is coded, the encoder records after every coding pass the number of bytes a
+# decoder needs to decode the codeword up to that pass, and the reduction of the squared error the
+# pass brings. Distortion is measured on the quantized coefficients with the reconstruction of the
+# decoder, a sample decoded down to bit-plane b takes the value of its bits above b. It is then weighted
+# by the energy one unit of quantized coefficient of the subband brings to the image, the square of the
+# quantization step times the norm of the synthesis basis of the subband (see band_weights), so that the
+# distortions of code-blocks of different levels and orientations are compared in the image domain.
+#
+# Once every code-block is coded, the codewords are truncated so that the codestream fits a byte
+# budget with the smallest total distortion. Only the passes on the convex hull of the
+# rate-distortion curve of a code-block are candidate truncation points, and passes are taken
+# across all code-blocks by decreasing distortion-rate slope. Quality layers repeat the selection
+# for increasing budgets, each layer adding the passes that pay off best on top of the layers below.
+
+
+def pass_length(L):
+	"""
+	Bytes of a codeword needed to decode it up to the current pass, L being the number of bytes the MQ encoder has written.
+
+	The registers of the encoder still hold up to three bytes of the interval, which the decoder needs to tell the last symbols apart.
+	"""
+	return max(0, L) + 3
+
+
+def error_reduction(magnitude, shift):
+	"""
+	Squared error reduction of samples of the given magnitudes once their 1 bit at bit-plane shift is known, magnitude being an int or an integer ndarray.
+	"""
+	e = magnitude - ((magnitude >> (shift + 1)) << (shift + 1))
+	f = e - (1 << shift)
+	return e * e - f * f
+
+
+def truncation_points(lengths, distortions):
+	"""
+	Feasible truncation points of a code-block, the passes on the convex hull of its rate-distortion curve.
+
+	Parameters
+	----------
+	lengths: list of int
+		Bytes needed to decode the codeword up to every pass, non decreasing.
+	distortions: list of number
+		Distortion reduction of every pass.
+
+	Returns
+	-------
+	points: list of tuple
+		(passes, length, slope) of every truncation point by increasing number of passes. Slopes are strictly decreasing.
+	"""
+	points = []
+	distortion = 0
+	for passes, (length, d) in enumerate(zip(lengths, distortions), 1):
+		distortion += d
+		while True:
+			_, last_length, last_distortion, last_slope = points[-1] if points else (0, 0, 0, float("inf"))
+			if distortion <= last_distortion:
+				break
+			slope = (distortion - last_distortion) / (length - last_length) if length > last_length else float("inf")
+			if points and slope >= last_slope:
+				# the last point lies below the chord to this one
+				points.pop()
+				continue
+			points.append((passes, length, distortion, slope))
+			break
+
+	return [(passes, length, slope) for passes, length, _, slope in points]
+
+
+def pcrd_layers(blocks, budgets):
+	"""
+	Number of passes of every code-block in each quality layer, the layers fitting increasing byte budgets.
+
+	Every layer is optimal for its budget given the passes already in the layers below it, so the passes of a code-block only grow from layer to layer.
+
+	Parameters
+	----------
+	blocks: list of tuple
+		(lengths, distortions) of every code-block, see truncation_points.
+	budgets: list of int
+		Bytes available to the codewords of all code-blocks up to every layer, non decreasing.
+
+	Returns
+	-------
+	passes: list of list of int
+		Cumulative number of passes of every code-block, for every layer.
+	"""
+	segments = []
+	for k, (lengths, distortions) in enumerate(blocks):
+		previous = 0
+		for passes, length, slope in truncation_points(lengths, distortions):
+			segments.append((-slope, k, passes, length - previous))
+			previous = length
+	# steepest first, and within a code-block the hull slopes decrease so its points come in order
+	segments.sort(key=lambda segment: segment[0])
+
+	kept = [0] * len(blocks)
+	layers = []
+	spent = 0
+	for budget in budgets:
+		closed = [False] * len(blocks)
+		for _, k, passes, size in segments:
+			if closed[k] or passes <= kept[k]:
+				continue
+			if spent + size > budget:
+				# later points of this code-block only cost more bytes
+				closed[k] = True
+				continue
+			spent += size
+			kept[k] = passes
+		layers.append(list(kept))
+
+	return layers
+
+
+def band_weights(norms, steps):
+	"""
+	Weights of the squared error of the subbands of a tile, (step * norm) ** 2 for every subband.
+
+	Parameters
+	----------
+	norms: list of float
+		Norm of the synthesis basis function of every subband, see fpeg.transformer.lifting.synthesis_norms.
+	steps: list of float
+		Quantization step of every subband, see fpeg.utils.quantify.step_sizes.
+	"""
+	return [(step * norm) ** 2 for norm, step in zip(norms, steps)]
+
+
+def layer_budgets(budget, layers):
+	"""
+	Byte budgets of quality layers up to budget, each layer doubling the bytes of the layer below it.
+	"""
+	return [budget >> (layers - 1 - l) for l in range(layers)]
@@ -0,0 +1,95 @@
+__all__ = [
+	"RawEncoder",
+	"RawDecoder"
+]
+
+
+class RawEncoder:
+	"""
+	Bit packer writing binary decisions as they are, used in place of the MQ encoder by the passes of the bypass mode.
+
+	encode(cx, d) takes a context label like MQEncoder.encode so the coding passes drive both encoders alike, the label is ignored. Bits are packed most significant first. A byte following a 0xFF byte only holds 7 bits and starts with a 0 bit, so that no two bytes of a segment read as a marker.
+
+	Registers
+	---------
+	T: byte being filled
+	t: number of bits left in T
+	L: number of bytes written
+	"""
+
+	__slots__ = ["T", "t", "L", "buffer"]
+
+	def __init__(self):
+		self.T = 0
+		self.t = 8
+		self.L = 0
+		self.buffer = bytearray()
+
+	def encode(self, cx, d):
+		"""
+		Write bit d, cx is ignored.
+		"""
+		self.t -= 1
+		self.T |= d << self.t
+		if self.t == 0:
+			self.buffer.append(self.T)
+			self.t = 7 if self.T == 0xFF else 8
+			self.T = 0
+			self.L += 1
+
+	def flush(self):
+		"""
+		Terminate the segment, padding the last byte with 0 bits, and return the coded bytes.
+		"""
+		if self.pending:
+			self.buffer.append(self.T)
+			self.L += 1
+			self.T = 0
+			self.t = 8
+
+		return bytes(self.buffer)
+
+	@property
+	def pending(self):
+		"""
+		Whether bits are waiting in T.
+		"""
+		return self.t < (7 if self.L and self.buffer[-1] == 0xFF else 8)
+
+	@property
+	def length(self):
+		"""
+		Number of bytes a decoder needs to read every bit written so far.
+		"""
+		return self.L + self.pending
+
+
+class RawDecoder:
+	"""
+	Reader of the bits written by RawEncoder. Reading past the end of the segment yields 0 bits.
+	"""
+
+	__slots__ = ["T", "t", "L", "stream"]
+
+	def __init__(self, stream):
+		"""
+		Explicit Attributes
+		-------------------
+		stream: bytes-like
+			Coded bytes of the segment.
+		"""
+		self.stream = stream
+		self.T = 0
+		self.t = 0
+		self.L = 0
+
+	def decode(self, cx):
+		"""
+		Read the next bit, cx is ignored.
+		"""
+		if self.t == 0:
+			self.t = 7 if self.T == 0xFF else 8
+			self.T = self.stream[self.L] if self.L < len(self.stream) else 0
+			self.L += 1
+		self.t -= 1
+		return (self.T >> self.t) & 1
@@ -0,0 +1,187 @@
+__all__ = [
+  "Executor",
+  "SerialExecutor",
+  "ThreadExecutor",
+  "ProcessExecutor",
+  "shared_executor",
+  "shutdown_executors"
+]
+
+import atexit
+import os
+from importlib import import_module
+from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
+
+from .config import read_config
+
+if os.name == "posix":
+  from multiprocessing import resource_tracker
+else:
+  resource_tracker = None
+
+
+config = read_config()
+
+codec_max_pool_size = config.get("accelerate", "codec_max_pool_size")
+transformer_max_pool_size = config.get("accelerate", "transformer_max_pool_size")
+
+# Modules imported by every worker process as soon as it starts, so the first tasks do not pay for them.
+preload_modules = [
+  "numpy",
+  "pywt",
+  "fpeg.codec.EBCOT_codec",
+  "fpeg.codec.ebcot_jit",
+  "fpeg.utils.quantify",
+  "fpeg.transformer.dw_transformer"
+]
+
+
+class Executor:
+  """
+  Base executor class.
+
+  An executor runs independent tasks for pipes. Executors are persistent: workers are started once and reused by every call until the executor is closed.
+  """
+
+  kind = None
+
+  def __init__(self, size=1):
+    self.size = size
+
+  def starmap(self, func, iterable, chunksize=1):
+    """
+    Return [func(*args) for args in iterable], in order.
+    """
+    raise NotImplementedError
+
+  def close(self):
+    """
+    Stop the workers of the executor.
+    """
+    pass
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    self.close()
+
+  def __repr__(self):
+    return self.__class__.__name__ + " with " + str(self.size) + " worker(s)"
+
+
+class SerialExecutor(Executor):
+  """
+  Executor running every task in the calling thread.
+  """
+
+  kind = "serial"
+
+  def __init__(self, size=None):
+    super().__init__(1)
+
+  def starmap(self, func, iterable, chunksize=1):
+    return [func(*args) for args in iterable]
+
+
+class ThreadExecutor(Executor):
+  """
+  Executor backed by a thread pool, suited to NumPy-bound tasks that release the GIL.
+  """
+
+  kind = "thread"
+
+  def __init__(self, size=None):
+    if size is None:
+      size = _default_size(transformer_max_pool_size)
+    super().__init__(size)
+    self.pool = ThreadPool(size)
+
+  def starmap(self, func, iterable, chunksize=1):
+    return self.pool.starmap(func, iterable, chunksize)
+
+  def close(self):
+    self.pool.close()
+    self.pool.join()
+
+
+class ProcessExecutor(Executor):
+  """
+  Executor backed by a persistent process pool.
+
+  Workers are started when the executor is created and import preload_modules right away. Functions and arguments sent to the workers must be picklable.
+  """
+
+  kind = "process"
+
+  def __init__(self, size=None, preload=preload_modules):
+    if size is None:
+      size = _default_size(codec_max_pool_size)
+    super().__init__(size)
+    # workers must share the resource tracker of this process, so shared memory they attach to
+    # (see fpeg.transport) is only ever unlinked by its owner
+    if resource_tracker is not None:
+      resource_tracker.ensure_running()
+    self.pool = Pool(size, initializer=_preload, initargs=(list(preload),))
+
+  def starmap(self, func, iterable, chunksize=1):
+    return self.pool.starmap(func, iterable, chunksize)
+
+  def close(self):
+    self.pool.terminate()
+    self.pool.join()
+
+
+executor_classes = {
+  "serial": SerialExecutor,
+  "thread": ThreadExecutor,
+  "process": ProcessExecutor
+}
+
+_shared = {}
+
+
+def shared_executor(kind, size=None):
+  """
+  Return the executor of the given kind shared by every pipe of the process, creating it on first use.
+
+  size is only used when the executor is created, it defaults to the number of cpus capped by the "accelerate" config section.
+  """
+  if kind not in executor_classes:
+    raise ValueError("Invalid executor kind \'{}\'. Should be in {}.".format(kind, list(executor_classes.keys())))
+
+  if kind not in _shared:
+    if size is not None:
+      size = _default_size(size)
+    _shared[kind] = executor_classes[kind](size)
+
+  return _shared[kind]
+
+
+def shutdown_executors():
+  """
+  Close every shared executor.
+  """
+  while _shared:
+    _, executor = _shared.popitem()
+    executor.close()
+
+
+atexit.register(shutdown_executors)
+
+
+def _default_size(max_size):
+  size = os.cpu_count() or 1
+  if max_size:
+    size = min(size, max_size)
+
+  return max(1, size)
+
+
+def _preload(modules):
+  for module in modules:
+    try:
+      import_module(module)
+    except ImportError:
+      pass
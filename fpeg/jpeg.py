@@ -25,7 +25,7 @@ def jpeg2000_compress(args):
                           "spliter0": {"tile_shape": args.tile_shape},
                           "dw transformer0": {"mode": "forward", "lossy": True, "D": args.level},
                           "quantizer0": {"mode": "quantify", "irreversible": True, "D": args.level},
-                          "ebcot codec0": {"mode": "encode", "accelerated": args.accelerated, "tile_shape": args.tile_shape},
+                          "ebcot codec0": {"mode": "encode", "irreversible": True, "accelerated": args.accelerated, "tile_shape": args.tile_shape},
                           "writer0": {"path": args.output, "binary": True}
                         })
   else:
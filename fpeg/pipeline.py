@@ -1,5 +1,6 @@
 from .base import *
 from .config import read_config
+from .executor import Executor, shared_executor
 from .monitor import Monitor
 from .format import Formatter
 
@@ -20,9 +21,12 @@ class Pipeline:
                params={},
                testers={},
                monitor=Monitor(),
-               formatter=Formatter(fmt=time_format)):
+               formatter=Formatter(fmt=time_format),
+               executor=None):
     """
     Init pipeline.
+
+    executor is an fpeg.executor.Executor or a kind in ["serial", "thread", "process"] shared by every accelerated pipe. If not specified, each pipe uses the shared executor of its own kind, so the workers are still created once and reused.
     """
     self.steps = steps
 
@@ -31,6 +35,9 @@ class Pipeline:
     self.testers = testers
     self.monitor = monitor
     self.formatter = formatter
+    if executor is not None and not isinstance(executor, Executor):
+      executor = shared_executor(executor)
+    self.executor = executor
 
     self.names = []
     self.pipes = []
@@ -79,6 +86,7 @@ class Pipeline:
     
     self._set_pipe_params()
     self._check()
+    self._prewarm()
 
   def _set_pipe_params(self):
     for i in range(len(self.names)):
@@ -89,9 +97,21 @@ class Pipeline:
                                "formatter": self.formatter
                                })
 
+    if self.executor is not None:
+      for pipe in self.pipes:
+        pipe.set_params(executor=self.executor)
+
     # Now pipes' attributes are setted.
     self.setted = True
 
+  def _prewarm(self):
+    """
+    Start the executors of accelerated pipes now rather than on the first image.
+    """
+    for pipe in self.pipes:
+      if getattr(pipe, "accelerated", False):
+        pipe.get_executor()
+
   def _check(self):
     """
     Check whether the connection of pipes is legal.
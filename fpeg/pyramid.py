@@ -0,0 +1,162 @@
+__all__ = [
+  "SubbandPyramid",
+  "as_pyramid"
+]
+
+import numpy as np
+
+
+class SubbandPyramid:
+  """
+  Wavelet coefficients of a tile, every subband of every component in one contiguous buffer.
+
+  The buffer has a row per component (component-planar layout), each row holding the subbands of the component one after the other in codestream order: LL, then the (LH, HL, HH) subbands of every level, coarsest first. band(k) is a zero-copy (component, height, width) view of subband k of every component, band(k)[c] a contiguous 2D view of one of them.
+
+  A pyramid also reads like the nested tile format [LL, (LH, HL, HH), ...] with (height, width, component) views, pyramid[0] being LL and pyramid[i] the subbands of the i-th level from the coarsest, so code written for that format keeps working.
+
+  Pickling a pyramid sends its buffer and the shapes of its subbands only.
+  """
+
+  __slots__ = ["shapes", "offsets", "buffer"]
+
+  def __init__(self, shapes, dtype=np.float64, buffer=None, components=3):
+    """
+    Explicit Attributes
+    -------------------
+    shapes: list of tuple of int
+      Height and width of every subband of a component, in codestream order.
+    dtype: data-type, optional
+      Type of the coefficients of a new buffer.
+    buffer: ndarray, optional
+      (component, coefficient) array holding the coefficients, a new zeroed buffer if not specified.
+    components: int, optional
+      Number of components of a new buffer.
+
+    Implicit Attributes
+    -------------------
+    offsets: tuple of int
+      Position of every subband in the row of a component, followed by the length of the row.
+    """
+    self.shapes = tuple((int(h), int(w)) for h, w in shapes)
+    self.offsets = tuple(np.cumsum([0] + [h * w for h, w in self.shapes]).tolist())
+    if buffer is None:
+      buffer = np.zeros((components, self.offsets[-1]), dtype=dtype)
+    self.buffer = buffer
+
+  @classmethod
+  def from_bands(cls, bands, dtype=None):
+    """
+    Pyramid holding a copy of bands, (component, height, width) arrays in codestream order.
+    """
+    bands = [np.asarray(band) for band in bands]
+    if dtype is None:
+      dtype = np.result_type(*bands)
+    pyramid = cls([band.shape[1:] for band in bands], dtype, components=bands[0].shape[0])
+    for k, band in enumerate(bands):
+      pyramid.band(k)[...] = band
+    return pyramid
+
+  @classmethod
+  def from_tile(cls, tile, dtype=None):
+    """
+    Pyramid holding a copy of a tile in the nested format [LL, (LH, HL, HH), ...].
+    """
+    bands = [tile[0]] + [band for level in tile[1:] for band in level]
+    return cls.from_bands([np.moveaxis(np.asarray(band), -1, 0) for band in bands], dtype)
+
+  @property
+  def levels(self):
+    """
+    Number of decomposition levels.
+    """
+    return (len(self.shapes) - 1) // 3
+
+  @property
+  def components(self):
+    """
+    Number of components.
+    """
+    return self.buffer.shape[0]
+
+  @property
+  def dtype(self):
+    """
+    Type of the coefficients.
+    """
+    return self.buffer.dtype
+
+  def band(self, k):
+    """
+    (component, height, width) view of subband k.
+    """
+    h, w = self.shapes[k]
+    return self.buffer[:, self.offsets[k]:self.offsets[k + 1]].reshape(self.buffer.shape[0], h, w)
+
+  def bands(self):
+    """
+    Views of every subband, in codestream order.
+    """
+    return [self.band(k) for k in range(len(self.shapes))]
+
+  def coarsest(self, levels):
+    """
+    Pyramid of the levels coarsest levels, a view of the first subbands of every component.
+    """
+    n = 3 * levels + 1
+    return SubbandPyramid(self.shapes[:n], buffer=self.buffer[:, :self.offsets[n]])
+
+  def is_flat(self):
+    """
+    Whether the LL subband of every component is constant and every other subband is zero, as for an image of constant components.
+    """
+    LL = self.band(0)
+    return bool(np.all(LL == LL[:, :1, :1])) and not np.any(self.buffer[:, self.offsets[1]:])
+
+  def like(self, dtype=None):
+    """
+    Zeroed pyramid of the same subbands.
+    """
+    return SubbandPyramid(self.shapes, self.dtype if dtype is None else dtype, components=self.components)
+
+  def band_values(self, values):
+    """
+    Row of a component holding values[k] at every coefficient of subband k, to broadcast against the buffer.
+    """
+    return np.repeat(np.asarray(values), np.diff(self.offsets))
+
+  def copy(self):
+    """
+    Pyramid holding a copy of the buffer.
+    """
+    return SubbandPyramid(self.shapes, buffer=self.buffer.copy())
+
+  def __len__(self):
+    return self.levels + 1
+
+  def __getitem__(self, i):
+    if isinstance(i, slice):
+      return [self[j] for j in range(len(self))[i]]
+    i = range(len(self))[i]
+    if not i:
+      return np.moveaxis(self.band(0), 0, -1)
+    return tuple(np.moveaxis(self.band(k), 0, -1) for k in range(3 * i - 2, 3 * i + 1))
+
+  def __iter__(self):
+    return (self[i] for i in range(len(self)))
+
+  def __reduce__(self):
+    return SubbandPyramid, (self.shapes, None, np.ascontiguousarray(self.buffer))
+
+  def __repr__(self):
+    return "SubbandPyramid(levels={}, components={}, dtype={})".format(self.levels, self.components, self.dtype)
+
+
+def as_pyramid(tile, dtype=None):
+  """
+  tile as a SubbandPyramid, tile itself if it already is one of type dtype.
+  """
+  if isinstance(tile, SubbandPyramid):
+    if dtype is None or tile.dtype == dtype:
+      return tile
+    return SubbandPyramid(tile.shapes, buffer=tile.buffer.astype(dtype))
+  return SubbandPyramid.from_tile(tile, dtype)
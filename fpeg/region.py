@@ -0,0 +1,144 @@
+__all__ = [
+  "decode_region"
+]
+
+import numpy as np
+
+from .config import read_config
+from .codec import EBCOTCodec
+from .codec.codestream import index_codestream
+from .transformer import DWTransformer
+from .transformer.lifting import wavelets
+from .utils import Quantizer
+
+
+config = read_config()
+
+tile_shape = config.get("jpeg2000", "tile_shape")
+QCD = config.get("jpeg2000", "QCD")
+delta_vb = config.get("jpeg2000", "delta_vb")
+
+
+def decode_region(codestream, shape, x0, y0, x1, y1, reduce=0, *,
+                  tile_shape=tile_shape,
+                  index=None,
+                  lossy=True,
+                  QCD=QCD,
+                  delta_vb=delta_vb,
+                  max_layers=None,
+                  backend="python"):
+  """
+  Decode the window [y0, y1) x [x0, x1) of an image without decoding the whole codestream.
+
+  Only the tiles overlapping the window are visited. In each of them, the code-blocks whose coefficients reach the window through the synthesis filters are decoded, and the inverse DWT runs on those coefficients only. The window is returned as the EBCOT codec, quantizer, DWT transformer and spliter of a decoding pipeline would yield it, before the color transform: float64 samples when lossy, int64 ones otherwise.
+
+  Parameters
+  ----------
+  codestream: bytes-like
+    Container produced by EBCOTCodec.
+  shape: tuple of int
+    Height and width of the image, the container does not record them.
+  x0, y0, x1, y1: int
+    Columns [x0, x1) and rows [y0, y1) of the window, in pixels of the full resolution image.
+  reduce: int, optional
+    Number of finest decomposition levels to skip, the window is then returned 2^reduce times smaller, covering pixels [y0 >> reduce, ceil(y1 / 2^reduce)) of the reduced image.
+  tile_shape: tuple of int, optional
+    Shape of the tiles the image was split into.
+  index: CodestreamIndex, optional
+    Table of contents of codestream, read with index_codestream if not specified.
+  lossy: bool, optional
+    Whether the image was coded with the irreversible quantizer and the lossy wavelet.
+  QCD, delta_vb: optional
+    Parameters of the irreversible quantizer.
+  max_layers: int, optional
+    Number of quality layers to decode, every layer if not specified.
+  backend: str, optional
+    Implementation of the block coder, must in ["python", "jit"].
+  """
+  view = memoryview(codestream).cast("B")
+  if index is None:
+    index = index_codestream(view)
+
+  height, width = shape[:2]
+  if not (0 <= x0 < x1 <= width and 0 <= y0 < y1 <= height):
+    raise ValueError("Invalid region ({}, {}, {}, {}) of a {}x{} image.".format(x0, y0, x1, y1, height, width))
+  if not 0 <= reduce <= index.D:
+    raise ValueError("Invalid reduce {}. Should be in [0, {}], the depth of the codestream.".format(reduce, index.D))
+
+  rows, cols = -(-height // tile_shape[0]), -(-width // tile_shape[1])
+  n_tiles = int(index.bands["tile"].max()) + 1 if index.bands.size else 0
+  if rows * cols != n_tiles:
+    raise ValueError("Invalid shape {}, tiles of shape {} do not match the {} tiles of the codestream.".format(shape, tile_shape, n_tiles))
+
+  # the pipes of a decoding pipeline, their code-block, dequantization and synthesis steps run on the window only
+  codec = EBCOTCodec(mode="decode", max_layers=max_layers, backend=backend)
+  quantizer = Quantizer(mode="dequantify", irreversible=lossy, D=index.D, QCD=QCD, delta_vb=delta_vb)
+  transformer = DWTransformer(mode="backward", lossy=lossy, D=index.D, reduce=reduce)
+
+  # window in pixels of the reduced image
+  top, left = y0 >> reduce, x0 >> reduce
+  bottom, right = -(-y1 >> reduce), -(-x1 >> reduce)
+  out = np.zeros((bottom - top, right - left, 3), dtype=np.float64 if lossy else np.int64)
+  for i in range(y0 // tile_shape[0], (y1 - 1) // tile_shape[0] + 1):
+    for j in range(x0 // tile_shape[1], (x1 - 1) // tile_shape[1] + 1):
+      ty, tx = i * tile_shape[0], j * tile_shape[1]
+      size = (min(tile_shape[0], height - ty), min(tile_shape[1], width - tx))
+      # part of the window in the tile, relative to the reduced tile
+      origin = (ty >> reduce, tx >> reduce)
+      span = ((max(top, origin[0]) - origin[0], min(bottom, -(-(ty + size[0]) >> reduce)) - origin[0]),
+              (max(left, origin[1]) - origin[1], min(right, -(-(tx + size[1]) >> reduce)) - origin[1]))
+      window = _tile_region(view, index, i * cols + j, size, span, codec, quantizer, transformer)
+      out[origin[0] + span[0][0] - top:origin[0] + span[0][1] - top,
+          origin[1] + span[1][0] - left:origin[1] + span[1][1] - left] = window
+
+  return out
+
+
+def _tile_region(view, index, tile, size, span, codec, quantizer, transformer):
+  # decode rows span[0] and columns span[1] of a tile reduced transformer.reduce times
+  D, reduce = index.D, transformer.reduce
+  first = int(np.searchsorted(index.bands["tile"], tile))
+
+  # size of the approximation at every level, the tile itself at level 0, every level keeping the
+  # lowpass half of the samples rounded up
+  sizes = [tuple(-(-n >> level) for n in size) for level in range(D + 1)]
+
+  # window of every level from reduce to D, each one holding the support of the synthesis filters
+  # over the window of the level above it
+  steps = len(wavelets[transformer.wavelet][0])
+  spans = [span]
+  for level in range(reduce + 1, D + 1):
+    spans.append(tuple(_support(start, stop, steps, n) for (start, stop), n in zip(spans[-1], sizes[level])))
+
+  # coefficients of the windows in the tile format, levels coarsest first
+  coeffs = [_band_window(codec, view, index, first, 0, spans[-1])]
+  for level in range(D, reduce, -1):
+    position = 3 * (D - level) + 1
+    coeffs.append(tuple(_band_window(codec, view, index, first, position + k, spans[level - reduce]) for k in range(3)))
+  coeffs = quantizer.dequantize(coeffs)
+
+  approx = coeffs[0]
+  for level, details in zip(range(D, reduce, -1), coeffs[1:]):
+    # the windows start at the same coefficient in every subband, the synthesis of the first one is
+    # sample twice its position, samples past the support of the window are cropped
+    (top, _), (left, _) = spans[level - reduce]
+    rec = transformer.synthesize(approx, details)
+    (start0, stop0), (start1, stop1) = spans[level - 1 - reduce]
+    approx = rec[start0 - 2 * top:stop0 - 2 * top, start1 - 2 * left:stop1 - 2 * left]
+
+  return transformer.rescale(approx)
+
+
+def _support(start, stop, steps, n):
+  # coefficients [start, stop) of a level needed to synthesize samples [start, stop) of the level above it,
+  # a lifting scheme of k steps making sample i depend on lowpass coefficient j for |i - 2j| < k and
+  # highpass coefficient j for |i - 2j - 1| <= k
+  return max(0, -(-(start - 1 - steps) // 2)), min(n, (stop - 2 + steps) // 2 + 1)
+
+
+def _band_window(codec, view, index, first, position, span):
+  # decode the three components of a band over rows span[0] and columns span[1], first being the
+  # first band of the tile in the table of contents
+  per_component = 3 * index.D + 1
+  return np.stack([codec.decode_window(view, index, first + component * per_component + position, *span)
+                   for component in range(3)], axis=-1)
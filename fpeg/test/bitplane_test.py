@@ -0,0 +1,25 @@
+import numpy as np
+
+from fpeg.codec.bitplane import bitplane_count, bitplane_decompose, bitplane_compose
+
+
+def test_bitplanes_of_signed_ragged_blocks_roundtrip():
+  rng = np.random.default_rng(0)
+  for shape in [(5, 7), (1, 3), (6, 1), (0, 4), (2, 3, 5)]:
+    X = rng.integers(-300, 300, shape)
+    signs, planes, num = bitplane_decompose(X)
+    assert num == bitplane_count(X)
+    assert planes.shape == (num,) + X.shape and signs.shape == X.shape
+    assert np.array_equal(signs, X < 0)
+    assert np.array_equal(bitplane_compose(signs, planes), X)
+
+  # most significant plane first, and more planes than needed pad with leading zero planes
+  signs, planes, num = bitplane_decompose(np.array([[5, -6], [0, 1]]), num=4)
+  assert num == 4
+  assert planes[:, 0, 0].tolist() == [0, 1, 0, 1] and planes[:, 0, 1].tolist() == [0, 1, 1, 0]
+  assert signs.tolist() == [[0, 1], [0, 0]]
+  assert bitplane_compose(signs, planes).tolist() == [[5, -6], [0, 1]]
+
+  # all-zero blocks still get one plane
+  assert bitplane_count(np.zeros((3, 3), dtype=np.int64)) == 1
+  assert bitplane_count(np.array([-8])) == 4
@@ -0,0 +1,23 @@
+from fpeg.codec.block_scheduler import longest_first, run_scheduled
+from fpeg.executor import ThreadExecutor
+
+
+def test_longest_tasks_come_first():
+  assert longest_first([3, 9, 0, 9, 5]) == [1, 3, 4, 0, 2]
+  assert longest_first([]) == []
+
+
+def test_results_come_back_in_input_order():
+  costs = [1, 4, 2, 8, 4]
+  tasks = [(k, cost) for k, cost in enumerate(costs)]
+  calls = []
+
+  def task(k, cost):
+    calls.append(k)
+    return k * cost
+
+  assert run_scheduled(task, tasks, costs) == [0, 4, 4, 24, 16]
+  assert calls == [3, 1, 4, 2, 0]
+
+  with ThreadExecutor(2) as executor:
+    assert run_scheduled(pow, [(2, k) for k in range(10)], list(range(10)), executor) == [2 ** k for k in range(10)]
@@ -0,0 +1,27 @@
+import numpy as np
+
+from fpeg.codec import EBCOTCodec
+from fpeg.codec.codestream import index_codestream, pack_index, unpack_index
+from fpeg.region import decode_region
+from fpeg.test.helpers import run, laplace_tile
+
+
+def test_sidecar_index_decodes_like_the_codestream_tables():
+  tiles = [laplace_tile(0, D=2, size=64), laplace_tile(1, D=2, size=64)]
+  for modes in [{}, {"termall": True}]:
+    codestream = run(EBCOTCodec(mode="encode", D=2, cb_height=16, cb_width=16, layers=2, **modes), tiles, backend="jit")
+    index = index_codestream(codestream)
+    sidecar = unpack_index(pack_index(index))
+    assert sidecar.flags == index.flags
+    for name in ["bands", "blocks", "segments"]:
+      assert np.array_equal(getattr(sidecar, name), getattr(index, name))
+
+    for params in [{}, {"reduce": 1}, {"max_layers": 1}]:
+      expected = run(EBCOTCodec(mode="decode"), codestream, backend="jit", **params)
+      decoded = run(EBCOTCodec(mode="decode"), codestream, backend="jit", index=sidecar, **params)
+      assert all(np.array_equal(tile.buffer, expected_tile.buffer) for tile, expected_tile in zip(decoded, expected))
+
+    # a window of the lossless image of these coefficients, read with and without the sidecar
+    window = decode_region(codestream, (64, 128), 20, 10, 90, 50, 1, tile_shape=(64, 64), lossy=False, backend="jit")
+    assert np.array_equal(decode_region(codestream, (64, 128), 20, 10, 90, 50, 1, tile_shape=(64, 64), index=sidecar,
+                                        lossy=False, backend="jit"), window)
@@ -0,0 +1,71 @@
+import itertools
+
+from fpeg.codec.contexts import (SIG_W, SIG_E, SIG_N, SIG_S, NEG_W, NEG_E, NEG_N, NEG_S, SIG_NW, SIG_NE, SIG_SW, SIG_SE,
+                                 ZC_LUT, SC_LUT, MR_LUT, orientation)
+
+# Zero coding contexts of ITU-T T.800 table D.1, rows of (h, v, d) with None for any count, the first
+# matching row giving the label. HL subbands take the LL and LH table with h and v swapped.
+zc_rows = [(2, None, None, 8), (1, (1, 2), None, 7), (1, 0, (1, 4), 6), (1, 0, 0, 5), (0, 2, None, 4),
+           (0, 1, None, 3), (0, 0, (2, 4), 2), (0, 0, 1, 1), (0, 0, 0, 0)]
+# HH subbands: rows of (d, h + v)
+zc_diagonal_rows = [((3, 4), None, 8), (2, (1, 4), 7), (2, 0, 6), (1, (2, 4), 5), (1, 1, 4), (1, 0, 3),
+                    (0, (2, 4), 2), (0, 1, 1), (0, 0, 0)]
+# Sign coding contexts of table D.3: (horizontal contribution, vertical contribution) -> (label, XOR bit)
+sc_pairs = {(1, 1): (13, 0), (1, 0): (12, 0), (1, -1): (11, 0), (0, 1): (10, 0), (0, 0): (9, 0),
+            (0, -1): (10, 1), (-1, 1): (11, 1), (-1, 0): (12, 1), (-1, -1): (13, 1)}
+
+
+def _matches(count, condition):
+  if condition is None:
+    return True
+  if isinstance(condition, tuple):
+    return condition[0] <= count <= condition[1]
+  return count == condition
+
+
+def _zc_label(h, v, d, diagonal=False):
+  if diagonal:
+    return next(label for dd, hv, label in zc_diagonal_rows if _matches(d, dd) and _matches(h + v, hv))
+  return next(label for hh, vv, dd, label in zc_rows if _matches(h, hh) and _matches(v, vv) and _matches(d, dd))
+
+
+def _word(states, flags):
+  # neighbourhood word of neighbours in states 0 (insignificant), 1 (positive) or -1 (negative)
+  word = 0
+  for state, (sig, neg) in zip(states, flags):
+    if state:
+      word |= sig | (neg if state < 0 else 0)
+    else:
+      # the sign of an insignificant neighbour is not known, it must not matter
+      word |= neg
+  return word
+
+
+def test_zero_coding_labels_follow_the_standard():
+  assert [orientation(mark) for mark in ["LL", "LH", "HL", "HH"]] == [0, 0, 1, 2]
+  for word in range(1 << 12):
+    h = bool(word & SIG_W) + bool(word & SIG_E)
+    v = bool(word & SIG_N) + bool(word & SIG_S)
+    d = bool(word & SIG_NW) + bool(word & SIG_NE) + bool(word & SIG_SW) + bool(word & SIG_SE)
+    assert ZC_LUT[0, word] == _zc_label(h, v, d)
+    assert ZC_LUT[1, word] == _zc_label(v, h, d)
+    assert ZC_LUT[2, word] == _zc_label(h, v, d, diagonal=True)
+
+  # two horizontal neighbours make the strongest context of LL and LH subbands only, two vertical ones of HL subbands
+  assert [ZC_LUT[band, SIG_W | SIG_E] for band in range(3)] == [8, 4, 2]
+  assert [ZC_LUT[band, SIG_N | SIG_S] for band in range(3)] == [4, 8, 2]
+  assert [ZC_LUT[band, SIG_NW | SIG_NE | SIG_SE] for band in range(3)] == [2, 2, 8]
+
+
+def test_sign_coding_labels_and_xor_bits_follow_the_standard():
+  for west, east, north, south in itertools.product([0, 1, -1], repeat=4):
+    word = _word([west, east, north, south], [(SIG_W, NEG_W), (SIG_E, NEG_E), (SIG_N, NEG_N), (SIG_S, NEG_S)])
+    pair = (max(-1, min(1, west + east)), max(-1, min(1, north + south)))
+    # diagonal neighbours do not take part in sign coding
+    for diagonal in [0, SIG_NW | SIG_SE]:
+      assert (SC_LUT[word | diagonal] >> 1, SC_LUT[word | diagonal] & 1) == sc_pairs[pair]
+
+
+def test_magnitude_refinement_labels_follow_the_standard():
+  # first refinement without and with significant neighbours, then later refinements
+  assert MR_LUT.tolist() == [14, 15, 16, 16]
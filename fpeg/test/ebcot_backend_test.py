@@ -0,0 +1,86 @@
+import numpy as np
+
+from fpeg.codec import EBCOTCodec
+from fpeg.codec.codestream import index_codestream
+from fpeg.codec.coding_modes import HT
+from fpeg.test.helpers import run, laplace_tile as _tile
+
+
+def _run(mode, X, backend, max_layers=None, **params):
+  return run(EBCOTCodec(mode=mode, D=1, **params), X, backend=backend, max_layers=max_layers)
+
+
+def test_backends_produce_identical_codestreams():
+  tiles = [_tile(0), _tile(1)]
+  python_streams = _run("encode", tiles, "python")
+  jit_streams = _run("encode", tiles, "jit")
+  assert python_streams == jit_streams
+
+  python_tiles = _run("decode", python_streams, "python")
+  jit_tiles = _run("decode", jit_streams, "jit")
+  for tile, python_tile, jit_tile in zip(tiles, python_tiles, jit_tiles):
+    assert np.array_equal(python_tile[0], tile[0])
+    assert np.array_equal(jit_tile[0], tile[0])
+    for bands, python_bands, jit_bands in zip(tile[1:], python_tile[1:], jit_tile[1:]):
+      for band, python_band, jit_band in zip(bands, python_bands, jit_bands):
+        assert np.array_equal(python_band, band)
+        assert np.array_equal(jit_band, band)
+
+
+def test_code_blocks_are_clipped_at_subband_edges():
+  # 36 x 36 subbands do not split evenly into 32 x 16 code-blocks
+  tiles = [_tile(2)]
+  streams = _run("encode", tiles, "jit", cb_height=32, cb_width=16)
+  assert streams == _run("encode", tiles, "python", cb_height=32, cb_width=16)
+
+  decoded = _run("decode", streams, "jit")
+  assert np.array_equal(decoded[0][0], tiles[0][0])
+  for bands, decoded_bands in zip(tiles[0][1:], decoded[0][1:]):
+    for band, decoded_band in zip(bands, decoded_bands):
+      assert np.array_equal(decoded_band, band)
+
+
+def test_coding_modes_decode_every_layer_alike_in_both_backends():
+  # coefficients spanning more bit-planes than the MQ coded ones so raw segments are written
+  tile = _tile(3)
+  tiles = [[tile[0] * 300] + [tuple(band * 300 for band in level) for level in tile[1:]]]
+  plain = _run("encode", tiles, "jit", layers=3)
+  for modes in [{"bypass": True}, {"termall": True, "causal": True}, {"bypass": True, "termall": True, "causal": True}]:
+    streams = _run("encode", tiles, "python", layers=3, **modes)
+    assert streams == _run("encode", tiles, "jit", layers=3, **modes)
+    assert streams != plain
+
+    for max_layers in [1, 2, 3]:
+      python_tile = _run("decode", streams, "python", max_layers=max_layers)[0]
+      jit_tile = _run("decode", streams, "jit", max_layers=max_layers)[0]
+      assert np.array_equal(python_tile[0], jit_tile[0])
+      for python_bands, jit_bands in zip(python_tile[1:], jit_tile[1:]):
+        assert all(np.array_equal(python_band, jit_band) for python_band, jit_band in zip(python_bands, jit_bands))
+
+    assert np.array_equal(jit_tile[0], tiles[0][0])
+    for bands, jit_bands in zip(tiles[0][1:], jit_tile[1:]):
+      assert all(np.array_equal(band, jit_band) for band, jit_band in zip(bands, jit_bands))
+
+
+def test_high_throughput_coder_roundtrips_in_the_same_container():
+  tiles = [_tile(4), _tile(5, size=38)]
+  streams = _run("encode", tiles, "python", ht=True, layers=2)
+  assert streams == _run("encode", tiles, "jit", ht=True, layers=2)
+
+  # same header, subband table and code-block grid as the EBCOT codestream, single pass code-blocks
+  index = index_codestream(streams)
+  plain = index_codestream(_run("encode", tiles, "python", layers=2))
+  assert index.flags == HT and plain.flags == 0
+  assert (index.version, index.D, index.cb_height, index.cb_width) == (plain.version, plain.D, plain.cb_height, plain.cb_width)
+  assert np.array_equal(index.bands, plain.bands)
+  assert index.blocks.shape == plain.blocks.shape
+  assert np.array_equal(index.blocks["planes"], plain.blocks["planes"])
+  assert set(index.blocks["passes"][:, -1].tolist()) <= {0, 1}
+  assert np.array_equal(index.blocks["passes"][:, -1] == 0, index.blocks["planes"][:, -1] == 0)
+
+  for backend in ["python", "jit"]:
+    decoded = _run("decode", streams, backend)
+    for tile, decoded_tile in zip(tiles, decoded):
+      assert np.array_equal(decoded_tile[0], tile[0])
+      for bands, decoded_bands in zip(tile[1:], decoded_tile[1:]):
+        assert all(np.array_equal(band, decoded_band) for band, decoded_band in zip(bands, decoded_bands))
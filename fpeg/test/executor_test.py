@@ -0,0 +1,67 @@
+import pytest
+
+from fpeg.codec import EBCOTCodec
+from fpeg.codec.EBCOT_codec import min_task_number
+from fpeg.executor import SerialExecutor, ThreadExecutor, ProcessExecutor, shared_executor
+from fpeg.transformer import DWTransformer
+from fpeg.test.helpers import laplace_tile
+from fpeg.utils import Quantizer
+
+
+def _accelerated(pipe, task_number, **params):
+  pipe.logs.append("")
+  pipe.received_ = [None] * task_number
+  pipe.accelerated = False
+  pipe.min_task_number = 4
+  pipe.accelerate(task_number=task_number, **params)
+  return pipe.accelerated
+
+
+def test_pipes_are_accelerated_from_min_task_number_on():
+  pipe = Quantizer()
+  assert not _accelerated(pipe, 3)
+  assert pipe.get_executor() is None
+  assert _accelerated(pipe, 4)
+  assert _accelerated(pipe, 5)
+
+
+def test_accelerated_param_overrides_the_threshold():
+  pipe = Quantizer()
+  assert not _accelerated(pipe, 5, accelerated=False)
+  assert _accelerated(pipe, 1, accelerated=True)
+  assert not _accelerated(pipe, 1, accelerated=False)
+  assert pipe.get_executor() is None
+
+
+def test_executors_are_selected_by_kind():
+  for kind, cls in [("serial", SerialExecutor), ("thread", ThreadExecutor), ("process", ProcessExecutor)]:
+    executor = shared_executor(kind)
+    assert isinstance(executor, cls) and executor.kind == kind
+    assert shared_executor(kind) is executor
+    assert executor.starmap(divmod, [(7, 2), (9, 4)]) == [(3, 1), (2, 1)]
+  with pytest.raises(ValueError):
+    shared_executor("gpu")
+
+  # codecs default to processes, NumPy-bound pipes to threads, unless an executor is set
+  for pipe, kind in [(EBCOTCodec(), "process"), (DWTransformer(), "thread"), (Quantizer(), "thread")]:
+    assert _accelerated(pipe, 4, accelerated=True)
+    assert pipe.get_executor() is shared_executor(kind)
+    pipe.executor = SerialExecutor()
+    assert pipe.get_executor() is pipe.executor
+
+
+def test_codec_threshold_counts_code_blocks():
+  # one tile of 3 components, 4 subbands and 3 x 3 code-blocks each is 108 tasks
+  codec = EBCOTCodec(mode="encode", D=1, cb_height=16, cb_width=16)
+  codec.executor = SerialExecutor()
+  codec.monitor.prepare()
+  codec.recv([laplace_tile(0, size=72)], backend="python")
+  assert codec.task_number == 108 >= min_task_number and codec.accelerated
+  codestream = codec.send()
+
+  decoder = EBCOTCodec(mode="decode")
+  decoder.executor = SerialExecutor()
+  decoder.monitor.prepare()
+  decoder.recv(codestream, backend="python")
+  assert decoder.task_number == 108 and decoder.accelerated
+  decoder.send()
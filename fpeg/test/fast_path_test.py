@@ -0,0 +1,45 @@
+import numpy as np
+
+from fpeg.codec import EBCOTCodec
+from fpeg.test.helpers import run as _run
+from fpeg.transformer import DWTransformer
+
+
+def _tile(value, size=32):
+  return [np.full((size // 2, size // 2, 3), value, dtype=np.int64),
+          tuple(np.zeros((size // 2, size // 2, 3), dtype=np.int64) for _ in range(3))]
+
+
+def test_flat_tiles_and_zero_blocks_skip_coding():
+  flat = _tile(-7)
+  coded = _tile(3)
+  coded[0][:4, :4] = np.arange(48).reshape(4, 4, 3)
+
+  codec = EBCOTCodec(mode="encode", D=1, cb_height=8, cb_width=8)
+  codestream = _run(codec, [flat, coded])
+  # every code-block of the coded tile but the one holding the LL ramp is constant or zero
+  assert codec.fast_paths == {"flat tiles": 1, "zero blocks": 3 * 3 * 4}
+
+  codec = EBCOTCodec(mode="decode")
+  decoded = _run(codec, codestream)
+  assert codec.fast_paths == {"flat tiles": 1, "zero blocks": 3 * 3 * 4}
+  for tile, decoded_tile in zip([flat, coded], decoded):
+    assert np.array_equal(decoded_tile[0], tile[0])
+    assert all(np.array_equal(band, decoded_band) for band, decoded_band in zip(tile[1], decoded_tile[1]))
+
+  # code-blocks cut down to no coding pass still hold bit-planes, they do not count as all-zero
+  codec = EBCOTCodec(mode="decode")
+  _run(codec, codestream, max_bitplanes=0)
+  assert codec.fast_paths == {"flat tiles": 1, "zero blocks": 3 * 3 * 4}
+
+
+def test_constant_tiles_skip_the_filters():
+  image = np.dstack([np.full((40, 24), value) for value in [7.5, -2.0, 100.0]])
+
+  transformer = DWTransformer(mode="forward", D=2)
+  coeffs = _run(transformer, [image])
+  assert transformer.constant_tiles == 1
+
+  transformer = DWTransformer(mode="backward", D=2)
+  assert np.allclose(_run(transformer, coeffs)[0], image)
+  assert transformer.constant_tiles == 1
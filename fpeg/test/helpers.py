@@ -0,0 +1,23 @@
+import numpy as np
+
+
+def run(pipe, X, **params):
+  # pass X through a pipe in the calling process
+  pipe.monitor.prepare()
+  return pipe.recv(X, accelerated=False, **params).send()
+
+
+def laplace_tile(seed, D=1, size=72):
+  # quantized coefficients of a size x size tile of D levels, Laplace distributed like those of natural images
+  rng = np.random.default_rng(seed)
+  tile = [np.round(rng.laplace(0, 60, (size >> D, size >> D, 3))).astype(np.int64)]
+  for level in range(D, 0, -1):
+    shape = (size >> level, size >> level, 3)
+    tile.append(tuple(np.round(rng.laplace(0, 6, shape)).astype(np.int64) for _ in range(3)))
+
+  return tile
+
+
+def bands(tile):
+  # subbands of a tile in the nested format, LL first
+  return [tile[0]] + [band for level in tile[1:] for band in level]
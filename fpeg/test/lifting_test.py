@@ -0,0 +1,70 @@
+import numpy as np
+import pywt
+
+from fpeg.codec import EBCOTCodec
+from fpeg.test.helpers import run as _run, bands as _bands
+from fpeg.transformer import DWTransformer
+from fpeg.transformer import lifting
+from fpeg.utils import Quantizer, Spliter
+
+
+def test_lifting_matches_pywt():
+  x = np.random.default_rng(0).normal(0, 50, (2, 3, 17, 24))
+  for wavelet, reference in [("5/3", "bior2.2"), ("9/7", "bior4.4")]:
+    # pywt extends the subbands with the coefficients of the symmetric extension of the signal
+    offset = (pywt.Wavelet(reference).dec_len - 2) // 4
+    approx, details = pywt.dwt2(x, reference, mode="reflect", axes=(-2, -1))
+    for band, expected in zip(_bands(lifting.dwt2(x, wavelet)), [approx, *details]):
+      h, w = band.shape[-2:]
+      assert np.allclose(band, expected[..., offset:offset + h, offset:offset + w])
+
+  tiles = [np.random.default_rng(1).normal(0, 50, (45, 38, 3)), np.random.default_rng(2).normal(0, 50, (32, 32, 3))]
+  coeffs = _run(DWTransformer(mode="forward", D=3), tiles, lossy=True)
+  for tile, expected in zip(coeffs, _run(DWTransformer(mode="forward", D=3), tiles, lossy=True, backend="pywt")):
+    assert all(np.allclose(band, expected_band) for band, expected_band in zip(_bands(tile), _bands(expected)))
+  for tile, expected in zip(_run(DWTransformer(mode="backward", D=3), coeffs, lossy=True, backend="pywt"), tiles):
+    assert np.allclose(tile, expected)
+
+
+def test_lifting_roundtrip():
+  for shape in [(3, 1, 7), (3, 2, 3), (4, 3, 33, 20)]:
+    x = np.random.default_rng(shape[-1]).normal(0, 50, shape)
+    for wavelet in ["5/3", "9/7"]:
+      coeffs = lifting.wavedec2(x, wavelet, 2)
+      assert coeffs[0].shape[-2:] == tuple(-(-n // 4) for n in shape[-2:])
+      assert np.allclose(lifting.waverec2(coeffs, wavelet), x)
+
+    x = np.round(x).astype(np.int64)
+    coeffs = lifting.wavedec2(x, "5/3 reversible", 2)
+    assert all(band.dtype == np.int64 for band in _bands(coeffs))
+    assert np.array_equal(lifting.waverec2(coeffs, "5/3 reversible"), x)
+
+
+def test_lossless_pipeline_is_exact():
+  image = np.random.default_rng(3).integers(-128, 128, (80, 72, 3))
+  tiles = _run(Spliter(), [image], tile_shape=(64, 64))
+  tiles = _run(DWTransformer(mode="forward", D=3), tiles, lossy=False)
+  tiles = _run(Quantizer(mode="quantify", D=3), tiles, irreversible=False)
+  codestream = _run(EBCOTCodec(mode="encode", D=3), tiles, backend="jit")
+
+  tiles = _run(EBCOTCodec(mode="decode"), codestream, backend="jit")
+  tiles = _run(Quantizer(mode="dequantify", D=3), tiles, irreversible=False)
+  tiles = _run(DWTransformer(mode="backward", D=3), tiles, lossy=False)
+  decoded = _run(Spliter(mode="recover"), tiles, block_shape=(2, 2))[0]
+  assert decoded.dtype == np.int64
+  assert np.array_equal(decoded, image)
+
+
+def test_synthesis_norms_match_the_energy_of_impulses():
+  for wavelet in ["5/3", "9/7"]:
+    norms = lifting.synthesis_norms(wavelet, 3)
+    for k in range(10):
+      coeffs = _bands(lifting.wavedec2(np.zeros((256, 256)), wavelet, 3))
+      coeffs[k][tuple(n // 2 for n in coeffs[k].shape)] = 1
+      image = lifting.waverec2([coeffs[0]] + [tuple(coeffs[i:i + 3]) for i in range(1, 10, 3)], wavelet)
+      assert np.isclose(np.sqrt(np.sum(image ** 2)), norms[k])
+
+  # the reversible 5/3 is the 5/3 without the scaling of its subbands
+  _, lo, hi = lifting.wavelets["5/3"]
+  gains = [lo ** 6] + [g for level in range(3, 0, -1) for g in [lo ** (2 * level - 1) * hi] * 2 + [lo ** (2 * level - 2) * hi * hi]]
+  assert np.allclose(lifting.synthesis_norms("5/3 reversible", 3), np.abs(gains) * lifting.synthesis_norms("5/3", 3))
@@ -0,0 +1,55 @@
+from fpeg.codec.mq_coder import MQEncoder, MQDecoder
+
+# codeword of _decisions(5) written by the original NumPy MQ encoder, holding two stuffed 0xFF bytes
+golden = bytes.fromhex("b1a37006f325caff317b72aee1831a841fd33bbdcac46f8d6840e43e2d564bfe8cf530f5502abd32117b98c6c83b7a9c65c637e97b9201544a0ced71fda59994c27cddc847fd")
+
+
+def _decisions(seed, n=600):
+  # context labels and decisions of a linear congruential generator, skewed per context so the
+  # states adapt, with a run of 1s to go through the carry and bit stuffing paths
+  cx, d = [], []
+  x = seed
+  for i in range(n):
+    x = (1103515245 * x + 12345) % 2 ** 31
+    c = (x >> 8) % 19
+    x = (1103515245 * x + 12345) % 2 ** 31
+    cx.append(c)
+    d.append(1 if 200 <= i < 260 else int((x >> 8) % 100 < (10 if c % 3 == 0 else 60)))
+  return cx, d
+
+
+def _encode(cx, d):
+  encoder = MQEncoder(capacity=1)
+  for label, decision in zip(cx, d):
+    encoder.encode(label, decision)
+  return encoder.flush()
+
+
+def test_mq_codewords_match_the_golden_bytes():
+  assert _encode(*_decisions(5)) == golden
+
+
+def test_mq_roundtrip():
+  for seed in range(8):
+    cx, d = _decisions(seed)
+    decoder = MQDecoder(_encode(cx, d))
+    assert [decoder.decode(label) for label in cx] == d
+
+  # segments restart the registers and keep the context states
+  cx, d = _decisions(9)
+  encoder = MQEncoder()
+  segments = []
+  for start in range(0, len(cx), 200):
+    if start:
+      encoder.restart()
+    for label, decision in zip(cx[start:start + 200], d[start:start + 200]):
+      encoder.encode(label, decision)
+    segments.append(encoder.flush())
+
+  decoder = MQDecoder(segments[0])
+  decoded = []
+  for k, segment in enumerate(segments):
+    if k:
+      decoder.restart(segment)
+    decoded.extend(decoder.decode(label) for label in cx[200 * k:200 * (k + 1)])
+  assert decoded == d
@@ -0,0 +1,45 @@
+import numpy as np
+
+from fpeg.codec.block_state import CodeBlockState
+from fpeg.codec.pass_engine import (scan_index, scan_order, stripe_columns, propagation_candidates, refinement_members,
+                                    cleanup_members, run_length_columns)
+
+
+def _mask(h, w, samples):
+  mask = np.zeros((h, w), dtype=bool)
+  for row, col in samples:
+    mask[row, col] = True
+  return mask
+
+
+def test_samples_are_scanned_stripe_column_by_stripe_column():
+  # a 6 x 3 block, the second stripe is two rows high
+  rows, cols = scan_order(np.ones((6, 3), dtype=bool))
+  assert list(zip(rows, cols)) == [(0, 0), (1, 0), (2, 0), (3, 0), (0, 1), (1, 1), (2, 1), (3, 1), (0, 2), (1, 2), (2, 2), (3, 2),
+                                   (4, 0), (5, 0), (4, 1), (5, 1), (4, 2), (5, 2)]
+  assert [scan_index(row, col, 3) for row, col in zip(rows, cols)] == list(range(12)) + [12, 13, 16, 17, 20, 21]
+
+  assert scan_order(_mask(6, 3, [(5, 0), (2, 2), (0, 1)])) == ([0, 2, 5], [1, 2, 0])
+  assert stripe_columns(_mask(6, 3, [(5, 2), (1, 0), (3, 0)])) == ([0, 4], [0, 2])
+
+
+def test_pass_members_of_a_hand_built_block():
+  # (1, 1) and (5, 2) are significant, (5, 2) and (0, 0) were coded in this plane already
+  state = CodeBlockState(9, 3)
+  state.set_significant(1, 1)
+  state.set_significant(5, 2, negative=1)
+  state.coded[1 + 5, 1 + 2] = 1
+  state.coded[1 + 0, 1 + 0] = 1
+
+  # insignificant samples next to a significant one, and with the plane known, next to samples about to become significant
+  neighbours = [(0, 0), (0, 1), (0, 2), (1, 0), (1, 2), (2, 0), (2, 1), (2, 2), (4, 1), (5, 1), (6, 1), (6, 2), (4, 2)]
+  assert np.array_equal(propagation_candidates(state), _mask(9, 3, neighbours))
+  plane = _mask(9, 3, [(8, 0)])
+  assert np.array_equal(propagation_candidates(state, plane), _mask(9, 3, neighbours + [(7, 0), (7, 1), (8, 1)]))
+
+  assert np.array_equal(refinement_members(state), _mask(9, 3, [(1, 1)]))
+  members = cleanup_members(state)
+  assert np.array_equal(members, ~_mask(9, 3, [(1, 1), (5, 2), (0, 0)]))
+
+  # only full stripe columns without significant neighbours run-length code, the one-row third stripe never does
+  assert run_length_columns(state, members).tolist() == [[False, False, False], [True, False, False], [False, False, False]]
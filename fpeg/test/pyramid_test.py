@@ -0,0 +1,46 @@
+import pickle
+
+import numpy as np
+
+from fpeg.codec import EBCOTCodec
+from fpeg.pyramid import SubbandPyramid, as_pyramid
+from fpeg.test.helpers import run as _run
+from fpeg.transformer import DWTransformer
+from fpeg.utils import Quantizer
+
+
+def test_pyramid_views_share_the_buffer():
+  tile = [np.arange(24.).reshape(2, 4, 3)] + [tuple(np.full((2, 4, 3), k + 3 * i) for k in range(1, 4)) for i in range(2)]
+  pyramid = SubbandPyramid.from_tile(tile)
+  assert pyramid.levels == 2 and len(pyramid) == 3
+  assert pyramid.buffer.shape == (3, 7 * 8) and pyramid.buffer.flags.c_contiguous
+  assert np.array_equal(pyramid[0], tile[0])
+  assert all(np.array_equal(band, expected) for level, expected_level in zip(pyramid[1:], tile[1:])
+             for band, expected in zip(level, expected_level))
+
+  # every view writes through to the buffer
+  pyramid.band(4)[1] = -1
+  assert np.all(pyramid[2][0][:, :, 1] == -1)
+  assert np.shares_memory(pyramid.coarsest(1).buffer, pyramid.buffer)
+  assert pyramid.band(0)[2].flags.c_contiguous
+
+  restored = pickle.loads(pickle.dumps(pyramid))
+  assert restored.shapes == pyramid.shapes and np.array_equal(restored.buffer, pyramid.buffer)
+  assert as_pyramid(pyramid) is pyramid and as_pyramid(pyramid, np.int64).dtype == np.int64
+
+
+def test_pipes_pass_pyramids():
+  tiles = [np.random.default_rng(0).integers(-128, 128, (45, 38, 3)), np.full((32, 32, 3), 7)]
+  coeffs = _run(DWTransformer(mode="forward", D=3), tiles, lossy=False)
+  assert all(isinstance(tile, SubbandPyramid) for tile in coeffs)
+
+  quantized = _run(Quantizer(mode="quantify", D=3), coeffs, irreversible=False)
+  codestream = _run(EBCOTCodec(mode="encode", D=3), quantized, backend="jit")
+  decoded = _run(EBCOTCodec(mode="decode"), codestream, backend="jit")
+  assert all(isinstance(tile, SubbandPyramid) and np.array_equal(tile.buffer, expected.buffer)
+             for tile, expected in zip(decoded, quantized))
+
+  # the nested tile format is still taken
+  nested = [[tile[0]] + list(tile[1:]) for tile in decoded]
+  for tile, expected in zip(_run(DWTransformer(mode="backward", D=3), nested, lossy=False), tiles):
+    assert np.array_equal(tile, expected)
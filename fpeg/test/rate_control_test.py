@@ -0,0 +1,63 @@
+import os
+
+import cv2
+import numpy as np
+
+from fpeg.codec import EBCOTCodec, EBCOT_codec
+from fpeg.test.helpers import run, laplace_tile as _tile
+from fpeg.transformer import DWTransformer
+from fpeg.utils import Quantizer, Spliter
+
+
+def _run(mode, X, D=1, **params):
+  return run(EBCOTCodec(mode=mode, D=D), X, backend="jit", **params)
+
+
+def _error(tiles, decoded):
+  return sum(np.sum((decoded_tile[0] - tile[0]) ** 2) for tile, decoded_tile in zip(tiles, decoded))
+
+
+def test_codestreams_fit_target_bytes_and_lose_quality_gracefully():
+  tiles = [_tile(0), _tile(1)]
+  full = _run("encode", tiles)
+
+  errors = []
+  for target in [len(full) // 8, len(full) // 4, len(full) // 2]:
+    codestream = _run("encode", tiles, target_bytes=target)
+    assert len(codestream) <= target
+    errors.append(_error(tiles, _run("decode", codestream)))
+
+  assert errors[0] > errors[1] > errors[2] > 0
+  assert _error(tiles, _run("decode", full)) == 0
+
+
+def test_quality_layers_refine_progressively():
+  tiles = [_tile(2)]
+  codestream = _run("encode", tiles, layers=3)
+
+  errors = [_error(tiles, _run("decode", codestream, max_layers=layers)) for layers in [1, 2, 3]]
+  assert errors[0] > errors[1] > errors[2] == 0
+
+
+def _psnr(image, tiles, budget):
+  # PSNR of the lossy image decoded from a codestream of budget bytes
+  codestream = _run("encode", tiles, D=3, irreversible=True, target_bytes=budget)
+  assert len(codestream) <= budget
+  tiles = _run("decode", codestream)
+  tiles = run(Quantizer(mode="dequantify", D=3), tiles, irreversible=True)
+  tiles = run(DWTransformer(mode="backward", D=3), tiles, lossy=True)
+  decoded = run(Spliter(mode="recover"), tiles, block_shape=(4, 4))[0]
+  return 10 * np.log10(255 ** 2 / np.mean((decoded - image) ** 2))
+
+
+def test_weighted_distortions_raise_lossy_psnr(monkeypatch):
+  image = cv2.imread(os.path.join(os.path.dirname(__file__), "penguim.jpg")).astype(np.float64) - 128
+  tiles = run(Spliter(), [image], tile_shape=(64, 64))
+  tiles = run(DWTransformer(mode="forward", D=3), tiles, lossy=True)
+  tiles = run(Quantizer(mode="quantify", D=3), tiles, irreversible=True)
+
+  weighted = [_psnr(image, tiles, budget) for budget in [15000, 25000]]
+  # every subband weighted alike, errors of the quantized coefficients compared as they are
+  monkeypatch.setattr(EBCOT_codec, "band_weights", lambda norms, steps: [1] * len(norms))
+  unweighted = [_psnr(image, tiles, budget) for budget in [15000, 25000]]
+  assert all(w > u + 0.5 for w, u in zip(weighted, unweighted))
@@ -0,0 +1,32 @@
+import numpy as np
+
+from fpeg.codec import EBCOTCodec
+from fpeg.test.helpers import run as _run, laplace_tile
+from fpeg.transformer import DWTransformer
+
+
+def test_reduced_decoding_skips_finest_levels():
+  tiles = [laplace_tile(0, D=2, size=64), laplace_tile(1, D=2, size=64)]
+  codestream = _run(EBCOTCodec(mode="encode", D=2), tiles, backend="jit")
+
+  for reduce in [1, 2]:
+    decoded = _run(EBCOTCodec(mode="decode"), codestream, backend="jit", reduce=reduce)
+    for tile, decoded_tile in zip(tiles, decoded):
+      assert len(decoded_tile) == 3 - reduce
+      assert np.array_equal(decoded_tile[0], tile[0])
+      for level, decoded_level in zip(tile[1:], decoded_tile[1:]):
+        assert all(np.array_equal(band, decoded_band) for band, decoded_band in zip(level, decoded_level))
+
+
+def test_reduced_inverse_transform_halves_images():
+  yy, xx = np.mgrid[0:64, 0:96]
+  image = np.stack([np.sin(xx / 9) * 60 + yy / 2, np.cos(yy / 7) * 50, xx * 1.0], axis=-1)
+  tiles = _run(DWTransformer(mode="forward", D=2), [image])
+
+  for reduce in [1, 2]:
+    reduced = _run(DWTransformer(mode="backward", D=2), tiles, reduce=reduce)[0]
+    f = 2 ** reduce
+    # the lowpass filters are centered on the even samples, every 2^reduce-th sample is the reference
+    expected = image[::f, ::f]
+    assert reduced.shape == expected.shape
+    assert np.abs(reduced - expected).mean() < 1
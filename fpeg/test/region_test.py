@@ -0,0 +1,44 @@
+import numpy as np
+
+from fpeg.codec import EBCOTCodec
+from fpeg.region import decode_region
+from fpeg.test.helpers import run as _run
+from fpeg.transformer import DWTransformer
+from fpeg.utils import Quantizer, Spliter
+
+
+def test_regions_match_full_decoding():
+  yy, xx = np.mgrid[0:96, 0:160]
+  image = np.stack([np.sin(xx / 9) * 60 + yy / 2, np.cos(yy / 7) * 50 + xx * 0.3, (xx * yy) % 50 * 1.0], axis=-1)
+  tiles = _run(Spliter(), [image], tile_shape=(64, 64))
+  tiles = _run(DWTransformer(mode="forward", D=2), tiles, lossy=True)
+  tiles = _run(Quantizer(mode="quantify", D=2), tiles, irreversible=True)
+  codestream = _run(EBCOTCodec(mode="encode", D=2), tiles, backend="jit")
+
+  for reduce in [0, 1, 2]:
+    tiles = _run(EBCOTCodec(mode="decode"), codestream, backend="jit", reduce=reduce)
+    tiles = _run(Quantizer(mode="dequantify", D=2), tiles, irreversible=True)
+    tiles = _run(DWTransformer(mode="backward", D=2), tiles, lossy=True, reduce=reduce)
+    full = _run(Spliter(mode="recover"), tiles, block_shape=(2, 3))[0]
+
+    for x0, y0, x1, y1 in [(50, 20, 90, 70), (63, 63, 65, 65), (130, 70, 160, 96)]:
+      window = decode_region(codestream, image.shape, x0, y0, x1, y1, reduce, tile_shape=(64, 64), backend="jit")
+      assert np.array_equal(window, full[y0 >> reduce:-(-y1 >> reduce), x0 >> reduce:-(-x1 >> reduce)])
+
+
+def test_lossless_regions_are_integers():
+  image = np.random.default_rng(0).integers(-128, 128, (70, 90, 3))
+  tiles = _run(Spliter(), [image], tile_shape=(64, 64))
+  tiles = _run(DWTransformer(mode="forward", D=2), tiles, lossy=False)
+  tiles = _run(Quantizer(mode="quantify", D=2), tiles, irreversible=False)
+  codestream = _run(EBCOTCodec(mode="encode", D=2), tiles, backend="jit")
+
+  for reduce in [0, 1]:
+    tiles = _run(EBCOTCodec(mode="decode"), codestream, backend="jit", reduce=reduce)
+    tiles = _run(Quantizer(mode="dequantify", D=2), tiles, irreversible=False)
+    tiles = _run(DWTransformer(mode="backward", D=2), tiles, lossy=False, reduce=reduce)
+    full = _run(Spliter(mode="recover"), tiles, block_shape=(2, 2))[0]
+
+    window = decode_region(codestream, image.shape, 30, 10, 80, 66, reduce, tile_shape=(64, 64), lossy=False, backend="jit")
+    assert window.dtype == full.dtype == np.int64
+    assert np.array_equal(window, full[10 >> reduce:-(-66 >> reduce), 30 >> reduce:-(-80 >> reduce)])
@@ -0,0 +1,55 @@
+import os
+
+import numpy as np
+import pytest
+
+from fpeg.codec import EBCOTCodec
+from fpeg.executor import ProcessExecutor
+from fpeg.test.helpers import run, laplace_tile
+from fpeg.transport import SharedArena, read_array, write_array
+
+
+def _accelerated_run(pipe, X, executor, **params):
+  pipe.monitor.prepare()
+  pipe.executor = executor
+  return pipe.recv(X, accelerated=True, **params).send()
+
+
+def _failing_task(source, out):
+  # a worker that writes part of its output, then fails
+  write_array(out, read_array(source) + 1)
+  raise RuntimeError("worker failure")
+
+
+def _segments(arena):
+  return [os.path.join("/dev/shm", segment.name.lstrip("/")) for segment in arena.segments]
+
+
+def test_process_executor_matches_serial_coding():
+  # a flat tile between the coded ones has no code-block to share
+  flat = [np.full((16, 16, 3), 5)] + [tuple(np.zeros((n, n, 3), dtype=np.int64) for _ in range(3)) for n in (16, 32)]
+  tiles = [laplace_tile(0, D=2, size=64), flat, laplace_tile(1, D=2, size=64)]
+  codestream = run(EBCOTCodec(mode="encode", D=2, cb_height=16, cb_width=16), tiles, backend="python")
+  decoded = run(EBCOTCodec(mode="decode"), codestream, backend="python")
+
+  with ProcessExecutor(2) as executor:
+    shared_codestream = _accelerated_run(EBCOTCodec(mode="encode", D=2, cb_height=16, cb_width=16), tiles, executor, backend="python")
+    shared_decoded = _accelerated_run(EBCOTCodec(mode="decode"), codestream, executor, backend="python")
+
+  assert shared_codestream == codestream
+  assert all(np.array_equal(tile.buffer, expected.buffer) for tile, expected in zip(shared_decoded, decoded))
+
+
+@pytest.mark.skipif(not os.path.isdir("/dev/shm"), reason="shared memory segments are not files in /dev/shm")
+def test_segments_are_unlinked_when_a_worker_fails():
+  with ProcessExecutor(2) as executor:
+    with pytest.raises(RuntimeError, match="worker failure"):
+      with SharedArena() as arena:
+        sources = arena.put(*[np.full((8, 8), k) for k in range(4)])
+        outs = arena.empty(*[(8, 8)] * 4)
+        paths = _segments(arena)
+        assert all(os.path.exists(path) for path in paths)
+        executor.starmap(_failing_task, list(zip(sources, outs)))
+
+  assert not arena.segments
+  assert not any(os.path.exists(path) for path in paths)
@@ -3,20 +3,25 @@ __all__ = [
 ]
 
 import numpy as np
-from pywt import wavedec2, Wavelet, waverec2
+import pywt
 
+from . import lifting
 from ..base import Transformer
 from ..config import read_config
-from ..funcs.funcs import cat_arrays_2d, dcps_array_3d
+from ..pyramid import SubbandPyramid, as_pyramid
 
 config = read_config()
 
 D = config.get("jpeg2000", "D")
-dwt_coeffs = config.get("jpeg2000", "dwt_coeffs")
 
 min_task_number = config.get("accelerate", "transformer_min_task_number")
 max_pool_size = config.get("accelerate", "transformer_max_pool_size")
 
+backends = ["lifting", "pywt"]
+
+# pywt wavelets with the filters of the lifting wavelets, the reference of the pywt backend
+references = {"5/3": "bior2.2", "9/7": "bior4.4"}
+
 
 class DWTransformer(Transformer):
 	"""
@@ -28,6 +33,8 @@ class DWTransformer(Transformer):
 	             mode="forward",
 	             lossy=True,
 	             D=D,
+	             reduce=0,
+	             backend="lifting",
 	             accelerated=False):
 		"""
 		Init and set attributes of a discrete wavelet transformer.
@@ -39,12 +46,18 @@ class DWTransformer(Transformer):
 		mode: str, optional
 		  Mode of the codec, must in ["encode", "decode"].
 		lossy: bool, optional
-      Whether the transform is loss or lossless.
+		  Whether the transform is loss or lossless, with the irreversible 9/7 or the reversible 5/3 wavelet.
+		reduce: int, optional
+		  Number of finest decomposition levels left out by the backward transform, which then yields images 2^reduce times smaller. Tiles may already lack these levels, e.g. when decoded by an EBCOT codec with the same reduce.
+		backend: str, optional
+		  Implementation of the filters, must in ["lifting", "pywt"]. The lifting scheme transforms the channels of a tile in one call, pywt is the reference it is tested against. Both yield the same coefficients, pywt has no reversible wavelet though.
 		accelerated: bool, optional
-      Whether the process would be accelerated by subprocess pool.
+		  Whether the process would be accelerated by the executor of the transformer.
 
 		Implicit Attributes
 		-------------------
+		constant_tiles: int
+		  Number of tiles of constant channels met by the last transform. Their coefficients, or samples, are written directly without running the filters.
 		min_task_number: int
 		  Minimun task number to start a pool.
 		max_pool_size: int
@@ -56,9 +69,11 @@ class DWTransformer(Transformer):
 		self.mode = mode
 		self.D = D
 		self.lossy = lossy
+		self.reduce = reduce
+		self.backend = backend
 		self.accelerated = accelerated
+		self.constant_tiles = 0
 
-		self.db97_coeffs, self.lg53_coeffs = dwt_coeffs[0], dwt_coeffs[1]
 		self.min_task_number = min_task_number
 		self.max_pool_size = max_pool_size
 
@@ -68,40 +83,11 @@ class DWTransformer(Transformer):
 		except KeyError:
 			pass
 
-		if self.lossy:
-#<<<<<<< HEAD
-			# wavelet = Wavelet('DB97', self.db97_coeffs)
-#=======
-#>>>>>>> d53c5891249024c0ce25c16ff038d73912c58639
-			wavelet = 'bior2.2'
-		else:
-			wavelet = Wavelet('LG53', self.lg53_coeffs)
-
-		coeffs = []
-		for x in X:
-			channel0_coeff = wavedec2(x[:, :, 0], wavelet, level=self.D)
-			channel1_coeff = wavedec2(x[:, :, 1], wavelet, level=self.D)
-			channel2_coeff = wavedec2(x[:, :, 2], wavelet, level=self.D)
-			a_coeff = cat_arrays_2d([channel0_coeff[0],
-			                         channel1_coeff[0],
-			                         channel2_coeff[0]])
-
-			coeff = [a_coeff]
-			for i in range(1, self.D + 1):
-				h_coeff = cat_arrays_2d([channel0_coeff[i][0],
-				                         channel1_coeff[i][0],
-				                         channel2_coeff[i][0]])
-				v_coeff = cat_arrays_2d([channel0_coeff[i][1],
-				                         channel1_coeff[i][1],
-				                         channel2_coeff[i][1]])
-				d_coeff = cat_arrays_2d([channel0_coeff[i][2],
-				                         channel1_coeff[i][2],
-				                         channel2_coeff[i][2]])
-				coeff.append((h_coeff, v_coeff, d_coeff))
-
-			coeffs.append(coeff)
-
-		return coeffs
+		wavelet = _wavelet(self.lossy)
+		self._check_backend(wavelet, **params)
+		constant = self._count_constant_tiles([_is_constant_image(x) for x in X])
+
+		return self.starmap(_forward_tile, [[x, wavelet, self.D, c, self.backend] for x, c in zip(X, constant)])
 
 	def backward(self, X, **params):
 		try:
@@ -109,40 +95,194 @@ class DWTransformer(Transformer):
 		except KeyError:
 			pass
 
-		if self.lossy:
-#<<<<<<< HEAD
-			# wavelet = Wavelet('DB97', self.db97_coeffs)
-#=======
-#>>>>>>> d53c5891249024c0ce25c16ff038d73912c58639
-			wavelet = 'bior2.2'
-		else:
-			wavelet = Wavelet('LG53', self.lg53_coeffs)
-
-		tiles = []
-		for x in X:
-			channel0_a_coeff, channel1_a_coeff, channel2_a_coeff = dcps_array_3d(x[0])
-
-			channel0_coeff = [channel0_a_coeff]
-			channel1_coeff = [channel1_a_coeff]
-			channel2_coeff = [channel2_a_coeff]
-
-			for i in range(1, len(x)):
-				if i < self.D + 1:
-					channel0_h_coeff, channel1_h_coeff, channel2_h_coeff = dcps_array_3d(x[i][0])
-					channel0_v_coeff, channel1_v_coeff, channel2_v_coeff = dcps_array_3d(x[i][1])
-					channel0_d_coeff, channel1_d_coeff, channel2_d_coeff = dcps_array_3d(x[i][2])
-				else:
-					channel0_h_coeff, channel1_h_coeff, channel2_h_coeff = dcps_array_3d(np.zeros_like(x[i][0]))
-					channel0_v_coeff, channel1_v_coeff, channel2_v_coeff = dcps_array_3d(np.zeros_like(x[i][1]))
-					channel0_d_coeff, channel1_d_coeff, channel2_d_coeff = dcps_array_3d(np.zeros_like(x[i][2]))
-
-				channel0_coeff.append((channel0_h_coeff, channel0_v_coeff, channel0_d_coeff))
-				channel1_coeff.append((channel1_h_coeff, channel1_v_coeff, channel1_d_coeff))
-				channel2_coeff.append((channel2_h_coeff, channel2_v_coeff, channel2_d_coeff))
-
-			channel0 = waverec2(channel0_coeff, wavelet)
-			channel1 = waverec2(channel1_coeff, wavelet)
-			channel2 = waverec2(channel2_coeff, wavelet)
-			tiles.append(cat_arrays_2d([channel0, channel1, channel2]))
-
-		return tiles
+		try:
+			self.reduce = params["reduce"]
+		except KeyError:
+			pass
+
+		if not 0 <= self.reduce <= self.D:
+			msg = "Invalid reduce {}. Should be in [0, {}].".format(self.reduce, self.D)
+			self.logs[-1] += self.formatter.error(msg)
+			raise ValueError(msg)
+
+		wavelet = _wavelet(self.lossy)
+		self._check_backend(wavelet, **params)
+		X = [as_pyramid(x) for x in X]
+		constant = self._count_constant_tiles([x.is_flat() for x in X])
+
+		return self.starmap(_backward_tile, [[x, wavelet, self.D, self.reduce, c, self.backend] for x, c in zip(X, constant)])
+
+	@property
+	def wavelet(self):
+		"""
+		Name of the wavelet of fpeg.transformer.lifting the transformer runs, following lossy.
+		"""
+		return _wavelet(self.lossy)
+
+	def synthesize(self, approx, details):
+		"""
+		One level of the backward transform: the approximation of the finer level from approx and the (LH, HL, HH) details, (height, width, channel) arrays of any window of the subbands.
+		"""
+		coeffs = (np.moveaxis(approx, -1, 0), tuple(np.moveaxis(band, -1, 0) for band in details))
+		return np.moveaxis(lifting.idwt2(coeffs, self.wavelet), 0, -1)
+
+	def rescale(self, approx):
+		"""
+		Approximation at level reduce as the backward transform yields it, without the gain of the levels left out.
+		"""
+		return _rescale(approx, self.wavelet, self.reduce)
+
+	def _check_backend(self, wavelet, **params):
+		try:
+			self.backend = params["backend"]
+		except KeyError:
+			pass
+
+		if self.backend not in backends:
+			msg = "Invalid backend {}. Should be in {}.".format(self.backend, backends)
+			self.logs[-1] += self.formatter.error(msg)
+			raise ValueError(msg)
+
+		if self.backend == "pywt" and wavelet not in references:
+			msg = "pywt has no {} wavelet, lossless transforms need the lifting backend.".format(wavelet)
+			self.logs[-1] += self.formatter.error(msg)
+			raise ValueError(msg)
+
+	def _count_constant_tiles(self, constant):
+		self.constant_tiles = sum(constant)
+		if self.constant_tiles:
+			self.logs[-1] += self.formatter.message("{} constant tile(s) skipped the filters.".format(self.constant_tiles))
+
+		return constant
+
+
+def _forward_tile(x, wavelet, D, constant=False, backend="lifting"):
+	if constant:
+		return _constant_coeffs(x, wavelet, D)
+
+	# channels first, so every channel is transformed at once, and subbands gathered in the
+	# component-planar buffer of a pyramid
+	coeffs = _wavedec2[backend](np.moveaxis(x, -1, 0), wavelet, D)
+	return SubbandPyramid.from_bands([coeffs[0]] + [band for level in coeffs[1:] for band in level])
+
+
+def _backward_tile(x, wavelet, D, reduce=0, constant=False, backend="lifting"):
+	# the reduce finest levels are left out, the coarser ones make the approximation at that level
+	x = x.coarsest(min(x.levels, D - reduce))
+	if constant:
+		image = _constant_image(x, wavelet)
+	else:
+		# subbands of the pyramid are the (channel, height, width) stacks the filters take
+		bands = x.bands()
+		coeffs = [bands[0]] + [tuple(bands[k:k + 3]) for k in range(1, len(bands), 3)]
+		image = np.moveaxis(_waverec2[backend](coeffs, wavelet), 0, -1)
+
+	return _rescale(image, wavelet, reduce)
+
+
+def _rescale(image, wavelet, reduce):
+	# the approximations of reversible wavelets have a gain of 1, they are images of integers already
+	if reduce and wavelet not in lifting.reversible:
+		return image / _reduction(wavelet, reduce)
+	return image
+
+
+def _pywt_wavedec2(x, wavelet, D):
+	# pywt in "reflect" mode, which extends signals like the lifting scheme, with the samples of the
+	# extension cropped off every level
+	reference = references[wavelet]
+	offset = (pywt.Wavelet(reference).dec_len - 2) // 4
+	coeffs = []
+	approx = x
+	for _ in range(D):
+		h, w = approx.shape[-2:]
+		lo, hi = [(h + 1) // 2, (w + 1) // 2], [h // 2, w // 2]
+		a, (cH, cV, cD) = pywt.dwt2(approx, reference, mode="reflect", axes=(-2, -1))
+		approx = a[..., offset:offset + lo[0], offset:offset + lo[1]]
+		coeffs.append((cH[..., offset:offset + hi[0], offset:offset + lo[1]],
+		               cV[..., offset:offset + lo[0], offset:offset + hi[1]],
+		               cD[..., offset:offset + hi[0], offset:offset + hi[1]]))
+
+	return [approx] + coeffs[::-1]
+
+
+def _pywt_waverec2(coeffs, wavelet):
+	# inverse of _pywt_wavedec2, the subbands extended back as pywt extends them
+	reference = references[wavelet]
+	length = pywt.Wavelet(reference).dec_len
+	approx = coeffs[0]
+	for cH, cV, cD in coeffs[1:]:
+		h, w = approx.shape[-2] + cH.shape[-2], approx.shape[-1] + cV.shape[-1]
+		bands = [_extend(_extend(band, w, low1, length, -1), h, low0, length, -2)
+		         for band, low0, low1 in [(approx, True, True), (cH, False, True), (cV, True, False), (cD, False, False)]]
+		approx = pywt.idwt2((bands[0], tuple(bands[1:])), reference, mode="reflect", axes=(-2, -1))[..., :h, :w]
+
+	return approx
+
+
+def _extend(band, n, low, length, axis):
+	# subband of a signal of n samples along axis padded with the coefficients of its symmetric extension:
+	# lowpass ones are mirrored about the first one, highpass ones about the half sample before it, and
+	# the other way round at the end when n is even
+	offset = (length - 2) // 4
+	right = (n + length - 1) // 2 - offset - band.shape[axis]
+	pad = [(0, 0)] * band.ndim
+	pad[axis] = (offset, 0)
+	band = np.pad(band, pad, mode="reflect" if low else "symmetric")
+	pad[axis] = (0, right)
+	return np.pad(band, pad, mode="reflect" if (n % 2 == 1) == low else "symmetric")
+
+
+_wavedec2 = {"lifting": lifting.wavedec2, "pywt": _pywt_wavedec2}
+_waverec2 = {"lifting": lifting.waverec2, "pywt": _pywt_waverec2}
+
+
+def _is_constant_image(x):
+	# whether every channel of a tile is constant
+	return bool(np.all(x == x[:1, :1]))
+
+
+def _constant_coeffs(x, wavelet, D):
+	# a constant signal stays constant through the lowpass filter and its symmetric extension, with the
+	# gain of the wavelet, and vanishes through the highpass filter
+	if wavelet in lifting.reversible:
+		value = np.rint(x[0, 0]).astype(np.int64)
+	else:
+		value = x[0, 0].astype(np.float64)
+	shape = x.shape[:2]
+	levels = []
+	for _ in range(D):
+		lo, hi = tuple((n + 1) // 2 for n in shape), tuple(n // 2 for n in shape)
+		levels.append([(hi[0], lo[1]), (lo[0], hi[1]), hi])
+		shape = lo
+
+	pyramid = SubbandPyramid([shape] + [size for level in levels[::-1] for size in level], value.dtype)
+	pyramid.band(0)[...] = value[:, np.newaxis, np.newaxis] * _reduction(wavelet, D)
+	return pyramid
+
+
+def _constant_image(x, wavelet):
+	# samples of the coefficients of a constant image
+	shape = x.shapes[0]
+	for k in range(1, len(x.shapes), 3):
+		shape = (shape[0] + x.shapes[k][0], shape[1] + x.shapes[k + 1][1])
+
+	value = x.band(0)[:, 0, 0]
+	if wavelet in lifting.reversible:
+		return np.full(shape + (3,), value, dtype=np.int64)
+	return np.full(shape + (3,), value / _reduction(wavelet, x.levels), dtype=np.float64)
+
+
+def _gain(wavelet):
+	# gain of the approximation of a level, sqrt(2) along both axes, 1 for the unscaled reversible wavelets
+	return 1 if wavelet in lifting.reversible else 2
+
+
+def _reduction(wavelet, reduce):
+	# an approximation at level reduce carries the lowpass gain of every level left out
+	return _gain(wavelet) ** reduce
+
+
+def _wavelet(lossy):
+	# wavelet of the transform, as chosen by DWTransformer
+	return "9/7" if lossy else "5/3 reversible"
@@ -0,0 +1,254 @@
+__all__ = [
+	"wavelets",
+	"reversible",
+	"dwt",
+	"idwt",
+	"dwt2",
+	"idwt2",
+	"wavedec2",
+	"waverec2",
+	"synthesis_norms"
+]
+
+import numpy as np
+
+# Lifting implementations of the wavelets of JPEG2000 (see Taubman and Marcellin, JPEG2000, section 10.3).
+#
+# A signal x of length n is split into its even samples s, ceil(n / 2) of them, and its odd samples d,
+# floor(n / 2) of them. Lifting steps then alternate, a predict step d[i] += c * (s[i] + s[i + 1]) and an
+# update step s[i] += c * (d[i - 1] + d[i]), and s and d are finally scaled into the lowpass and highpass
+# subbands. The signal is extended by whole-sample symmetry (x[-1] = x[1]), which amounts to mirroring s
+# and d at their ends in every step, so the subbands are critically sampled and the transform of a
+# window only depends on the coefficients around it.
+#
+# The scaling matches the biorthogonal wavelets of pywt, bior2.2 for the 5/3 and bior4.4 for the 9/7,
+# the lowpass gain being sqrt(2). The subbands are those pywt yields in "reflect" mode, without the
+# samples of the extension, so quantization step sizes do not depend on the implementation.
+#
+# The reversible 5/3 maps integers to integers: every step adds floor(c * (a + b) + 1 / 2), a shift as
+# the coefficients are powers of 1 / 2, and the inverse subtracts the very same values. Its subbands
+# are not scaled, the lowpass gain being 1, and its inverse is exact.
+#
+# Every function works on the last axis, or the last two for the 2D ones, of arrays of any shape, so
+# the channels of a tile, (C, H, W), or a stack of tiles, (N, C, H, W), are transformed in one call.
+
+# name: (lifting coefficients, lowpass scale, highpass scale)
+wavelets = {
+	"5/3": ((-1 / 2, 1 / 4), np.sqrt(2), -1 / np.sqrt(2)),
+	"9/7": ((-1.586134342059924, -0.052980118572961, 0.882911075530934, 0.443506852043971),
+	        np.sqrt(2) / 1.230174104914001, -1.230174104914001 / np.sqrt(2)),
+	"5/3 reversible": ((-1 / 2, 1 / 4), 1, 1),
+}
+
+# wavelets of integer coefficients, with rounded lifting steps
+reversible = {"5/3 reversible"}
+
+
+def dwt(x, wavelet, axis=-1):
+	"""
+	Single level transform of x along axis, returning the lowpass and highpass subbands. Reversible wavelets round x to integers first.
+	"""
+	steps, lo, hi = wavelets[wavelet]
+	x = _lifting_view(np.asarray(x), axis)
+	n = x.shape[-2]
+	half = n - n // 2
+
+	# even samples first, odd ones next, then lifted in place
+	out = np.empty(x.shape, dtype=_dtype(x.dtype, wavelet))
+	out[..., :half, :] = _samples(x[..., 0::2, :], wavelet)
+	out[..., half:, :] = _samples(x[..., 1::2, :], wavelet)
+	s, d = out[..., :half, :], out[..., half:, :]
+	_lift(s, d, steps, wavelet)
+	if wavelet not in reversible:
+		s *= lo
+		d *= hi
+
+	return _array_view(s, axis), _array_view(d, axis)
+
+
+def idwt(s, d, wavelet, axis=-1):
+	"""
+	Inverse of dwt, the signal of length len(s) + len(d) along axis.
+	"""
+	steps, lo, hi = wavelets[wavelet]
+	s, d = _lifting_view(np.asarray(s), axis), _lifting_view(np.asarray(d), axis)
+	half = s.shape[-2]
+
+	buffer = np.empty(s.shape[:-2] + (half + d.shape[-2], s.shape[-1]), dtype=_dtype(np.result_type(s, d), wavelet))
+	if wavelet in reversible:
+		buffer[..., :half, :] = _samples(s, wavelet)
+		buffer[..., half:, :] = _samples(d, wavelet)
+	else:
+		np.multiply(s, 1 / lo, out=buffer[..., :half, :])
+		np.multiply(d, 1 / hi, out=buffer[..., half:, :])
+	_lift(buffer[..., :half, :], buffer[..., half:, :], steps, wavelet, inverse=True)
+	out = np.empty_like(buffer)
+	out[..., 0::2, :] = buffer[..., :half, :]
+	out[..., 1::2, :] = buffer[..., half:, :]
+
+	return _array_view(out, axis)
+
+
+def dwt2(x, wavelet):
+	"""
+	Single level transform of the last two axes of x, returning the approximation and the (horizontal, vertical, diagonal) details like pywt.dwt2.
+	"""
+	lo, hi = dwt(x, wavelet, axis=-1)
+	ll, hl = dwt(lo, wavelet, axis=-2)
+	lh, hh = dwt(hi, wavelet, axis=-2)
+	return ll, (hl, lh, hh)
+
+
+def idwt2(coeffs, wavelet):
+	"""
+	Inverse of dwt2.
+	"""
+	ll, (hl, lh, hh) = coeffs
+	return idwt(idwt(ll, hl, wavelet, axis=-2), idwt(lh, hh, wavelet, axis=-2), wavelet, axis=-1)
+
+
+def wavedec2(x, wavelet, level):
+	"""
+	Multilevel transform of the last two axes of x, returning [cA_n, (cH_n, cV_n, cD_n), ..., (cH_1, cV_1, cD_1)] like pywt.wavedec2.
+	"""
+	coeffs = []
+	approx = x
+	for _ in range(level):
+		approx, details = dwt2(approx, wavelet)
+		coeffs.append(details)
+
+	return [approx] + coeffs[::-1]
+
+
+def waverec2(coeffs, wavelet):
+	"""
+	Inverse of wavedec2.
+	"""
+	approx = coeffs[0]
+	for details in coeffs[1:]:
+		approx = idwt2((approx, details), wavelet)
+
+	return approx
+
+
+def synthesis_norms(wavelet, D):
+	"""
+	Norms of the synthesis basis functions of the subbands of a D level transform, i.e. the square root of the energy one unit of coefficient of a subband brings to the image, LL first and then the three details of every level from the coarsest, in the order of wavedec2. Reversible wavelets are taken without their rounding.
+	"""
+	steps, lo, hi = wavelets[wavelet]
+	# 1D norms of the lowpass and highpass basis functions of every level, finest first, from impulses
+	# synthesized far enough from the ends of the signal for the extension not to reach them
+	n = 32 << D
+	low, high = [], []
+	for level in range(1, D + 1):
+		for norms, band in [(low, 0), (high, 1)]:
+			subbands = np.zeros((2, n >> level))
+			subbands[band, (n >> level) // 2] = 1
+			x = _synthesize(subbands[0], subbands[1], steps, lo, hi)
+			for _ in range(level - 1):
+				x = _synthesize(x, np.zeros_like(x), steps, lo, hi)
+			norms.append(np.sqrt(np.sum(x ** 2)))
+
+	# 2D basis functions are separable, horizontal details are lowpass along rows and highpass along columns
+	out = [low[-1] ** 2 if D else 1.0]
+	for level in range(D - 1, -1, -1):
+		out.extend([low[level] * high[level], low[level] * high[level], high[level] ** 2])
+
+	return out
+
+
+def _synthesize(s, d, steps, lo, hi):
+	# one level of the 1D backward transform of float subbands, as idwt without the rounding of reversible wavelets
+	half = len(s)
+	buffer = np.concatenate([s / lo, d / hi])[:, np.newaxis]
+	_lift(buffer[:half], buffer[half:], steps, None, inverse=True)
+	out = np.empty(len(buffer))
+	out[0::2] = buffer[:half, 0]
+	out[1::2] = buffer[half:, 0]
+	return out
+
+
+def _lifting_view(x, axis):
+	# view of x lifted along its second to last axis, so that rows of the last axis, contiguous when
+	# columns are lifted, are processed together
+	if axis in (-1, x.ndim - 1):
+		return x[..., np.newaxis]
+	return np.moveaxis(x, axis, -2)
+
+
+def _array_view(x, axis):
+	# inverse of _lifting_view
+	if axis in (-1, x.ndim - 2):
+		return x[..., 0]
+	return np.moveaxis(x, -2, axis)
+
+
+def _dtype(dtype, wavelet):
+	# type of the coefficients of samples of type dtype
+	if wavelet in reversible:
+		return np.int64
+	return np.result_type(dtype, np.float64)
+
+
+def _samples(x, wavelet):
+	# samples of x rounded to integers for reversible wavelets
+	if wavelet in reversible and not np.issubdtype(x.dtype, np.integer):
+		return np.rint(x)
+	return x
+
+
+def _lift(s, d, steps, wavelet, inverse=False):
+	# predict and update steps in place, alternately, or undone in reverse order
+	add = _add_rounded_pairs if wavelet in reversible else _add_pairs
+	scratch = np.empty_like(d)
+	order = range(len(steps) - 1, -1, -1) if inverse else range(len(steps))
+	for k in order:
+		if k % 2:
+			_update(s, d, steps[k], scratch, add, inverse)
+		else:
+			_predict(s, d, steps[k], scratch, add, inverse)
+
+
+def _predict(s, d, c, scratch, add, inverse):
+	# d[i] += c * (s[i] + s[i + 1]), s[len(s)] mirrored to s[len(s) - 1]
+	n, m = s.shape[-2], d.shape[-2]
+	if not m:
+		return
+	pairs = min(m, n - 1)
+	add(d[..., :pairs, :], s[..., :pairs, :], s[..., 1:pairs + 1, :], c, scratch[..., :pairs, :], inverse)
+	if m == n:
+		add(d[..., -1:, :], s[..., -1:, :], s[..., -1:, :], c, scratch[..., :1, :], inverse)
+
+
+def _update(s, d, c, scratch, add, inverse):
+	# s[i] += c * (d[i - 1] + d[i]), d[-1] mirrored to d[0] and d[len(d)] to d[len(d) - 1]
+	n, m = s.shape[-2], d.shape[-2]
+	if not m:
+		return
+	add(s[..., :1, :], d[..., :1, :], d[..., :1, :], c, scratch[..., :1, :], inverse)
+	add(s[..., 1:m, :], d[..., :m - 1, :], d[..., 1:m, :], c, scratch[..., :m - 1, :], inverse)
+	if n > m:
+		add(s[..., m:, :], d[..., -1:, :], d[..., -1:, :], c, scratch[..., :1, :], inverse)
+
+
+def _add_pairs(target, a, b, c, scratch, inverse):
+	# target += c * (a + b), or -= to undo it, without temporaries
+	np.add(a, b, out=scratch)
+	scratch *= c
+	if inverse:
+		target -= scratch
+	else:
+		target += scratch
+
+
+def _add_rounded_pairs(target, a, b, c, scratch, inverse):
+	# target += floor(c * (a + b) + 1 / 2), or -= to undo it, c being a power of 1 / 2 or its opposite,
+	# floor(-x / 2^k + 1 / 2) being -floor((x + 2^(k - 1) - 1) / 2^k)
+	shift = int(round(-np.log2(abs(c))))
+	np.add(a, b, out=scratch)
+	scratch += (1 << (shift - 1)) - (c < 0)
+	scratch >>= shift
+	if inverse == (c < 0):
+		target += scratch
+	else:
+		target -= scratch
@@ -0,0 +1,129 @@
+__all__ = [
+  "SharedArray",
+  "SharedArena",
+  "read_array",
+  "write_array"
+]
+
+from collections import namedtuple
+from multiprocessing.shared_memory import SharedMemory
+from weakref import finalize
+
+import numpy as np
+
+
+# Descriptor of an array placed in shared memory, cheap to pickle into worker processes.
+SharedArray = namedtuple("SharedArray", ["name", "shape", "dtype", "offset"])
+
+# offsets of arrays packed into one segment are aligned for vectorized loads
+alignment = 64
+
+
+class SharedArena:
+  """
+  Owner of the shared memory segments holding arrays exchanged with worker processes.
+
+  Arrays are packed into segments created by the arena, and only their descriptors are sent to the workers, which read their inputs with read_array and write their outputs into buffers allocated with empty through write_array.
+
+  Segments belong to the process that created the arena and are unlinked when the arena is closed, leaving the with block or being garbage collected, whether or not the workers succeeded. A crashed worker only holds a mapping that the system releases with the process, so nothing outlives the arena.
+  """
+
+  def __init__(self):
+    self.segments = []
+    self._finalizer = finalize(self, _release, self.segments)
+
+  def put(self, *arrays):
+    """
+    Copy arrays into one new segment and return their descriptors.
+    """
+    arrays = [np.ascontiguousarray(array) for array in arrays]
+    descriptors = self._allocate([(array.shape, array.dtype) for array in arrays])
+    for descriptor, array in zip(descriptors, arrays):
+      self.view(descriptor)[...] = array
+
+    return descriptors
+
+  def empty(self, *shapes, dtype=np.float64):
+    """
+    Allocate zeroed arrays of the given shapes in one new segment and return their descriptors.
+    """
+    return self._allocate([(shape, np.dtype(dtype)) for shape in shapes])
+
+  def view(self, descriptor):
+    """
+    Array of a descriptor, backed by the segment of the arena. It is only valid until the arena is closed.
+    """
+    for segment in self.segments:
+      if segment.name == descriptor.name:
+        return _ndarray(segment, descriptor)
+
+    raise ValueError("Segment \'{}\' does not belong to this arena.".format(descriptor.name))
+
+  def close(self):
+    """
+    Close and unlink every segment of the arena.
+    """
+    self._finalizer()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    self.close()
+
+  def _allocate(self, specs):
+    offsets = []
+    size = 0
+    for shape, dtype in specs:
+      size = -(-size // alignment) * alignment
+      offsets.append(size)
+      size += int(np.prod(shape, dtype=np.int64)) * np.dtype(dtype).itemsize
+
+    segment = SharedMemory(create=True, size=max(1, size))
+    self.segments.append(segment)
+
+    return [SharedArray(segment.name, tuple(int(n) for n in shape), np.dtype(dtype).str, offset)
+            for (shape, dtype), offset in zip(specs, offsets)]
+
+
+def read_array(descriptor, index=Ellipsis):
+  """
+  Copy of a shared array, or of array[index], read in a worker process.
+  """
+  segment = SharedMemory(name=descriptor.name)
+  try:
+    array = _ndarray(segment, descriptor)
+    out = np.array(array[index])
+    del array
+  finally:
+    segment.close()
+
+  return out
+
+
+def write_array(descriptor, value, index=Ellipsis):
+  """
+  Write value into a shared array, or into array[index], from a worker process.
+  """
+  segment = SharedMemory(name=descriptor.name)
+  try:
+    array = _ndarray(segment, descriptor)
+    array[index] = value
+    del array
+  finally:
+    segment.close()
+
+
+def _ndarray(segment, descriptor):
+  return np.ndarray(descriptor.shape, dtype=np.dtype(descriptor.dtype), buffer=segment.buf, offset=descriptor.offset)
+
+
+def _release(segments):
+  while segments:
+    segment = segments.pop()
+    try:
+      segment.close()
+    except BufferError:
+      # views returned by SharedArena.view are still alive, the mapping goes away with them
+      pass
+    segment.unlink()
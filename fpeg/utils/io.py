@@ -9,6 +9,7 @@ import pickle
 import numpy as np
 
 from ..base import Pipe
+from ..codec.codestream import MAGIC
 from ..config import read_config
 
 
@@ -61,7 +62,13 @@ class Reader(Pipe):
         raise ValueError(msg)
     else:
       self.logs[-1] += self.formatter.message("Loading binary file.")
-      X = pickle.load(open(path, "rb"))
+      with open(path, "rb") as f:
+        data = f.read()
+      if data.startswith(MAGIC):
+        # EBCOT codestreams are stored as they are
+        self.sended_ = data
+        return self
+      X = pickle.loads(data)
       
     if X is None:
       msg = "File path is invalid."
@@ -101,6 +108,13 @@ class Writer(Pipe):
     self.logs[-1] += self.formatter.message("Receiving data.")
     self.received_ = X
 
+    if isinstance(X, (bytes, bytearray, memoryview)):
+      self.logs[-1] += self.formatter.message("Writing codestream.")
+      with open(self.path, "wb") as f:
+        f.write(X)
+      self.sended_ = X
+      return self
+
     X[0] = X[0].astype(np.uint8)
     if not self.binary:
       cv2.imwrite(self.path, X[0])
@@ -1,21 +1,20 @@
 __all__ = [
-	"Quantizer"
+	"Quantizer",
+	"step_sizes"
 ]
 
-from multiprocessing import Pool
-
 import numpy as np
 
 from ..base import Pipe
 from ..config import read_config
 from ..funcs import parse_marker
+from ..pyramid import as_pyramid
 
 config = read_config()
 
 D = config.get("jpeg2000", "D")
 QCD = config.get("jpeg2000", "QCD")
 delta_vb = config.get("jpeg2000", "delta_vb")
-reserve_bits = config.get("jpeg2000", "reserve_bits")
 
 min_task_number = config.get("accelerate", "codec_min_task_number")
 max_pool_size = config.get("accelerate", "codec_max_pool_size")
@@ -26,6 +25,9 @@ class Quantizer(Pipe):
 	Quantizer
 	"""
 
+	# quantization is NumPy-bound and releases the GIL
+	executor_kind = "thread"
+
 	def __init__(self,
 							 name="Quantizer",
 							 mode="quantify",
@@ -33,8 +35,7 @@ class Quantizer(Pipe):
 							 accelerated=False,
 							 D=D,
 							 QCD=QCD,
-							 delta_vb=delta_vb,
-							 reserve_bits=reserve_bits):
+							 delta_vb=delta_vb):
 		"""
 		Init and set attributes of a quantizer.
 
@@ -45,9 +46,9 @@ class Quantizer(Pipe):
 		mode: str, optional
 			Mode of quantizer, must in ["quantify", "dequantify"].
 		irreversible: bool, optional
-			Whether the transform is lossy or lossless.
+			Whether the transform is lossy or lossless. Coefficients of lossless transforms are integers, they are passed on as they are.
 		accelerated: bool, optional
-			Whether the process would be accelerated by subprocess pool.
+			Whether the process would be accelerated by the executor of the quantizer.
 		D: int, optional
 			Number of resolution layers.
 		QCD: str, optional
@@ -75,7 +76,6 @@ class Quantizer(Pipe):
 		self.D = D
 		self.QCD = QCD
 		self.delta_vb = delta_vb
-		self.reserve_bits = reserve_bits
 
 		self.epsilon_b, self.mu_b = parse_marker(self.QCD)
 		self.min_task_number = min_task_number
@@ -106,36 +106,20 @@ class Quantizer(Pipe):
 		except KeyError:
 			self.logs[-1] += self.formatter.warning("\"D\" is not specified, now set to {}.".format(self.D))
 
-		try:
-			self.reserve_bits = params["reserve_bits"]
-			self.logs[-1] += self.formatter.message("\"reserve_bits\" is specified as {}.".format(self.reserve_bits))
-		except KeyError:
-			self.logs[-1] += self.formatter.warning("\"reserve_bits\" is not specified, now set to {}.".format(self.reserve_bits))		
-
 		self.epsilon_b, self.mu_b = parse_marker(self.QCD)
 
-		delta_bs = []
-		for i in range(self.D):
-			delta_bs.append(2 ** -(self.epsilon_b + i - self.D) * (1 + self.mu_b / (2 ** 11)))
+		delta_bs = _step_sizes(self.epsilon_b, self.mu_b, self.D)
 
 		print(delta_bs)
 		if self.mode == "quantify":
 			if self.irreversible:
-				if self.accelerated:
-					self.logs[-1] += self.formatter.message("Using multiprocess pool to accelerate quantify.")
-					inputs = [[x, delta_bs] for x in X]
-					with Pool(min(self.task_number, self.max_pool_size)) as p:
-						X = p.starmap(_quantize, inputs)
-				else:
-					X = [_quantize(x, delta_bs) for x in X]
+				X = self.starmap(_quantize, [[x, delta_bs] for x in X])
 			else:
-				if self.accelerated:
-					self.logs[-1] += self.formatter.message("Using multiprocess pool to accelerate quantify.")
-					inputs = [[x, self.reserve_bits, False] for x in X]
-					with Pool(min(self.task_number, self.max_pool_size)) as p:
-						X = p.starmap(_scale, inputs)
-				else:
-					X = [_scale(x, self.reserve_bits, False) for x in X]
+				if not all(_is_integer(x) for x in X):
+					msg = "Lossless quantization takes integer coefficients, e.g. of a DWTransformer with lossy=False."
+					self.logs[-1] += self.formatter.error(msg)
+					raise ValueError(msg)
+				X = self.starmap(_integers, [[x] for x in X])
 
 		elif self.mode == "dequantify":
 			try:
@@ -145,21 +129,9 @@ class Quantizer(Pipe):
 				self.logs[-1] += self.formatter.warning("\"delta_vb\" is not specified, now set to {}.".format(self.delta_vb))
 
 			if self.irreversible:
-				if self.accelerated:
-					self.logs[-1] += self.formatter.message("Using multiprocess pool to accelerate dequantify.")
-					inputs = [[x, delta_bs, self.delta_vb] for x in X]
-					with Pool(min(self.task_number, self.max_pool_size)) as p:
-						X = p.starmap(_dequantize, inputs)
-				else:
-					X = [_dequantize(x, delta_bs, self.delta_vb) for x in X]
+				X = self.starmap(_dequantize, [[x, delta_bs, self.delta_vb] for x in X])
 			else:
-				if self.accelerated:
-					self.logs[-1] += self.formatter.message("Using multiprocess pool to accelerate dequantify.")
-					inputs = [[x, self.reserve_bits, True] for x in X]
-					with Pool(min(self.task_number, self.max_pool_size)) as p:
-						X = p.starmap(_scale, inputs)
-				else:
-					X = [_scale(x, self.reserve_bits, True) for x in X]
+				X = self.starmap(_integers, [[x] for x in X])
 
 		else:
 			msg = "Invalid attribute %s for quantizer %s. Quantizer.mode should be set to \"quantify\" or \"dequantify\"." % (self.mode, self)
@@ -170,36 +142,60 @@ class Quantizer(Pipe):
 
 		return self
 
+	def dequantize(self, tile):
+		"""
+		Coefficients of a quantized tile as recv yields them in "dequantify" mode, following irreversible, QCD, D and delta_vb.
+
+		tile may hold any window of the subbands, and the coarsest levels only.
+		"""
+		if self.irreversible:
+			epsilon_b, mu_b = parse_marker(self.QCD)
+			return _dequantize(tile, _step_sizes(epsilon_b, mu_b, self.D), self.delta_vb)
+		return _integers(tile)
+
+
+def step_sizes(QCD, D):
+	"""
+	Quantization steps of the subbands of a tile of D levels in the irreversible mode, LL first and then the three details of every level from the coarsest.
+	"""
+	delta_bs = _step_sizes(*parse_marker(QCD), D)
+	return [delta_bs[max(0, (k - 1) // 3)] for k in range(3 * D + 1)]
+
+
+def _step_sizes(epsilon_b, mu_b, D):
+	# quantization steps of the levels of a tile, coarsest first
+	return [2 ** -(epsilon_b + i - D) * (1 + mu_b / (2 ** 11)) for i in range(D)]
+
 
 def _quantize(tile, delta_bs):
-	quantified_tile = [np.array(tile[0] / delta_bs[0], dtype=np.int64)]
-	for subbands, delta_b in zip(tile[1:], delta_bs):
-		quantified_tile.append(tuple([np.array(subband / delta_b, dtype=np.int64) for subband in subbands]))
+	tile = as_pyramid(tile)
+	quantified_tile = tile.like(np.int64)
+	# the whole buffer at once, every coefficient divided by the step of its subband
+	np.divide(tile.buffer, _band_steps(tile, delta_bs), out=quantified_tile.buffer, casting="unsafe")
 
 	return quantified_tile
 
 
 def _dequantize(coeffs, delta_bs, delta_vb):
-	dequantified_tile = [(coeffs[0] + delta_vb) * delta_bs[0]]
-	for subbands, delta_b in zip(coeffs[1:], delta_bs):
-		dequantified_tile.append(tuple([(subband + delta_vb) * delta_b for subband in subbands]))
+	coeffs = as_pyramid(coeffs)
+	dequantified_tile = coeffs.like(np.float64)
+	np.add(coeffs.buffer, delta_vb, out=dequantified_tile.buffer)
+	dequantified_tile.buffer *= _band_steps(coeffs, delta_bs)
 
 	return dequantified_tile
 
 
-def _scale(tile, reserve_bits, compress):
-	new_tile = []
-	if compress:
-		for subbands in tile:
-			if isinstance(subbands, tuple):
-				new_tile.append(tuple([np.array(subband / (10 ** reserve_bits), dtype=np.float64) for subband in subbands]))
-			else:
-				new_tile.append(np.array(subbands / (10 ** reserve_bits), dtype=np.float64))
-	else:
-		for subbands in tile:
-			if isinstance(subbands, tuple):
-				new_tile.append(tuple([np.array(subband * (10 ** reserve_bits), dtype=np.int64) for subband in subbands]))
-			else:
-				new_tile.append(np.array(subbands * (10 ** reserve_bits), dtype=np.int64))
+def _band_steps(tile, delta_bs):
+	# step of every coefficient of a component, the LL subband sharing the step of the coarsest level
+	return tile.band_values([delta_bs[max(0, (k - 1) // 3)] for k in range(len(tile.shapes))])
+
+
+def _integers(tile):
+	# coefficients of a lossless transform, coded as they are
+	return as_pyramid(tile, np.int64)
+
 
-	return new_tile
+def _is_integer(tile):
+	# whether every coefficient of a tile is an integer
+	buffer = as_pyramid(tile).buffer
+	return np.issubdtype(buffer.dtype, np.integer) or np.array_equal(buffer, np.round(buffer))